@@ -0,0 +1,139 @@
+"""Summarize a stream of close approaches by group.
+
+The `aggregate` function consumes a stream of `CloseApproach` objects (such as
+the results of `NEODatabase.query`) in a single pass, and produces one
+`GroupSummary` for each distinct group - for example, for each year or for each
+NEO. Each summary holds the number of approaches in its group, and the minimum,
+maximum, and mean of their approach distances, velocities, and NEO diameters.
+
+Only a fixed-size accumulator is kept for each group, so the memory needed
+depends on the number of groups rather than on the number of approaches.
+
+The `GROUP_KEYS` dictionary maps the supported values of `--group-by` to a
+function that computes the group of a close approach.
+"""
+import math
+
+from helpers import minutes_to_date
+
+# Functions to compute the group to which a close approach belongs.
+GROUP_KEYS = {
+    'neo': lambda approach: approach.neo.designation,
+    'year': lambda approach: minutes_to_date(approach.minutes).year,
+    'month': lambda approach: approach.time_str[:7],
+    'day': lambda approach: approach.time_str[:10],
+    'hazardous': lambda approach: approach.neo.hazardous,
+}
+
+# The attributes that are summarized, and the units that they are measured in.
+MEASURES = (('distance', 'au'), ('velocity', 'km_s'), ('diameter', 'km'))
+
+
+class Statistic:
+    """A running minimum, maximum, and mean of a series of numbers, ignoring NaNs."""
+
+    __slots__ = ('count', 'minimum', 'maximum', 'total')
+
+    def __init__(self):
+        """Create a new, empty `Statistic`."""
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.total = 0.0
+
+    def add(self, value):
+        """Include a value in this statistic, unless it is NaN."""
+        if value != value:
+            return
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self):
+        """Return the mean of the included values, or NaN if there are none."""
+        return self.total / self.count if self.count else float('nan')
+
+    def serialize(self):
+        """Return the (min, max, mean) of the included values, each NaN if there are none."""
+        if not self.count:
+            return float('nan'), float('nan'), float('nan')
+        return self.minimum, self.maximum, self.mean
+
+
+class GroupSummary:
+    """The number of close approaches in a group, and statistics about their attributes."""
+
+    __slots__ = ('group_by', 'group', 'count', 'distance', 'velocity', 'diameter')
+
+    def __init__(self, group_by, group):
+        """Create a new, empty `GroupSummary`.
+
+        :param group_by: The name of the grouping, one of the keys of `GROUP_KEYS`.
+        :param group: The value shared by the close approaches in this group.
+        """
+        self.group_by = group_by
+        self.group = group
+        self.count = 0
+        self.distance = Statistic()
+        self.velocity = Statistic()
+        self.diameter = Statistic()
+
+    def add(self, approach):
+        """Include a close approach in this summary."""
+        self.count += 1
+        self.distance.add(approach.distance)
+        self.velocity.add(approach.velocity)
+        self.diameter.add(approach.neo.diameter)
+
+    @staticmethod
+    def fieldnames(group_by):
+        """Return the names of the fields of a serialized summary, in order."""
+        names = [group_by, 'count']
+        for measure, unit in MEASURES:
+            names += [f'{measure}_{unit}_min', f'{measure}_{unit}_max', f'{measure}_{unit}_mean']
+        return names
+
+    def serialize(self):
+        """Convert this summary into a serializable data form for JSON and CSV."""
+        values = [self.group, self.count]
+        for measure, _ in MEASURES:
+            values.extend(getattr(self, measure).serialize())
+        return dict(zip(self.fieldnames(self.group_by), values))
+
+    def __str__(self):
+        """Return `str(self)`."""
+        parts = [f"{self.group_by} {self.group}: {self.count} approaches"]
+        for measure, unit in MEASURES:
+            statistic = getattr(self, measure)
+            if statistic.count:
+                parts.append(f"{measure} {statistic.minimum:.3f}-{statistic.maximum:.3f} "
+                             f"(mean {statistic.mean:.3f}) {unit.replace('_', '/')}")
+            else:
+                parts.append(f"{measure} unknown")
+        return ', '.join(parts)
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"GroupSummary(group_by={self.group_by!r}, group={self.group!r}, count={self.count!r})"
+
+
+def aggregate(approaches, group_by):
+    """Summarize a stream of close approaches by group, in a single pass.
+
+    :param approaches: An iterable of linked `CloseApproach` objects.
+    :param group_by: The grouping to use, one of the keys of `GROUP_KEYS`.
+    :return: A list of `GroupSummary`s, sorted by group.
+    """
+    key = GROUP_KEYS[group_by]
+    summaries = {}
+    for approach in approaches:
+        group = key(approach)
+        summary = summaries.get(group)
+        if summary is None:
+            summary = summaries[group] = GroupSummary(group_by, group)
+        summary.add(approach)
+    return [summaries[group] for group in sorted(summaries)]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Benchmark the performance of the near-Earth object explorer.
+
+This script can be invoked from the command line::
+
+    $ python3 benchmark.py startup [--runs N]
+    $ python3 benchmark.py search [--runs N] [TEXT ...]
+    $ python3 benchmark.py snapshot [--readers N] [--seconds S]
+    $ python3 benchmark.py backends [--runs N]
+
+The `startup` benchmark runs each subcommand of `main.py` in a fresh Python
+process, and reports the median wall-clock time of a cold start along with the
+cumulative import time of the modules it loaded (as measured by
+`python3 -X importtime`). It fails if `inspect` starts slower than
+`INSPECT_STARTUP_TARGET`.
+
+The `search` benchmark reports the time to build the name search index and the
+mean latency of `NEODatabase.search` for each search text. It fails if a search
+is slower than `SEARCH_LATENCY_TARGET`.
+
+The `snapshot` benchmark reports the throughput of queries against a
+`snapshot.VersionedDatabase` with 1 to N reader threads, first on their own and
+then while a writer thread keeps publishing new versions.
+
+The `backends` benchmark compares the in-memory `NEODatabase` with the SQLite
+backend of `sqlstore`: the time to load (or import, then open) each, and the
+mean time of some queries and counts against each.
+
+By default, the benchmarks use the data files in the `data` subfolder, but other
+data files can be supplied with `--neofile` and `--cadfile`.
+"""
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Paths to the root of the project and the `data` subfolder.
+PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+
+# The longest (median) cold start, in seconds, that's acceptable for `main.py inspect`.
+INSPECT_STARTUP_TARGET = 0.1
+
+# The longest mean latency, in seconds, that's acceptable for `NEODatabase.search`.
+SEARCH_LATENCY_TARGET = 0.001
+
+
+def run_main(args, importtime=False):
+    """Run `main.py` in a fresh interpreter, and return its wall-clock time and stderr.
+
+    :param args: The command-line arguments to supply to `main.py`.
+    :param importtime: Whether to run the interpreter with `-X importtime`.
+    :return: A tuple of the elapsed time in seconds and the captured stderr.
+    """
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += [str(PROJECT_ROOT / 'main.py')] + [str(arg) for arg in args]
+    start = time.perf_counter()
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               universal_newlines=True, check=True)
+    return time.perf_counter() - start, completed.stderr
+
+
+def total_import_time(stderr):
+    """Sum the self-times reported by `-X importtime`, in seconds."""
+    total = 0
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_us = line.split(':', 1)[1].split('|')[0].strip()
+            if self_us.isdigit():
+                total += int(self_us)
+    return total / 1e6
+
+
+def startup(args):
+    """Perform the `startup` benchmark.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: Whether every target was met.
+    """
+    data = ['--neofile', args.neofile, '--cadfile', args.cadfile]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outfile = pathlib.Path(tmpdir) / 'results.csv'
+        subcommands = {
+            '--help': ['--help'],
+            'inspect': data + ['inspect', '--pdes', args.pdes],
+            'inspect --verbose': data + ['inspect', '--verbose', '--pdes', args.pdes],
+            'query': data + ['query', '--limit', '10'],
+            'query --outfile': data + ['query', '--limit', '10', '--outfile', outfile],
+        }
+
+        # Make sure that any sidecar files are already built.
+        run_main(subcommands['inspect'])
+
+        medians = {}
+        print(f"{'subcommand':<20} {'median (s)':>12} {'imports (s)':>12}")
+        for label, command in subcommands.items():
+            times = [run_main(command)[0] for _ in range(args.runs)]
+            imports = total_import_time(run_main(command, importtime=True)[1])
+            medians[label] = statistics.median(times)
+            print(f"{label:<20} {medians[label]:>12.4f} {imports:>12.4f}")
+
+    if medians['inspect'] > INSPECT_STARTUP_TARGET:
+        print(f"`inspect` took {medians['inspect']:.4f}s to start, "
+              f"exceeding the target of {INSPECT_STARTUP_TARGET}s.", file=sys.stderr)
+        return False
+    return True
+
+
+def search(args):
+    """Perform the `search` benchmark.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: Whether every target was met.
+    """
+    from database import NEODatabase
+    from extract import load_neos
+
+    database = NEODatabase(load_neos(args.neofile), [])
+    start = time.perf_counter()
+    database.search('')
+    database.search('a')
+    print(f"Built the search index in {time.perf_counter() - start:.4f}s.")
+
+    met = True
+    print(f"{'text':<20} {'mean (s)':>12} {'matches':>8}")
+    for text in args.text:
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            matches = database.search(text)
+        mean = (time.perf_counter() - start) / args.runs
+        print(f"{text:<20} {mean:>12.6f} {len(matches):>8}")
+        met = met and mean <= SEARCH_LATENCY_TARGET
+    if not met:
+        print(f"A search exceeded the target of {SEARCH_LATENCY_TARGET}s.", file=sys.stderr)
+    return met
+
+
+def snapshot(args):
+    """Perform the `snapshot` benchmark.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: Whether every target was met (there are none).
+    """
+    import threading
+    from filters import create_filters
+    from main import load_database
+    from snapshot import VersionedDatabase, copy_database
+
+    versions = VersionedDatabase(load_database(args.neofile, args.cadfile))
+    filters = create_filters(distance_max=0.05, velocity_min=20)
+
+    def measure(readers, writing):
+        """Run readers (and perhaps a writer) for a while; return queries/s and versions published."""
+        stop = threading.Event()
+        counts = [0] * readers
+
+        def read(index):
+            while not stop.is_set():
+                _, database = versions.snapshot()
+                for _ in database.query(filters):
+                    pass
+                counts[index] += 1
+
+        def write():
+            while not stop.is_set():
+                versions.update(copy_database)
+
+        threads = [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+        if writing:
+            threads.append(threading.Thread(target=write))
+        first = versions.snapshot().number
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / args.seconds, versions.snapshot().number - first
+
+    print(f"{'readers':>8} {'queries/s':>12} {'with writer':>12} {'versions':>9}")
+    for readers in range(1, args.readers + 1):
+        alone, _ = measure(readers, False)
+        contended, published = measure(readers, True)
+        print(f"{readers:>8} {alone:>12.1f} {contended:>12.1f} {published:>9}")
+    return True
+
+
+def backends(args):
+    """Perform the `backends` benchmark.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: Whether every target was met (there are none).
+    """
+    import datetime
+    from filters import create_filters
+    from main import load_database
+    from sqlstore import SQLiteDatabase
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = pathlib.Path(tmpdir) / 'cad.sqlite'
+        start = time.perf_counter()
+        memory = load_database(args.neofile, args.cadfile)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        SQLiteDatabase.open(args.neofile, args.cadfile, path).close()
+        imported = time.perf_counter() - start
+        start = time.perf_counter()
+        sqlite = SQLiteDatabase.open(args.neofile, args.cadfile, path)
+        opened = time.perf_counter() - start
+        print(f"Loaded into memory in {loaded:.4f}s; imported into SQLite in {imported:.4f}s, "
+              f"then opened in {opened:.4f}s.")
+
+        criteria = {
+            'all': {},
+            'one day': dict(date=datetime.date(2020, 1, 1)),
+            'near and fast': dict(distance_max=0.01, velocity_min=20),
+            'hazardous': dict(hazardous=True),
+            'big, near': dict(diameter_min=1, distance_max=0.1),
+        }
+        print(f"{'criteria':<16} {'matches':>8} {'memory (s)':>12} {'sqlite (s)':>12} "
+              f"{'count mem (s)':>14} {'count sql (s)':>14}")
+        for label, kwargs in criteria.items():
+            filters = create_filters(**kwargs)
+            timings = []
+            for method in ('query', 'count'):
+                for database in (memory, sqlite):
+                    start = time.perf_counter()
+                    for _ in range(args.runs):
+                        result = getattr(database, method)(filters)
+                        if method == 'query':
+                            matches = sum(1 for _ in result)
+                    timings.append((time.perf_counter() - start) / args.runs)
+            widths = (12, 12, 14, 14)
+            print(f"{label:<16} {matches:>8} "
+                  + ' '.join(f"{timing:>{width}.6f}" for timing, width in zip(timings, widths)))
+        sqlite.close()
+    return True
+
+
+def make_parser():
+    """Create an ArgumentParser for this script.
+
+    :return: The top-level parser.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the near-Earth object explorer.")
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'), type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'), type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    startup_parser = subparsers.add_parser('startup',
+                                           description="Measure the cold start of each subcommand.")
+    startup_parser.add_argument('-r', '--runs', type=int, default=5,
+                                help="The number of times to run each subcommand.")
+    startup_parser.add_argument('-p', '--pdes', default='433',
+                                help="The primary designation of the NEO to inspect.")
+    startup_parser.set_defaults(func=startup)
+
+    search_parser = subparsers.add_parser('search',
+                                          description="Measure the latency of name searches.")
+    search_parser.add_argument('-r', '--runs', type=int, default=1000,
+                               help="The number of times to run each search.")
+    search_parser.add_argument('text', nargs='*',
+                               default=['apo', 'eros', 'apophs', '2020', '433', 'zzz'],
+                               help="The search texts to time.")
+    search_parser.set_defaults(func=search)
+
+    snapshot_parser = subparsers.add_parser('snapshot',
+                                            description="Measure query throughput under concurrent readers.")
+    snapshot_parser.add_argument('-n', '--readers', type=int, default=4,
+                                 help="The largest number of reader threads.")
+    snapshot_parser.add_argument('-s', '--seconds', type=float, default=2.0,
+                                 help="How long to run each measurement, in seconds.")
+    snapshot_parser.set_defaults(func=snapshot)
+
+    backends_parser = subparsers.add_parser('backends',
+                                            description="Compare the in-memory and SQLite backends.")
+    backends_parser.add_argument('-r', '--runs', type=int, default=20,
+                                 help="The number of times to run each query.")
+    backends_parser.set_defaults(func=backends)
+    return parser
+
+
+def main():
+    """Run the chosen benchmark."""
+    parser = make_parser()
+    args = parser.parse_args()
+    if not args.cmd:
+        parser.print_usage()
+        return
+    if not args.func(args):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""Index low-cardinality attributes of close approaches with bitmaps.
+
+A `Bitmap` is a set of row ids - the positions of close approaches within an
+`NEODatabase` - stored as the bits of an arbitrary-precision Python `int`. Sets
+of rows are combined in bulk with `&` (and), `|` (or), and `~` (not), and the
+number of rows in a set is a popcount, so a combination of boolean criteria can
+be evaluated (and counted) without visiting any individual approach.
+
+A `BitmapIndex` holds one `Bitmap` for each of the boolean attributes in
+`BITMAP_PREDICATES`, built the first time that each one is needed. It can also
+compare a whole extra column of the close approach data (see `columns`) against
+a value at once, producing a `Bitmap` of the rows that satisfy the comparison.
+
+Finally, it holds a `SortedColumn` for each of the attributes in
+`ATTRIBUTE_COLUMNS` - the attribute's value in every row, in ascending order,
+with the row that each value came from. Range criteria on such an attribute
+are found by binary search, so the number of rows in a range is known without
+visiting any approach, and the rows themselves are just a slice of the column.
+The 'time' column also finds the approaches nearest in time to an instant, by
+binary search and then expanding outward (see `SortedColumn.around`). Sorted
+columns are built the first time that they're needed, unless they were mapped
+from an index file built by `main.py index` (see `indexes`).
+"""
+import bisect
+import itertools
+import math
+import operator
+from array import array
+
+from helpers import EPOCH_ORDINAL
+
+# Functions that decide whether a (linked) close approach belongs in each bitmap.
+BITMAP_PREDICATES = {
+    'hazardous': lambda approach: approach.neo.hazardous,
+    'has_diameter': lambda approach: not math.isnan(approach.neo.diameter),
+    'has_name': lambda approach: approach.neo.name is not None,
+}
+
+# Functions that compute the value of an attribute of a close approach, as a float (NaN if unknown).
+ATTRIBUTE_COLUMNS = {
+    'date': lambda approach: EPOCH_ORDINAL + approach.minutes // 1440,
+    'time': lambda approach: approach.minutes,
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': lambda approach: approach.neo.diameter,
+}
+
+# The positions of the set bits in each possible byte, from least significant.
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+# `int.bit_count` is only available in Python 3.10+.
+_popcount = getattr(int, 'bit_count', lambda value: bin(value).count('1'))
+
+
+class Bitmap:
+    """A set of row ids in the range [0, size), stored as the bits of an int."""
+
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits, size):
+        """Create a new `Bitmap`.
+
+        :param bits: An int whose bit `i` is set if and only if row `i` is in the set.
+        :param size: The number of rows in the universe of this set.
+        """
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_predicate(cls, items, predicate):
+        """Create a `Bitmap` of the positions of the items that satisfy a predicate.
+
+        :param items: A sequence of items, whose positions are their row ids.
+        :param predicate: A 1-argument function returning whether an item is in the set.
+        :return: A new `Bitmap`.
+        """
+        data = bytearray((len(items) + 7) // 8)
+        for row, item in enumerate(items):
+            if predicate(item):
+                data[row >> 3] |= 1 << (row & 7)
+        return cls(int.from_bytes(data, 'little'), len(items))
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Create a `Bitmap` from a sequence of booleans, one for each row.
+
+        The booleans are packed into an int by way of a string of binary digits,
+        so no Python-level loop runs over the rows.
+
+        :param mask: An iterable of booleans, whose positions are their row ids.
+        :return: A new `Bitmap`.
+        """
+        digits = ''.join(map('01'.__getitem__, mask))
+        return cls(int(digits[::-1], 2) if digits else 0, len(digits))
+
+    @classmethod
+    def from_rows(cls, rows, size):
+        """Create a `Bitmap` from an iterable of row ids in the range [0, size)."""
+        data = bytearray((size + 7) // 8)
+        for row in rows:
+            data[row >> 3] |= 1 << (row & 7)
+        return cls(int.from_bytes(data, 'little'), size)
+
+    def _check(self, other):
+        if self.size != other.size:
+            raise ValueError(f"Can't combine bitmaps of {self.size} and {other.size} rows.")
+
+    def __and__(self, other):
+        """Return the rows in both `self` and `other`."""
+        self._check(other)
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        """Return the rows in either `self` or `other`."""
+        self._check(other)
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        """Return the rows not in `self`."""
+        return Bitmap(~self.bits & ((1 << self.size) - 1), self.size)
+
+    def __len__(self):
+        """Return the number of rows in the set."""
+        return _popcount(self.bits)
+
+    def __bool__(self):
+        """Return whether the set has any rows."""
+        return self.bits != 0
+
+    def __contains__(self, row):
+        """Return whether a row id is in the set."""
+        return 0 <= row < self.size and self.bits >> row & 1 == 1
+
+    def __iter__(self):
+        """Generate the row ids in the set, in ascending order."""
+        data = self.bits.to_bytes((self.size + 7) // 8, 'little')
+        for position, byte in enumerate(data):
+            if byte:
+                base = position << 3
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+
+    def __eq__(self, other):
+        """Return whether two bitmaps hold the same rows of the same universe."""
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return self.bits == other.bits and self.size == other.size
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"Bitmap(rows={len(self)}, size={self.size})"
+
+
+class SortedColumn:
+    """The value of an attribute in every row, in ascending order, with the row of each value.
+
+    Rows whose value is unknown (NaN) come last in `rows`, and have no entry in
+    `values`, so no comparison ever matches them.
+    """
+
+    __slots__ = ('values', 'rows')
+
+    def __init__(self, items, key):
+        """Create a new `SortedColumn`.
+
+        :param items: A sequence of items, whose positions are their row ids.
+        :param key: A 1-argument function returning the value (or NaN) of an item's attribute.
+        """
+        values = array('d', map(key, items))
+        known = [row for row, value in enumerate(values) if value == value]
+        order = sorted(known, key=values.__getitem__)
+        self.values = array('d', map(values.__getitem__, order))
+        if len(known) < len(values):
+            order.extend(row for row, value in enumerate(values) if value != value)
+        self.rows = array('i', order)
+
+    @classmethod
+    def from_arrays(cls, values, rows):
+        """Create a `SortedColumn` from its sorted values and rows, such as those saved by `indexes`.
+
+        :param values: A sequence of the known values, in ascending order (such as a `memoryview`).
+        :param rows: A sequence of the row of each value, followed by the rows of unknown values.
+        :return: A new `SortedColumn`.
+        """
+        column = cls.__new__(cls)
+        column.values = values
+        column.rows = rows
+        return column
+
+    def span(self, comparisons):
+        """Find the positions of the values that satisfy every one of some comparisons.
+
+        :param comparisons: An iterable of (op, value) tuples, where each op is one of
+                            `operator.eq`, `operator.lt`, `operator.le`, `operator.gt` or `operator.ge`.
+        :return: A tuple (start, stop), such that the values at positions [start, stop)
+                 are exactly those that satisfy the comparisons, or None if an op isn't supported.
+        """
+        values = self.values
+        start, stop = 0, len(values)
+        for op, value in comparisons:
+            if op in (operator.ge, operator.eq):
+                start = max(start, bisect.bisect_left(values, value))
+            elif op is operator.gt:
+                start = max(start, bisect.bisect_right(values, value))
+            if op in (operator.le, operator.eq):
+                stop = min(stop, bisect.bisect_right(values, value))
+            elif op is operator.lt:
+                stop = min(stop, bisect.bisect_left(values, value))
+            elif op not in (operator.ge, operator.gt, operator.eq):
+                return None
+        return start, max(start, stop)
+
+    def around(self, value):
+        """Generate the positions of the known values, nearest to a value first.
+
+        The value is found by binary search, and the positions are then expanded
+        outward from it one at a time, so the first `k` positions cost O(log n + k).
+        Of two equally near values, the lower comes first.
+
+        :param value: The value to start from.
+        :yield: Positions in the column (whose rows are `rows[position]`).
+        """
+        values = self.values
+        size = len(values)
+        right = bisect.bisect_left(values, value)
+        left = right - 1
+        while left >= 0 and right < size:
+            if value - values[left] <= values[right] - value:
+                yield left
+                left -= 1
+            else:
+                yield right
+                right += 1
+        yield from range(left, -1, -1)
+        yield from range(right, size)
+
+    def bitmap(self, start, stop):
+        """Return the `Bitmap` of the rows of the values at positions [start, stop).
+
+        Only the shorter of the span or the rest of the column is visited.
+        """
+        size = len(self.rows)
+        if stop - start <= size // 2:
+            return Bitmap.from_rows(self.rows[start:stop], size)
+        return ~Bitmap.from_rows(itertools.chain(self.rows[:start], self.rows[stop:]), size)
+
+
+class BitmapIndex:
+    """Lazily-built bitmaps of the boolean attributes of a sequence of close approaches."""
+
+    def __init__(self, approaches, columns=None):
+        """Create a new `BitmapIndex`.
+
+        :param approaches: A sequence of linked `CloseApproach`es, whose positions are their row ids.
+        :param columns: An `ApproachColumnStore` of the extra columns of the approaches, or None.
+        """
+        self._approaches = approaches
+        self.columns = columns
+        self._bitmaps = {}
+        self._sorted = {}
+
+    @property
+    def size(self):
+        """Return the number of rows indexed."""
+        return len(self._approaches)
+
+    def __getitem__(self, name):
+        """Return the bitmap of the rows with a boolean attribute, one of `BITMAP_PREDICATES`."""
+        bitmap = self._bitmaps.get(name)
+        if bitmap is None:
+            bitmap = self._bitmaps[name] = Bitmap.from_predicate(self._approaches,
+                                                                 BITMAP_PREDICATES[name])
+        return bitmap
+
+    def compare(self, column, op, value):
+        """Return the bitmap of the rows whose value in an extra column satisfies a comparison.
+
+        :param column: The name of the column, one of `columns.APPROACH_COLUMNS`.
+        :param op: A 2-argument predicate comparator (such as `operator.le`).
+        :param value: The reference value to compare against.
+        :return: A `Bitmap` of the rows for which `op(row_value, value)` is true.
+        :raises ValueError: If the extra columns of the approaches aren't available.
+        """
+        if self.columns is None:
+            raise ValueError(f"The '{column}' column isn't available for these close approaches.")
+        return Bitmap.from_mask(map(op, self.columns[column], itertools.repeat(value)))
+
+    def sorted_column(self, name):
+        """Return the `SortedColumn` of an attribute, one of `ATTRIBUTE_COLUMNS`, building it if needed."""
+        column = self._sorted.get(name)
+        if column is None:
+            column = self._sorted[name] = SortedColumn(self._approaches, ATTRIBUTE_COLUMNS[name])
+        return column
+
+    def has_sorted_column(self, name):
+        """Return whether the `SortedColumn` of an attribute is available without building it."""
+        return name in self._sorted
+
+    def add_sorted_columns(self, columns):
+        """Use some already-built sorted columns (such as those mapped from an index file).
+
+        :param columns: A dictionary mapping names in `ATTRIBUTE_COLUMNS` to `SortedColumn`s
+                        over exactly these rows.
+        """
+        self._sorted.update(columns)
+
+    def all(self):
+        """Return the bitmap of every row."""
+        return Bitmap((1 << self.size) - 1, self.size)
@@ -0,0 +1,238 @@
+"""Load extra columns of the data files only when they're needed.
+
+`neos.csv` has dozens of columns, but `extract.load_neos` only keeps the few
+that every `NearEarthObject` needs. Similarly, `extract.load_approaches` only
+keeps four of the fields of each record of `cad.json`. The others (such as the
+MOID and orbit class of an NEO, or the 3-sigma minimum distance and the
+uncertainty of the time of a close approach) are made available on demand: the
+first time that a column is requested, its data file is read once more to parse
+just that column, which is then cached - as a compact `array` of floats, or a
+list of interned strings.
+
+A `ColumnStore` holds the extra columns of a file of NEOs. Each NEO loaded by
+`extract.load_neos` holds a reference to the `ColumnStore` of its file and its
+row number within it, so a column value of a single NEO can be read with
+`NearEarthObject.column`.
+
+An `ApproachColumnStore` holds the extra columns of one or more files of close
+approaches. Close approaches don't each keep their row numbers (which would cost
+memory even when no extra column is used); instead, the `NEODatabase` that holds
+them tracks their rows as it queries them. Close approaches added after loading
+(by `snapshot.copy_database`) have no extra columns; an `ExtendedColumns` gives
+them unknown values after the rows of the store they were added to.
+
+Filters on these columns apply their comparison to a whole cached column at
+once (see `filters.ColumnFilter` and `filters.ApproachColumnFilter`).
+
+The `COLUMNS` and `APPROACH_COLUMNS` dictionaries list the supported columns.
+"""
+import csv
+import sys
+from array import array
+
+from compressed import approach_data, open_data
+
+
+def _parse_float(text):
+    """Parse a float, or return NaN if the text is empty or missing."""
+    return float(text) if text else float('nan')
+
+
+def _parse_str(text):
+    """Intern a string, or return None if it's empty or missing."""
+    return sys.intern(text) if text else None
+
+
+# The supported NEO columns: their headers in `neos.csv` and the functions that parse their values.
+COLUMNS = {
+    'magnitude': ('H', _parse_float),
+    'albedo': ('albedo', _parse_float),
+    'eccentricity': ('e', _parse_float),
+    'semi_major_axis': ('a', _parse_float),
+    'perihelion': ('q', _parse_float),
+    'inclination': ('i', _parse_float),
+    'moid': ('moid', _parse_float),
+    'orbit_class': ('class', _parse_str),
+}
+
+# The supported close approach columns: their fields in `cad.json` and the functions that parse them.
+APPROACH_COLUMNS = {
+    'dist_min': ('dist_min', _parse_float),
+    'dist_max': ('dist_max', _parse_float),
+    'v_inf': ('v_inf', _parse_float),
+    'jd': ('jd', _parse_float),
+    't_sigma_f': ('t_sigma_f', _parse_str),
+    'h': ('h', _parse_float),
+}
+
+
+class _LazyColumns:
+    """Lazily-parsed, cached columns of a data file, indexed by row number."""
+
+    # The supported columns, mapped to their names in the data file and their parsers.
+    supported = {}
+
+    def __init__(self, size):
+        """Create a new, empty set of columns for a data file of `size` rows."""
+        self.size = size
+        self._columns = {}
+
+    def __getitem__(self, name):
+        """Return a column, parsing it if it hasn't been already.
+
+        :param name: The name of the column.
+        :return: A sequence of the column's values, indexed by row number.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            self.load(name)
+            column = self._columns[name]
+        return column
+
+    def __contains__(self, name):
+        """Return whether a column has already been parsed and cached."""
+        return name in self._columns
+
+    def load(self, *names):
+        """Parse and cache any of the given columns that aren't cached yet, in one pass.
+
+        :param names: The names of the columns.
+        :raises KeyError: If a column isn't supported.
+        :raises ValueError: If the data no longer has the expected number of rows.
+        """
+        names = [name for name in names if name not in self._columns]
+        if not names:
+            return
+        fields = [self.supported[name] for name in names]
+        for name, (_, parse), column in zip(names, fields, self._read(fields)):
+            if len(column) != self.size:
+                raise ValueError("The data files have changed since they were loaded.")
+            self._columns[name] = array('d', column) if parse is _parse_float else column
+
+    def _read(self, fields):
+        """Read the values of some fields from the data file.
+
+        :param fields: A list of (field name, parser) tuples.
+        :return: A list of the parsed values of each field, as lists.
+        """
+        raise NotImplementedError
+
+
+class ColumnStore(_LazyColumns):
+    """Lazily-parsed, cached columns of a CSV file of near-Earth objects."""
+
+    supported = COLUMNS
+
+    def __init__(self, neo_csv_path, size):
+        """Create a new `ColumnStore`.
+
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param size: The number of NEOs (rows, excluding the header) in the file.
+        """
+        super().__init__(size)
+        self.path = neo_csv_path
+
+    def _read(self, fields):
+        """Read the values of some columns from the CSV file."""
+        with open_data(self.path) as infile:
+            reader = csv.reader(infile)
+            header = next(reader)
+            indices = [(header.index(field), parse) for field, parse in fields]
+            values = [[] for _ in fields]
+            for row in reader:
+                for (index, parse), column in zip(indices, values):
+                    column.append(parse(row[index]))
+        return values
+
+
+class ApproachColumnStore(_LazyColumns):
+    """Lazily-parsed, cached columns of one or more JSON files of close approaches."""
+
+    supported = APPROACH_COLUMNS
+
+    def __init__(self, cad_json_paths, size, order=None):
+        """Create a new `ApproachColumnStore`.
+
+        :param cad_json_paths: Paths to the JSON files containing data about close approaches,
+                               in the order in which their approaches were loaded.
+        :param size: The number of close approaches that were loaded.
+        :param order: If the approaches weren't loaded in the order of the files' records (as
+                      by `federation.load_federated_approaches`), a sequence of the position of
+                      each approach among the records of all of the files, concatenated in order.
+        """
+        super().__init__(size)
+        self.paths = list(cad_json_paths)
+        self.order = order
+
+    def _read(self, fields):
+        """Read the values of some fields from each JSON file, in order."""
+        values = [[] for _ in fields]
+        for path in self.paths:
+            names, records = approach_data(path)
+            indices = [(names.index(field), parse) for field, parse in fields]
+            for record in records:
+                for (index, parse), column in zip(indices, values):
+                    column.append(parse(record[index]))
+        if self.order is not None:
+            values = [list(map(column.__getitem__, self.order)) for column in values]
+        return values
+
+
+class ExtendedColumns(_LazyColumns):
+    """The columns of another set of columns, followed by rows whose values are all unknown."""
+
+    def __init__(self, base, extra):
+        """Create a new `ExtendedColumns`.
+
+        :param base: The `ApproachColumnStore` (or other columns) of the first rows.
+        :param extra: The number of rows to add after them, whose values are NaN or None.
+        """
+        super().__init__(base.size + extra)
+        self.supported = base.supported
+        self.base = base
+        self.extra = extra
+
+    def load(self, *names):
+        """Parse and cache any of the given columns of the base that aren't cached yet, and extend them.
+
+        :param names: The names of the columns.
+        :raises KeyError: If a column isn't supported.
+        :raises ValueError: If the data no longer has the expected number of rows.
+        """
+        names = [name for name in names if name not in self._columns]
+        if not names:
+            return
+        self.base.load(*names)
+        for name in names:
+            _, parse = self.supported[name]
+            column = self.base[name]
+            if parse is _parse_float:
+                self._columns[name] = column + array('d', [float('nan')]) * self.extra
+            else:
+                self._columns[name] = list(column) + [None] * self.extra
+
+
+class ApproachWithColumns:
+    """A close approach, along with the values of some extra columns, for output."""
+
+    __slots__ = ('approach', 'columns')
+
+    def __init__(self, approach, columns):
+        """Create a new `ApproachWithColumns`.
+
+        :param approach: A linked `CloseApproach`.
+        :param columns: A dictionary mapping the names of extra columns to their values.
+        """
+        self.approach = approach
+        self.columns = columns
+
+    def serialize(self, type):
+        """Convert this approach and its extra columns into a serializable form for JSON and CSV."""
+        data = self.approach.serialize(type)
+        data.update(self.columns)
+        return data
+
+    def __str__(self):
+        """Return `str(self)`."""
+        extras = ', '.join(f"{name}={value}" for name, value in self.columns.items())
+        return f"{self.approach} ({extras})"
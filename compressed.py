@@ -0,0 +1,192 @@
+"""Read data files that are compressed with gzip, xz or bzip2, as if they weren't.
+
+Archived copies of `neos.csv` and `cad.json` are often compressed. Rather than
+decompressing them to temporary files first, `--neofile` and `--cadfile` can
+name the compressed files directly. A file is recognized as compressed by its
+extension (`.gz`, `.xz` or `.bz2`) or, failing that, by its first few bytes.
+
+`open_data` opens a data file for reading, compressed or not. A compressed file
+is decompressed by a reader thread, a chunk at a time, into a bounded queue that
+the returned file object reads from - so decompression (which releases the GIL)
+overlaps with parsing, and at most a few chunks of the decompressed data are
+ever held in memory. Nothing is written to disk.
+
+A compressed close approach data file can't be memory-mapped, or loaded whole
+by `json.load` without holding all of its decompressed text, so its records are
+decoded one at a time by `approach_records` (and its field names are found by
+`approach_data` in a separate, earlier pass, since NASA's files list them after
+the data). Features that need byte offsets into the data files - the offset
+sidecar used by `inspect`, and `partition` - only support uncompressed files.
+"""
+import io
+import json
+import pathlib
+import queue
+import threading
+
+# The modules that decompress each kind of compressed file, by extension.
+SUFFIXES = {'.gz': 'gzip', '.xz': 'lzma', '.bz2': 'bz2'}
+
+# The first bytes of each kind of compressed file, and the modules that decompress them.
+_MAGIC = [(b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'lzma'), (b'BZh', 'bz2')]
+
+# The number of decompressed bytes that the reader thread produces at a time.
+CHUNK_SIZE = 1 << 20
+
+# The number of decompressed chunks that may be waiting to be read.
+MAX_CHUNKS = 4
+
+
+def compression(path):
+    """Return the name of the module that decompresses a file, or None if it isn't compressed.
+
+    :param path: A path to a data file.
+    :return: 'gzip', 'lzma' or 'bz2', or None.
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix in SUFFIXES:
+        return SUFFIXES[suffix]
+    try:
+        with open(path, 'rb') as infile:
+            head = infile.read(6)
+    except OSError:
+        return None
+    for magic, codec in _MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def is_compressed(path):
+    """Return whether a data file is compressed."""
+    return compression(path) is not None
+
+
+class DecompressingReader(io.RawIOBase):
+    """A raw binary stream of a compressed file's contents, decompressed by a reader thread.
+
+    The reader thread decompresses one chunk at a time into a bounded queue, and
+    blocks while the queue is full. Any error it meets is raised by the next read.
+    """
+
+    def __init__(self, path, codec, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS):
+        """Create a new `DecompressingReader`, and start its reader thread.
+
+        :param path: A path to a compressed file.
+        :param codec: The name of the module that decompresses it ('gzip', 'lzma' or 'bz2').
+        :param chunk_size: The number of decompressed bytes to produce at a time.
+        :param max_chunks: The number of decompressed chunks that may be waiting to be read.
+        """
+        super().__init__()
+        self._chunks = queue.Queue(max_chunks)
+        self._stopped = threading.Event()
+        self._chunk = memoryview(b'')
+        self._finished = False
+        self._thread = threading.Thread(target=self._decompress, args=(path, codec, chunk_size),
+                                        name=f'decompress {pathlib.Path(path).name}', daemon=True)
+        self._thread.start()
+
+    def _decompress(self, path, codec, chunk_size):
+        """Decompress the file into the queue, ending with an empty chunk (or an error)."""
+        import importlib
+        try:
+            with importlib.import_module(codec).open(path, 'rb') as infile:
+                while not self._stopped.is_set():
+                    chunk = infile.read(chunk_size)
+                    self._put(chunk)
+                    if not chunk:
+                        return
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        """Put an item in the queue once there's room, unless the stream is closed first."""
+        while not self._stopped.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self):
+        """Return True: the stream is readable."""
+        return True
+
+    def readinto(self, buffer):
+        """Read decompressed bytes into a buffer, waiting for the reader thread if necessary.
+
+        :param buffer: A writable bytes-like object.
+        :return: The number of bytes read, or 0 at the end of the file.
+        """
+        while not self._chunk:
+            if self._finished:
+                return 0
+            item = self._chunks.get()
+            if isinstance(item, Exception):
+                self._finished = True
+                raise item
+            if not item:
+                self._finished = True
+                return 0
+            self._chunk = memoryview(item)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self):
+        """Stop the reader thread, and close the stream."""
+        if not self.closed:
+            self._stopped.set()
+            # Make room in the queue, in case the reader thread is waiting for some.
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join()
+        super().close()
+
+
+def open_data(path, mode='r'):
+    """Open a data file for reading, decompressing it on the fly if it's compressed.
+
+    :param path: A path to a data file.
+    :param mode: 'r' to read text, or 'rb' to read bytes.
+    :return: A file object, to be used as a context manager.
+    """
+    codec = compression(path)
+    if codec is None:
+        return open(path, mode)
+    stream = io.BufferedReader(DecompressingReader(path, codec), CHUNK_SIZE)
+    return stream if 'b' in mode else io.TextIOWrapper(stream)
+
+
+def approach_records(cad_json_path):
+    """Generate the records of a close approach data file, compressed or not.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :yield: Each record, as a list of its (raw) values.
+    """
+    if not is_compressed(cad_json_path):
+        with open(cad_json_path) as infile:
+            yield from json.load(infile)['data']
+        return
+    from offsets import iter_approach_records
+    with open_data(cad_json_path, 'rb') as infile:
+        yield from iter_approach_records(infile)
+
+
+def approach_data(cad_json_path):
+    """Read the field names and the records of a close approach data file, compressed or not.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A tuple of a list of the field names, and an iterable of the records.
+    """
+    if not is_compressed(cad_json_path):
+        with open(cad_json_path) as infile:
+            contents = json.load(infile)
+        return contents['fields'], contents['data']
+    from offsets import read_approach_fields
+    with open_data(cad_json_path, 'rb') as infile:
+        fields = read_approach_fields(infile)
+    return fields, approach_records(cad_json_path)
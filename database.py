@@ -11,6 +11,78 @@ data on NEOs and close approaches extracted by `extract.load_neos` and
 
 You'll edit this file in Tasks 2 and 3.
 """
+import itertools
+import math
+import operator
+from array import array
+
+from summaries import NO_FIRST, NO_LAST, NEOSummaries
+
+# If the NEOs selected by NEO-level filters have more than this fraction of all
+# close approaches, scanning every approach beats merging the NEOs' approaches.
+SEMI_JOIN_MAX_SELECTIVITY = 0.5
+
+
+class ApproachView:
+    """A read-only sequence of one NEO's close approaches.
+
+    The approaches of all NEOs are laid out in compressed sparse row (CSR) form:
+    one array of the row ids (positions in the database) of every approach,
+    grouped by NEO, and one array of the offsets at which each NEO's group
+    starts. An `ApproachView` reads one NEO's group out of these shared arrays,
+    so no NEO needs a list of its own. The arrays are built the first time that
+    any view (or NEO-level query) needs them.
+    """
+
+    __slots__ = ('_database', '_index')
+
+    def __init__(self, database, index):
+        """Create a new `ApproachView`.
+
+        :param database: The `NEODatabase` holding the CSR arrays.
+        :param index: The position of the NEO among the database's NEOs.
+        """
+        self._database = database
+        self._index = index
+
+    @property
+    def rows(self):
+        """Return the row ids of the approaches, in ascending order, as an array."""
+        offsets = self._database._offsets
+        return self._database._rows[offsets[self._index]:offsets[self._index + 1]]
+
+    def __len__(self):
+        """Return the number of approaches."""
+        offsets = self._database._offsets
+        return offsets[self._index + 1] - offsets[self._index]
+
+    def __iter__(self):
+        """Generate the approaches, in the order in which they were supplied."""
+        database, index = self._database, self._index
+        offsets = database._offsets
+        return map(database._approaches.__getitem__, database._rows[offsets[index]:offsets[index + 1]])
+
+    def __getitem__(self, index):
+        """Return the approach at an index, or a list of the approaches in a slice."""
+        database = self._database
+        if isinstance(index, slice):
+            return list(map(database._approaches.__getitem__, self.rows[index]))
+        offsets = database._offsets
+        start, stop = offsets[self._index], offsets[self._index + 1]
+        if index < 0:
+            index += stop - start
+        if not 0 <= index < stop - start:
+            raise IndexError("approach index out of range")
+        return database._approaches[database._rows[start + index]]
+
+    @property
+    def summary(self):
+        """Return the `summaries.NEOSummary` of the approaches, computed when they were grouped."""
+        return self._database.summaries[self._index]
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"ApproachView({list(self)!r})"
 
 
 class NEODatabase:
@@ -22,7 +94,7 @@ class NEODatabase:
     querying for close approaches that match criteria.
     """
 
-    def __init__(self, neos, approaches):
+    def __init__(self, neos, approaches, approach_columns=None):
         """Create a new `NEODatabase`.
 
         As a precondition, this constructor assumes that the collections of NEOs
@@ -35,23 +107,120 @@ class NEODatabase:
         constructor modifies the supplied NEOs and close approaches to link them
         together - after it's done, the `.approaches` attribute of each NEO has
         a collection of that NEO's close approaches, and the `.neo` attribute of
-        each close approach references the appropriate NEO.
+        each close approach references the appropriate NEO, and the approach's
+        `._designation` is cleared (its `.designation` is read from the NEO).
 
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
+        :param approach_columns: An `ApproachColumnStore` of the extra columns of the close
+                                 approaches, in the same order, or None.
         """
         self._neos = neos
-        self._approaches = approaches
+        self.approach_columns = approach_columns
+        self._approaches = approaches if isinstance(approaches, list) else list(approaches)
         self._designation_to_neo = {neo.designation: neo for neo in neos}
         self._name_to_neo = {neo.name: neo for neo in self._neos if neo.name is not None}
         """Tried to get a better understanding of caching for Python, leveraged Dicts to cache
          inspect get methods. There can be improvements to get_neo and get approaches. With a refactor could
          be leveraged elsewhere as well. 
          """
+        self._link()
+
+        # The grouping of the approaches by NEO, the search and bitmap indexes (and samples)
+        # are only built the first time that they're needed.
+        self._groups = None
+        self._name_index = None
+        self._bitmap_index = None
+        self._samples = {}
+
+    def _link(self):
+        """Link each close approach to its NEO, and give each NEO a view of its approaches.
+
+        Only the `.neo` of each approach is set here. Grouping the approaches by
+        NEO is left to `_group`, the first time that it's needed, so that queries
+        that never look at an NEO's approaches never pay for it.
+        """
+        designation_to_neo = self._designation_to_neo
         for approach in self._approaches:
-            neo = self._designation_to_neo[approach._designation]
-            approach.neo = neo
-            neo.approaches.append(approach)
+            approach.neo = designation_to_neo[approach._designation]
+            # The NEO holds the designation now, so the approach's copy is redundant.
+            approach._designation = None
+        for index, neo in enumerate(self._neos):
+            neo.approaches = ApproachView(self, index)
+
+    def _group(self):
+        """Group the close approaches by NEO, and summarize each NEO's, with a counting sort.
+
+        Rather than keeping a list of approaches for each NEO, the row ids of the
+        approaches are concatenated, grouped by NEO, into one array, with an array
+        of the offsets at which each NEO's group begins (a CSR layout). A first
+        pass counts the approaches of each NEO, and the prefix sums of the counts
+        are the offsets; a second pass writes each row id at its NEO's cursor, so
+        no list is built for each NEO. Within a group, approaches keep the order in
+        which they were supplied - time order, for the data files. The second pass
+        also keeps the summary of each NEO's approaches (see `summaries`).
+
+        The grouping is built once, completely, and then stored with a single
+        assignment, so concurrent readers never see it half-built.
+
+        :return: A tuple of the array of row ids, the array of offsets, and the `NEOSummaries`.
+        """
+        if self._groups is not None:
+            return self._groups
+        approaches = self._approaches
+        neos = self._neos
+        # NEOs hash by identity, so they key the positions directly.
+        neo_ids = {neo: index for index, neo in enumerate(neos)}
+        ids = list(map(neo_ids.__getitem__, map(operator.attrgetter('neo'), approaches)))
+        # The counters are lists, which index faster than arrays, and only the
+        # results are packed into arrays.
+        counts = [0] * len(neos)
+        for index in ids:
+            counts[index] += 1
+        cursors = [0]
+        cursors.extend(itertools.accumulate(counts))
+        offsets = array('l', cursors)
+        rows = array('i', [0]) * len(approaches)
+        closest = [math.inf] * len(neos)
+        fastest = [-math.inf] * len(neos)
+        first = [NO_FIRST] * len(neos)
+        last = [NO_LAST] * len(neos)
+        for row, (index, approach) in enumerate(zip(ids, approaches)):
+            cursor = cursors[index]
+            rows[cursor] = row
+            cursors[index] = cursor + 1
+            distance, velocity, minutes = approach.distance, approach.velocity, approach.minutes
+            if distance < closest[index]:
+                closest[index] = distance
+            if velocity > fastest[index]:
+                fastest[index] = velocity
+            if minutes < first[index]:
+                first[index] = minutes
+            if minutes > last[index]:
+                last[index] = minutes
+
+        self._groups = (rows, offsets, NEOSummaries(neos, counts, closest, fastest, first, last))
+        return self._groups
+
+    @property
+    def _rows(self):
+        """Return the row ids of the close approaches, grouped by NEO (see `_group`)."""
+        return self._group()[0]
+
+    @property
+    def _offsets(self):
+        """Return the offsets at which each NEO's group of row ids begins (see `_group`)."""
+        return self._group()[1]
+
+    @property
+    def summaries(self):
+        """Return the `summaries.NEOSummaries` of the close approaches of each NEO."""
+        return self._group()[2]
+
+    @property
+    def neos(self):
+        """Return the collection of `NearEarthObject`s, which mustn't be modified."""
+        return self._neos
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -88,6 +257,206 @@ class NEODatabase:
         else:
             return None
 
+    def get_approach_by_row(self, row):
+        """Return the close approach in a row (its position in the database).
+
+        :param row: The row of a close approach, as generated by `query_rows`.
+        :return: The `CloseApproach` in that row.
+        """
+        return self._approaches[row]
+
+    def search(self, text, limit=10):
+        """Find NEOs whose names or primary designations match some search text.
+
+        Unlike `get_neo_by_name`, the matching is case-insensitive, and partial
+        names (prefixes) and slightly misspelled names also match. Exact matches
+        are ranked first, then prefix matches, then misspellings.
+
+        :param text: The search text, such as a partial name or designation.
+        :param limit: The maximum number of matches to return.
+        :return: A list of at most `limit` matching `NearEarthObject`s, best matches first.
+        """
+        if self._name_index is None:
+            from search import NameIndex
+            self._name_index = NameIndex(self._neos)
+        return self._name_index.search(text, limit)
+
+    @property
+    def bitmaps(self):
+        """Return the `BitmapIndex` over the rows (positions) of the close approaches."""
+        if self._bitmap_index is None:
+            from bitmap import BitmapIndex
+            self._bitmap_index = BitmapIndex(self._approaches, self.approach_columns)
+        return self._bitmap_index
+
+    def sample(self, size=None, seed=0):
+        """Return a `StratifiedSample` of the close approaches, for estimating query results.
+
+        Samples are kept, so repeated estimates with the same size and seed reuse one sample.
+
+        :param size: The approximate number of close approaches to sample, or None for the default.
+        :param seed: The seed of the random number generator.
+        :return: A `sample.StratifiedSample`.
+        """
+        from sample import StratifiedSample, DEFAULT_SAMPLE_SIZE
+        size = DEFAULT_SAMPLE_SIZE if size is None else size
+        sample = self._samples.get((size, seed))
+        if sample is None:
+            sample = self._samples[size, seed] = StratifiedSample(self._approaches, size, seed,
+                                                                  self.approach_columns)
+        return sample
+
+    def _bitmap_rows(self, filters):
+        """Combine the bitmaps of the filters that have them.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of the `Bitmap` of rows matching every filter that has a bitmap
+                 (or None if none do) and a list of the filters that don't.
+        """
+        rows = None
+        residual = []
+        for f in filters:
+            bitmap = f.bitmap(self.bitmaps) if getattr(f, 'bitmap_name', None) else None
+            if bitmap is None:
+                residual.append(f)
+            else:
+                rows = bitmap if rows is None else rows & bitmap
+        return rows, residual
+
+    def _sorted_rows(self, filters):
+        """Combine the spans of the filters on attributes whose sorted columns are already available.
+
+        No sorted column is built: if there's no `BitmapIndex` yet, or it doesn't
+        have a filter's column, the filter is left for the caller.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of the `Bitmap` of rows matching every filter that was found from a
+                 sorted column (or None if none were) and a list of the other filters.
+        """
+        index = self._bitmap_index
+        if index is None:
+            return None, list(filters)
+        ranges = {}
+        residual = []
+        for f in filters:
+            name = getattr(f, 'index_column', None)
+            if name and index.has_sorted_column(name):
+                ranges.setdefault(name, []).append(f)
+            else:
+                residual.append(f)
+
+        rows = None
+        for name, range_filters in ranges.items():
+            column = index.sorted_column(name)
+            span = column.span((f.op, f.index_value()) for f in range_filters)
+            if span is None:
+                residual.extend(range_filters)
+                continue
+            bitmap = column.bitmap(*span)
+            rows = bitmap if rows is None else rows & bitmap
+        return rows, residual
+
+    def _neo_ids(self, neo_filters):
+        """Return the positions of the NEOs that satisfy every one of some NEO-level filters."""
+        mask = None
+        for f in neo_filters:
+            matches = f.neo_mask(self._neos)
+            mask = matches if mask is None else list(map(operator.and_, mask, matches))
+        return list(itertools.compress(range(len(self._neos)), mask))
+
+    def _single_span(self, filters):
+        """Find the matches of filters on just one sorted column, as a span of the column.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The (start, stop) positions of the matching values in the `SortedColumn`,
+                 or None unless every filter is on the same sorted column.
+        """
+        columns = set(getattr(f, 'index_column', None) for f in filters)
+        if len(columns) != 1 or None in columns:
+            return None
+        column = self.bitmaps.sorted_column(columns.pop())
+        return column.span((f.op, f.index_value()) for f in filters)
+
+    def _indexed_rows(self, filters):
+        """Find the rows that match a collection of filters from indexes alone.
+
+        Boolean and extra-column filters use their bitmaps, range filters on
+        sorted columns use binary search, and NEO-level filters select the rows
+        of the matching NEOs. No close approach is visited.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A `Bitmap` of the matching rows, or None if some filter can't use an index.
+        """
+        from bitmap import Bitmap
+        rows, residual = self._bitmap_rows(filters)
+        ranges = {}
+        neo_filters = []
+        for f in residual:
+            if getattr(f, 'index_column', None):
+                ranges.setdefault(f.index_column, []).append(f)
+            elif getattr(f, 'neo_level', False):
+                neo_filters.append(f)
+            else:
+                return None
+
+        bitmaps = []
+        for name, range_filters in ranges.items():
+            column = self.bitmaps.sorted_column(name)
+            span = column.span((f.op, f.index_value()) for f in range_filters)
+            if span is None:
+                return None
+            bitmaps.append(column.bitmap(*span))
+        if neo_filters:
+            offsets = self._offsets
+            bitmaps.append(Bitmap.from_rows(itertools.chain.from_iterable(
+                self._rows[offsets[index]:offsets[index + 1]] for index in self._neo_ids(neo_filters)),
+                len(self._approaches)))
+
+        for bitmap in bitmaps:
+            rows = bitmap if rows is None else rows & bitmap
+        return self.bitmaps.all() if rows is None else rows
+
+    def count(self, filters=()):
+        """Count the close approaches that match a collection of filters.
+
+        The count is found from indexes wherever possible, without creating or
+        visiting any `CloseApproach`: a single range of one attribute (such as
+        distance, velocity or date) is counted by binary search on a sorted
+        column, and any other combination of indexed filters by combining
+        bitmaps (see `_indexed_rows`).
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The number of matching `CloseApproach` objects.
+        """
+        if not filters:
+            return len(self._approaches)
+        span = self._single_span(filters)
+        if span is not None:
+            return span[1] - span[0]
+        rows = self._indexed_rows(filters)
+        if rows is not None:
+            return len(rows)
+        return sum(1 for _ in self.query_rows(filters))
+
+    def exists(self, filters=()):
+        """Return whether any close approach matches a collection of filters.
+
+        Like `count`, this is answered from indexes wherever possible; otherwise,
+        the query stops at the first match.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: True if at least one `CloseApproach` matches every filter.
+        """
+        if not filters:
+            return bool(self._approaches)
+        span = self._single_span(filters)
+        if span is not None:
+            return span[1] > span[0]
+        rows = self._indexed_rows(filters)
+        if rows is not None:
+            return bool(rows)
+        return next(self.query_rows(filters), None) is not None
+
     def query(self, filters=()):
         """Query close approaches to generate those that match a collection of filters.
 
@@ -102,6 +471,141 @@ class NEODatabase:
         :param filters: A collection of filters capturing user-specified criteria.
         :return: A stream of matching `CloseApproach` objects.
         """
-        for approach in self._approaches:
+        for _, approach in self.query_rows(filters):
+            yield approach
+
+    def query_rows(self, filters=()):
+        """Query close approaches to generate those that match a collection of filters, with their rows.
+
+        This is `query`, but each matching `CloseApproach` is generated along
+        with its row - its position in the database - which can be used to look
+        up its extra columns with `column_values`.
+
+        Filters that have bitmaps (such as hazardousness, or comparisons on the
+        extra columns of the close approach data) are evaluated for every row at
+        once, by combining bitmaps, and only the approaches in the resulting rows
+        are visited.
+
+        Other filters whose outcome depends only on an approach's NEO (those with
+        a true `neo_level`) are evaluated once per NEO, rather than once per
+        approach - filters on extra columns of the NEO data file compare a whole
+        cached column at once. If only a few NEOs match, just their approaches
+        are visited, merged back into internal order, and the remaining filters
+        are applied to them; otherwise, every approach is scanned, and only
+        membership of its NEO among the matches is checked.
+
+        Filters on an attribute whose sorted column is already available (because
+        it was mapped from an index file, or built by an earlier count) are found
+        by binary search on the column instead, and narrow the rows to visit.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of (row, `CloseApproach`) tuples.
+        """
+        approaches = self._approaches
+        ranged, filters = self._sorted_rows(filters)
+        neo_filters = [f for f in filters if getattr(f, 'neo_level', False)]
+        if all(getattr(f, 'bitmap_name', None) for f in neo_filters):
+            rows, filters = self._bitmap_rows(filters)
+        else:
+            # Every NEO-level filter is decided per NEO, even if it has a bitmap.
+            rows, filters = self._bitmap_rows([f for f in filters if not getattr(f, 'neo_level', False)])
+            ids = self._neo_ids(neo_filters)
+            offsets = self._offsets
+            selected = sum(offsets[index + 1] - offsets[index] for index in ids)
+
+            if selected <= SEMI_JOIN_MAX_SELECTIVITY * len(approaches):
+                # Each NEO's row ids are ascending, so sorting their concatenation just
+                # merges them back into the database's internal order.
+                candidates = sorted(itertools.chain.from_iterable(
+                    self._rows[offsets[index]:offsets[index + 1]] for index in ids))
+                if rows is None:
+                    rows = candidates
+                else:
+                    from bitmap import Bitmap
+                    rows = Bitmap.from_rows(candidates, len(approaches)) & rows
+            else:
+                neos = set(self._neos[index] for index in ids)
+                filters = [lambda approach: approach.neo in neos] + filters
+
+        if ranged is not None:
+            if rows is None:
+                rows = ranged
+            elif isinstance(rows, list):
+                rows = [row for row in rows if row in ranged]
+            else:
+                rows = rows & ranged
+
+        for row in (range(len(approaches)) if rows is None else rows):
+            approach = approaches[row]
+            if all(f(approach) for f in filters):
+                yield row, approach
+
+    def nearest(self, minutes, filters=()):
+        """Generate the close approaches that match a collection of filters, nearest in time first.
+
+        The instant is found by binary search on the sorted 'time' column, which
+        then expands outward from it, so the nearest `k` matches cost O(log n + k)
+        if the filters are not too selective. Filters on the extra columns of the
+        close approach data are decided by their bitmaps, and any other filter is
+        applied to each approach as it's reached.
+
+        :param minutes: The instant, in minutes since `helpers.EPOCH`.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects, in order of their distance in time.
+        """
+        from filters import ApproachColumnFilter
+        rows, _ = self._bitmap_rows([f for f in filters if isinstance(f, ApproachColumnFilter)])
+        filters = [f for f in filters if not isinstance(f, ApproachColumnFilter)]
+        approaches = self._approaches
+        column = self.bitmaps.sorted_column('time')
+        for position in column.around(minutes):
+            row = column.rows[position]
+            if rows is not None and row not in rows:
+                continue
+            approach = approaches[row]
             if all(f(approach) for f in filters):
                 yield approach
+
+    def query_neos(self, filters=(), sort_by=None, reverse=False):
+        """Query the summaries of the close approaches of the NEOs that match a collection of filters.
+
+        The summaries are computed once, as the approaches are grouped by NEO,
+        so no close approach is visited again: NEO-level filters are decided once per NEO, and
+        `summaries.SummaryFilter`s compare a whole column of the summaries.
+
+        :param filters: A collection of NEO-level filters and `SummaryFilter`s.
+        :param sort_by: The statistic to sort by, one of `summaries.SUMMARY_COLUMNS`, or
+                        None to keep the order of the NEOs.
+        :param reverse: If sorting, whether to sort in descending order.
+        :return: A stream of the matching `summaries.NEOSummary` objects.
+        """
+        summaries = self.summaries
+        mask = None
+        for f in filters:
+            matches = f.summary_mask(summaries) if hasattr(f, 'summary_mask') else f.neo_mask(self._neos)
+            mask = matches if mask is None else list(map(operator.and_, mask, matches))
+        indices = range(len(self._neos))
+        indices = list(indices if mask is None else itertools.compress(indices, mask))
+        if sort_by:
+            indices = summaries.order(indices, sort_by, reverse=reverse)
+        return map(summaries.__getitem__, indices)
+
+    def column_values(self, row, approach, names):
+        """Look up the values of extra columns for a close approach and its NEO.
+
+        :param row: The row of the close approach, as generated by `query_rows`.
+        :param approach: The `CloseApproach` in that row.
+        :param names: The names of columns, each in `columns.COLUMNS` or `columns.APPROACH_COLUMNS`.
+        :return: A dictionary mapping each column name to its value.
+        :raises ValueError: If the extra columns of the close approaches aren't available.
+        """
+        from columns import APPROACH_COLUMNS
+        values = {}
+        for name in names:
+            if name in APPROACH_COLUMNS:
+                if self.approach_columns is None:
+                    raise ValueError(f"The '{name}' column isn't available for these close approaches.")
+                values[name] = self.approach_columns[name][row]
+            else:
+                values[name] = approach.neo.column(name)
+        return values
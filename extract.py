@@ -7,31 +7,63 @@ The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
 `CloseApproach` objects.
 
+Either file may be compressed (see `compressed`).
+
 The main module calls these functions with the arguments provided at the command
 line, and uses the resulting collections to build an `NEODatabase`.
 
 You'll edit this file in Task 2.
 """
 import csv
-import json
+import sys
 
+from columns import ColumnStore
+from compressed import approach_records, open_data
 from models import NearEarthObject, CloseApproach
 
+
+def parse_neo(row):
+    """Build a `NearEarthObject` from one row of the NEO CSV file.
+
+    The designation and name are interned, so that every copy of them (such as
+    the designations in the close approach data) shares a single string.
+
+    :param row: A sequence of the string fields of a single row of `neos.csv`.
+    :return: A new, unlinked `NearEarthObject`.
+    """
+    return NearEarthObject(sys.intern(str(row[4])), sys.intern(row[3]), row[7], row[15])
+
+
+def parse_approach(record):
+    """Build a `CloseApproach` from one record of the close approach JSON file.
+
+    :param record: A sequence of the fields of a single entry in the `data` of `cad.json`.
+    :return: A new, unlinked `CloseApproach`.
+    """
+    return CloseApproach(sys.intern(record[0]), record[3], record[4], record[7])
+
 # @cache
 
 
 def load_neos(neo_csv_path):
     """Read near-Earth object information from a CSV file.
 
+    The other columns of the file aren't parsed now, but each NEO is given a
+    reference to a shared `ColumnStore` that parses them when they're needed.
+
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
     :return: A collection of `NearEarthObject`s.
     """
     neos = []  # Map from code -> name
-    with open(neo_csv_path) as x:
+    with open_data(neo_csv_path) as x:
         reader = csv.reader(x)
         next(reader, None)
         for line in reader:
-            neos.append(NearEarthObject(str(line[4]), line[3], line[7], line[15]))
+            neos.append(parse_neo(line))
+    columns = ColumnStore(neo_csv_path, len(neos))
+    for row, neo in enumerate(neos):
+        neo._columns = columns
+        neo._row = row
     # print(neos)
     return neos
 
@@ -44,10 +76,4 @@ def load_approaches(cad_json_path):
     :param cad_json_path: A path to a JSON file containing data about close approaches.
     :return: A collection of `CloseApproach`es.
     """
-    close_approaches = []
-    with open(cad_json_path) as x:
-        data = json.load(x)['data']
-        for y in data:
-            close_approaches.append(CloseApproach(y[0], y[3], y[4], y[7]))
-        # print(close_approaches[1])
-        return close_approaches
+    return [parse_approach(record) for record in approach_records(cad_json_path)]
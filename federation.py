@@ -0,0 +1,147 @@
+"""Load close approaches from a federation of data files, such as one file per year.
+
+Close approach data is often kept as several files in the format of `cad.json`
+(for example, one for each year) rather than as one big file. The `--cadfile`
+option of the main module accepts a glob pattern (such as `data/cad-*.json`) or
+a directory of such files, as well as a single file.
+
+The `cad_paths` function resolves any of these into a list of paths, and
+`load_federated_approaches` loads them all into a single time-ordered sequence
+of close approaches, without an explicit merge step:
+
+- Each file is parsed and scanned (for the approaches within a requested range
+  of dates) by a worker thread, so reading one file overlaps with parsing
+  another, and each file's approaches are sorted by time. Only a few files
+  (`LOAD_WORKERS`) are loaded at once.
+- The sorted streams of the files are then combined by `heapq.merge` into one
+  time-ordered stream. The merge waits for each file as it needs it, and each
+  approach is released from its file's list as it's merged, so the files'
+  lists shrink while the merged list grows.
+- Approaches that appear in more than one file (with the same designation and
+  time) are dropped as they're merged. Duplicates have equal times, so they're
+  adjacent in the merged stream, and only the keys of the approaches at the
+  current time need to be remembered.
+
+Unlike a time-partitioned data set (see `partition`), a federation needs no
+manifest, but every file has to be read.
+"""
+import glob
+import heapq
+import math
+import pathlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from compressed import SUFFIXES
+from extract import load_approaches
+from helpers import datetime_to_minutes
+
+# Characters that mark a `--cadfile` as a glob pattern rather than a path.
+GLOB_CHARACTERS = frozenset('*?[')
+
+# The number of files loaded at once by default. Parsing a file holds the GIL, so
+# beyond overlapping one file's reading with another's parsing, more threads only
+# hold more parsed files in memory at once.
+LOAD_WORKERS = 2
+
+
+def cad_paths(pattern):
+    """Resolve a path, directory, or glob pattern of close approach data files into paths.
+
+    :param pattern: A path to a JSON file, a directory of (possibly compressed) JSON files,
+                    or a glob pattern.
+    :return: A sorted list of the paths of the JSON files.
+    :raises FileNotFoundError: If a glob pattern or directory matches no files.
+    """
+    text = str(pattern)
+    if GLOB_CHARACTERS.intersection(text):
+        paths = [pathlib.Path(path) for path in sorted(glob.glob(text))]
+    elif pathlib.Path(text).is_dir():
+        paths = sorted(path for pattern in ['*.json'] + [f'*.json{suffix}' for suffix in SUFFIXES]
+                       for path in pathlib.Path(text).glob(pattern))
+    else:
+        return [pathlib.Path(text)]
+    if not paths:
+        raise FileNotFoundError(f"No close approach data files match '{text}'.")
+    return paths
+
+
+def _load_sorted(path, start_date=None, end_date=None):
+    """Load the close approaches of a file within a range of dates, sorted by time.
+
+    :return: A tuple of a list of (approach, position) tuples, where `position` is the index
+             of the approach's record within the file, sorted (stably) by the approaches'
+             times, and the number of records in the file.
+    """
+    approaches = load_approaches(path)
+    start = -math.inf if start_date is None else datetime_to_minutes(start_date)
+    end = math.inf if end_date is None else datetime_to_minutes(end_date) + 1440
+    pairs = [(approach, position) for position, approach in enumerate(approaches)
+             if start <= approach.minutes < end]
+    pairs.sort(key=lambda pair: pair[0].minutes)
+    return pairs, len(approaches)
+
+
+def _stream(futures):
+    """Generate the (approach, position) tuples loaded by the last of a list of futures.
+
+    The future is only waited for once the merge asks for its first approach, and
+    the positions are offset by the number of records in the files of the futures
+    before it. Each tuple is released from the loaded list as it's generated, so a
+    file's tuples don't outlive its part of the merge.
+
+    :param futures: The futures of `_load_sorted` for the files up to, and including, this one.
+    :yield: The (approach, position) tuples of the last file, in time order.
+    """
+    *earlier, future = futures
+    pairs, _ = future.result()
+    offset = sum(earlier_future.result()[1] for earlier_future in earlier)
+    pairs.reverse()
+    while pairs:
+        approach, position = pairs.pop()
+        yield approach, offset + position
+
+
+def merge_approaches(streams):
+    """Merge streams of close approaches, each sorted by time, dropping duplicates.
+
+    Two approaches are duplicates if they have the same designation and time;
+    the first one (from the earliest stream) is kept.
+
+    :param streams: A list of iterables of (approach, position) tuples, each sorted by time.
+    :yield: The unique (approach, position) tuples, in time order.
+    """
+    current_time = None
+    seen = set()
+    for approach, position in heapq.merge(*streams, key=lambda pair: pair[0].minutes):
+        if approach.minutes != current_time:
+            current_time = approach.minutes
+            seen.clear()
+        if approach.designation in seen:
+            continue
+        seen.add(approach.designation)
+        yield approach, position
+
+
+def load_federated_approaches(paths, start_date=None, end_date=None, max_workers=LOAD_WORKERS):
+    """Load the close approaches of several files into one time-ordered list.
+
+    Approaches outside of the range of dates are skipped as each file is scanned.
+
+    :param paths: The paths of JSON files containing data about close approaches.
+    :param start_date: A `date` before which close approaches are not needed, or None.
+    :param end_date: A `date` after which close approaches are not needed, or None.
+    :param max_workers: The maximum number of files to load at once.
+    :return: A tuple of the list of unique `CloseApproach`es, in time order, and an array
+             holding, for each of them, the position of its record among the records of
+             all of the files, concatenated in order (for `columns.ApproachColumnStore`).
+    """
+    approaches = []
+    positions = array('l')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_load_sorted, path, start_date, end_date) for path in paths]
+        streams = [_stream(futures[:index + 1]) for index in range(len(futures))]
+        for approach, position in merge_approaches(streams):
+            approaches.append(approach)
+            positions.append(position)
+    return approaches, positions
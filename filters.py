@@ -16,9 +16,18 @@ iterator.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import math
 import operator
 import itertools
 
+from helpers import datetime_to_minutes
+
+# The SQL comparison operators equivalent to the comparators of filters.
+SQL_OPERATORS = {
+    operator.eq: '=', operator.ne: '!=',
+    operator.lt: '<', operator.le: '<=', operator.gt: '>', operator.ge: '>=',
+}
+
 
 class UnsupportedCriterionError(NotImplementedError):
     """A filter criterion is unsupported."""
@@ -38,8 +47,39 @@ class AttributeFilter:
 
     Concrete subclasses can override the `get` classmethod to provide custom
     behavior to fetch a desired attribute from the given `CloseApproach`.
+
+    Some attributes belong to the approach's NEO rather than to the approach
+    itself. The subclasses for these set `neo_level` and override the `get_neo`
+    classmethod to fetch the attribute from a `NearEarthObject`, so that the
+    `NEODatabase` can evaluate them once per NEO instead of once per approach.
+
+    Filters on a boolean attribute that has a bitmap in a `bitmap.BitmapIndex`
+    set `bitmap_name`, so that the `NEODatabase` can find all of their matching
+    approaches at once, by combining bitmaps. Similarly, filters on an attribute
+    that has a sorted column in a `BitmapIndex` set `index_column`, so that the
+    `NEODatabase` can count their matching approaches by binary search (and find
+    them that way, if the column was mapped from an index file).
+
+    Filters that can be evaluated by SQLite (see `sqlstore`) set `sql_column` to
+    the column of the `approaches` (`a`) or `neos` (`n`) table that holds their
+    attribute, and `sql` translates them into a parameterized predicate. SQL
+    comparisons with NULL (an unknown value) are never true, just like those of
+    the Python filters with NaN.
     """
 
+    # Whether this filter's outcome depends only on an approach's NEO.
+    neo_level = False
+
+    # The name of the bitmap in a `BitmapIndex` holding the rows where this filter's
+    # attribute is true, if there is one.
+    bitmap_name = None
+
+    # The name of the sorted column in a `BitmapIndex` holding this filter's attribute, if there is one.
+    index_column = None
+
+    # The SQL column (qualified by its table's alias in `sqlstore`) holding this filter's attribute.
+    sql_column = None
+
     def __init__(self, op, value):
         """Construct a new `AttributeFilter` from an binary predicate and a reference value.
 
@@ -70,6 +110,51 @@ class AttributeFilter:
         """
         raise UnsupportedCriterionError
 
+    @classmethod
+    def get_neo(cls, neo):
+        """Get an attribute of interest from a near-Earth object.
+
+        Concrete subclasses that set `neo_level` must override this method to
+        get an attribute of interest from the supplied `NearEarthObject`.
+
+        :param neo: A `NearEarthObject` on which to evaluate this filter.
+        :return: The value of an attribute of interest, comparable to `self.value` via `self.op`.
+        """
+        raise UnsupportedCriterionError
+
+    def matches_neo(self, neo):
+        """Return whether every close approach of an NEO satisfies this (NEO-level) filter."""
+        return self.op(self.get_neo(neo), self.value)
+
+    def neo_mask(self, neos):
+        """Return a list of whether each of a sequence of NEOs satisfies this (NEO-level) filter."""
+        return list(map(self.matches_neo, neos))
+
+    def index_value(self):
+        """Return the reference value, in the form of the values of the `index_column`."""
+        return self.value
+
+    def sql(self):
+        """Translate this filter into a predicate for the SQL query of `sqlstore`.
+
+        :return: A tuple of a SQL expression, with `?` placeholders, and a list of the
+                 values of its parameters, or None if this filter can't be translated.
+        """
+        if self.sql_column is None or self.op not in SQL_OPERATORS:
+            return None
+        return f"{self.sql_column} {SQL_OPERATORS[self.op]} ?", [self.value]
+
+    def bitmap(self, index):
+        """Return the `Bitmap` of the rows that satisfy this filter, if it can be found from an index.
+
+        :param index: A `BitmapIndex` over the close approaches being queried.
+        :return: A `Bitmap` of exactly the matching rows, or None.
+        """
+        if self.bitmap_name is None or self.op not in (operator.eq, operator.ne):
+            return None
+        rows = index[self.bitmap_name]
+        return rows if (self.op is operator.eq) == bool(self.value) else ~rows
+
     def __repr__(self):
         """Class methods that are leveraged the filter method.
 
@@ -79,21 +164,71 @@ class AttributeFilter:
 
 
 class TimeFilter(AttributeFilter):
-    """Time filter that handles time-based filtering."""
+    """Time filter that handles time-based filtering.
+
+    Close approaches keep their times in minutes since `helpers.EPOCH`, so the
+    reference date is converted once into the range of minutes from its midnight
+    to the next, and each approach's time is compared with the range's ends -
+    no `datetime` or `date` is built for any approach.
+    """
+
+    index_column = 'date'
+    sql_column = 'a.time'
 
     def __init__(self, op, value):
         """Initialize the super class for time filter, takes operator and value."""
         super().__init__(op, value)
+        start = datetime_to_minutes(value)
+        end = start + 1440
+        # The half-open range of minutes that match, or that don't match for `ne`.
+        self.minutes = {
+            operator.eq: (start, end), operator.ne: (start, end),
+            operator.lt: (-math.inf, start), operator.le: (-math.inf, end),
+            operator.gt: (end, math.inf), operator.ge: (start, math.inf),
+        }.get(op)
+
+    def __call__(self, approach):
+        """Invoke `self(approach)`."""
+        if self.minutes is None:
+            return super().__call__(approach)
+        start, end = self.minutes
+        return (start <= approach.minutes < end) is not (self.op is operator.ne)
 
     @classmethod
     def get(cls, value):
         """Return a date from the date time object."""
         return value.time.date()
 
+    def index_value(self):
+        """Return the reference date as an ordinal, like the values of the 'date' column."""
+        return self.value.toordinal()
+
+    def sql(self):
+        """Translate this filter into a range of times, in minutes since `helpers.EPOCH`.
+
+        The SQL column holds times rather than dates, so a date becomes the range of
+        minutes from its midnight to the next, which can still be found on an index.
+        """
+        if self.minutes is None or self.op is operator.ne:
+            return None
+        conditions = []
+        parameters = []
+        start, end = self.minutes
+        if start != -math.inf:
+            conditions.append(f"{self.sql_column} >= ?")
+            parameters.append(start)
+        if end != math.inf:
+            conditions.append(f"{self.sql_column} < ?")
+            parameters.append(end)
+        return ' AND '.join(conditions), parameters
+
 
 class DistanceFilter(AttributeFilter):
     """Distance filter that handles distance-based filtering."""
 
+    index_column = 'distance'
+    sql_column = 'a.distance'
+
     def __init__(self, op, value):
         """Initialize the super class for distance filter, takes operator and value."""
         super().__init__(op, value)
@@ -107,6 +242,9 @@ class DistanceFilter(AttributeFilter):
 class VelocityFilter(AttributeFilter):
     """Velocity filter that handles velocity-based filtering."""
 
+    index_column = 'velocity'
+    sql_column = 'a.velocity'
+
     def __init__(self, op, value):
         """Initialize the super class for velocity filter, takes operator and value."""
         super().__init__(op, value)
@@ -120,6 +258,10 @@ class VelocityFilter(AttributeFilter):
 class DiameterFilter(AttributeFilter):
     """Diameter filter that handles diameter-based filtering."""
 
+    neo_level = True
+    index_column = 'diameter'
+    sql_column = 'n.diameter'
+
     def __init__(self, op, value):
         """Initialize the super class for diameter filter, takes operator and value."""
         super().__init__(op, value)
@@ -127,12 +269,21 @@ class DiameterFilter(AttributeFilter):
     @classmethod
     def get(cls, value):
         """Return diameter from the neo class."""
-        return value.neo.diameter
+        return cls.get_neo(value.neo)
+
+    @classmethod
+    def get_neo(cls, neo):
+        """Return diameter from the neo class."""
+        return neo.diameter
 
 
 class HazFilter(AttributeFilter):
     """Haz filter that handles hazard-based filtering, takes true/false values."""
 
+    neo_level = True
+    bitmap_name = 'hazardous'
+    sql_column = 'n.hazardous'
+
     def __init__(self, op, value):
         """Initialize the super class for hazardous filter, takes operator and value."""
         super().__init__(op, value)
@@ -140,7 +291,169 @@ class HazFilter(AttributeFilter):
     @classmethod
     def get(cls, value):
         """Return hazard boolean from the neo class."""
-        return value.neo.hazardous
+        return cls.get_neo(value.neo)
+
+    @classmethod
+    def get_neo(cls, neo):
+        """Return hazard boolean from the neo class."""
+        return neo.hazardous
+
+
+class KnownDiameterFilter(AttributeFilter):
+    """Filter on whether the diameter of an approach's NEO is known, takes true/false values."""
+
+    neo_level = True
+    bitmap_name = 'has_diameter'
+    sql_column = 'n.diameter'
+
+    @classmethod
+    def get(cls, value):
+        """Return whether the diameter of the approach's NEO is known."""
+        return cls.get_neo(value.neo)
+
+    @classmethod
+    def get_neo(cls, neo):
+        """Return whether the diameter of the NEO is known (not NaN)."""
+        return neo.diameter == neo.diameter
+
+    def sql(self):
+        """Translate this filter into a test of whether the diameter is NULL."""
+        return _sql_is_null(self)
+
+
+class NamedFilter(AttributeFilter):
+    """Filter on whether an approach's NEO has an IAU name, takes true/false values."""
+
+    neo_level = True
+    bitmap_name = 'has_name'
+    sql_column = 'n.name'
+
+    @classmethod
+    def get(cls, value):
+        """Return whether the approach's NEO has a name."""
+        return cls.get_neo(value.neo)
+
+    @classmethod
+    def get_neo(cls, neo):
+        """Return whether the NEO has a name."""
+        return neo.name is not None
+
+    def sql(self):
+        """Translate this filter into a test of whether the name is NULL."""
+        return _sql_is_null(self)
+
+
+class ColumnFilter(AttributeFilter):
+    """A general superclass for filters on extra columns of the NEO data file.
+
+    Concrete subclasses set `column` to the name of a column in
+    `columns.COLUMNS`. Rather than reading the column for one NEO at a time, a
+    `ColumnFilter` compares its reference value against the whole cached column
+    at once in `neo_mask`. NEOs without a value for the column never match.
+    """
+
+    neo_level = True
+
+    # The name of the filtered column, one of `columns.COLUMNS`.
+    column = None
+
+    @property
+    def sql_column(self):
+        """Return the SQL column of the filtered column, in the `neos` table."""
+        return f"n.{self.column}"
+
+    @classmethod
+    def get(cls, value):
+        """Return the column's value for the approach's NEO."""
+        return cls.get_neo(value.neo)
+
+    @classmethod
+    def get_neo(cls, neo):
+        """Return the column's value for the NEO."""
+        return neo.column(cls.column)
+
+    def __call__(self, approach):
+        """Invoke `self(approach)`."""
+        return self.matches_neo(approach.neo)
+
+    def matches_neo(self, neo):
+        """Return whether the NEO has a value for the column that satisfies this filter."""
+        value = self.get_neo(neo)
+        return value is not None and self.op(value, self.value)
+
+    def neo_mask(self, neos):
+        """Return a list of whether each of a sequence of NEOs satisfies this filter.
+
+        If the NEOs are every row of one data file, in order (as loaded by
+        `extract.load_neos`), the comparison is mapped over the cached column
+        directly. Missing values (NaN or None) never compare equal or in order.
+        """
+        store = neos[0]._columns if neos else None
+        if (store is None or neos[-1]._columns is not store or store.size != len(neos)
+                or neos[0]._row != 0 or neos[-1]._row != len(neos) - 1):
+            return super().neo_mask(neos)
+        return list(map(self.op, store[self.column], itertools.repeat(self.value)))
+
+
+class MoidFilter(ColumnFilter):
+    """Filter on the minimum orbit intersection distance (MOID) of an approach's NEO, in au."""
+
+    column = 'moid'
+
+
+class OrbitClassFilter(ColumnFilter):
+    """Filter on the orbit class (such as 'APO' or 'ATE') of an approach's NEO."""
+
+    column = 'orbit_class'
+
+
+class ApproachColumnFilter(AttributeFilter):
+    """A general superclass for filters on extra columns of the close approach data file.
+
+    Concrete subclasses set `column` to the name of a column in
+    `columns.APPROACH_COLUMNS`. A `CloseApproach` doesn't know its own row in
+    these columns, so an `ApproachColumnFilter` can't be called on a single
+    approach; instead, the `NEODatabase` asks it for the `Bitmap` of matching
+    rows, which compares its reference value against the whole cached column at
+    once. Approaches without a value for the column (NaN) never match.
+    """
+
+    # The name of the filtered column, one of `columns.APPROACH_COLUMNS`.
+    column = None
+
+    @property
+    def bitmap_name(self):
+        """Return the name of the filtered column, so that the `NEODatabase` asks for a bitmap."""
+        return self.column
+
+    @property
+    def sql_column(self):
+        """Return the SQL column of the filtered column, in the `approaches` table."""
+        return f"a.{self.column}"
+
+    def bitmap(self, index):
+        """Return the `Bitmap` of the rows whose value in the column satisfies this filter."""
+        return index.compare(self.column, self.op, self.value)
+
+
+class DistMinFilter(ApproachColumnFilter):
+    """Filter on the 3-sigma minimum approach distance of a close approach, in au."""
+
+    column = 'dist_min'
+
+
+class DistMaxFilter(ApproachColumnFilter):
+    """Filter on the 3-sigma maximum approach distance of a close approach, in au."""
+
+    column = 'dist_max'
+
+
+def _sql_is_null(f):
+    """Translate a filter on whether an attribute is known into a test of whether it's NULL."""
+    if f.op not in (operator.eq, operator.ne):
+        return None
+    known = (f.op is operator.eq) == bool(f.value)
+    return f"{f.sql_column} IS {'NOT ' if known else ''}NULL", []
 
 
 def create_filters(
@@ -148,7 +461,9 @@ def create_filters(
         distance_min=None, distance_max=None,
         velocity_min=None, velocity_max=None,
         diameter_min=None, diameter_max=None,
-        hazardous=None
+        hazardous=None, has_diameter=None, has_name=None,
+        moid_min=None, moid_max=None, orbit_class=None,
+        dist_min_max=None, dist_max_max=None
 ):
     """Create a collection of filters from user-specified criteria.
 
@@ -177,6 +492,13 @@ def create_filters(
     :param diameter_min: A minimum diameter of the NEO of a matching `CloseApproach`.
     :param diameter_max: A maximum diameter of the NEO of a matching `CloseApproach`.
     :param hazardous: Whether the NEO of a matching `CloseApproach` is potentially hazardous.
+    :param has_diameter: Whether the NEO of a matching `CloseApproach` has a known diameter.
+    :param has_name: Whether the NEO of a matching `CloseApproach` has an IAU name.
+    :param moid_min: A minimum MOID of the NEO of a matching `CloseApproach`.
+    :param moid_max: A maximum MOID of the NEO of a matching `CloseApproach`.
+    :param orbit_class: The orbit class (such as 'APO') of the NEO of a matching `CloseApproach`.
+    :param dist_min_max: A maximum 3-sigma minimum approach distance for a matching `CloseApproach`.
+    :param dist_max_max: A maximum 3-sigma maximum approach distance for a matching `CloseApproach`.
     :return: A collection of filters for use with `query`.
     """
     filters = []
@@ -200,6 +522,20 @@ def create_filters(
         filters.append(DiameterFilter(operator.le, diameter_max))
     if hazardous is not None:
         filters.append(HazFilter(operator.eq, hazardous))
+    if has_diameter is not None:
+        filters.append(KnownDiameterFilter(operator.eq, has_diameter))
+    if has_name is not None:
+        filters.append(NamedFilter(operator.eq, has_name))
+    if moid_min is not None:
+        filters.append(MoidFilter(operator.ge, moid_min))
+    if moid_max is not None:
+        filters.append(MoidFilter(operator.le, moid_max))
+    if orbit_class is not None:
+        filters.append(OrbitClassFilter(operator.eq, orbit_class.upper()))
+    if dist_min_max is not None:
+        filters.append(DistMinFilter(operator.le, dist_min_max))
+    if dist_max_max is not None:
+        filters.append(DistMaxFilter(operator.le, dist_max_max))
     return filters
 
 
@@ -9,8 +9,26 @@ The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
+
+The `datetime_to_minutes` and `minutes_to_datetime` functions convert a
+`datetime` to and from a whole number of minutes since `EPOCH` - the form in
+which every `CloseApproach` (and `sqlstore`) keeps its time. The
+`cd_to_minutes`, `minutes_to_date` and `minutes_to_str` functions parse and
+format such times without building a `datetime` at all.
 """
 import datetime
+import functools
+
+# The instant from which times are counted in minutes.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# The proleptic Gregorian ordinal of the day of `EPOCH`.
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+# NASA's English month abbreviations, which `strptime` would otherwise have to
+# look up in the (slow to load) locale machinery.
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), start=1)}
 
 
 def cd_to_datetime(calendar_date):
@@ -26,7 +44,35 @@ def cd_to_datetime(calendar_date):
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
-    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    try:
+        date, clock = calendar_date.split(' ')
+        year, month, day = date.split('-')
+        hour, minute = clock.split(':')
+        return datetime.datetime(int(year), _MONTHS[month], int(day), int(hour), int(minute))
+    except (KeyError, ValueError):
+        raise ValueError(f"time data {calendar_date!r} does not match format 'YYYY-bb-DD hh:mm'")
+
+
+def cd_to_minutes(calendar_date):
+    """Convert a NASA-formatted calendar date/time description into minutes since `EPOCH`.
+
+    This is `datetime_to_minutes(cd_to_datetime(calendar_date))`, but only a
+    `date` is built along the way, which is about twice as fast.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: The whole number of minutes from `EPOCH` to the given calendar date and time.
+    """
+    try:
+        date, clock = calendar_date.split(' ')
+        year, month, day = date.split('-')
+        hour, minute = clock.split(':')
+        hour, minute = int(hour), int(minute)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError
+        days = datetime.date(int(year), _MONTHS[month], int(day)).toordinal() - EPOCH_ORDINAL
+    except (KeyError, ValueError):
+        raise ValueError(f"time data {calendar_date!r} does not match format 'YYYY-bb-DD hh:mm'")
+    return days * 1440 + hour * 60 + minute
 
 
 def datetime_to_str(dt):
@@ -38,7 +84,73 @@ def datetime_to_str(dt):
     in the usual ISO 8601 YYYY-MM-DD format to avoid ambiguities with
     locale-specific month names.
 
+    It's formatted with `isoformat`, which is about three times as fast as
+    `strftime`, since every printed or saved close approach formats its time.
+
     :param dt: A naive Python datetime.
     :return: That datetime, as a human-readable string without seconds.
     """
-    return datetime.datetime.strftime(dt, "%Y-%m-%d %H:%M")
+    return dt.isoformat(' ', 'minutes')
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive Python datetime (or date) into the number of minutes since `EPOCH`.
+
+    :param dt: A naive Python datetime, or a date (meaning its midnight).
+    :return: The whole number of minutes from `EPOCH` to that datetime (negative if before it).
+    """
+    if not isinstance(dt, datetime.datetime):
+        dt = datetime.datetime(dt.year, dt.month, dt.day)
+    delta = dt - EPOCH
+    return delta.days * 1440 + delta.seconds // 60
+
+
+def minutes_to_datetime(minutes):
+    """Convert a number of minutes since `EPOCH` into a naive Python datetime.
+
+    :param minutes: A whole number of minutes from `EPOCH`.
+    :return: The naive `datetime` that many minutes after `EPOCH`.
+    """
+    return EPOCH + datetime.timedelta(minutes=minutes)
+
+
+# The hh:mm strings of each minute of a day, preceded by a space.
+_CLOCKS = tuple(f' {hour:02d}:{minute:02d}' for hour in range(24) for minute in range(60))
+
+# The most days whose dates (and date strings) are cached - about eleven years.
+# The data span centuries, so an unbounded cache would grow with every day seen.
+DATE_CACHE_DAYS = 4096
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_DAYS)
+def _date(days):
+    """Return the date of a number of days since `EPOCH`."""
+    return datetime.date.fromordinal(EPOCH_ORDINAL + days)
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_DAYS)
+def _date_str(days):
+    """Return the YYYY-MM-DD string of a number of days since `EPOCH`.
+
+    Close approaches cluster on relatively few distinct days, so these are cached.
+    """
+    return _date(days).isoformat()
+
+
+def minutes_to_date(minutes):
+    """Return the date of a number of minutes since `EPOCH`.
+
+    :param minutes: A whole number of minutes from `EPOCH`.
+    :return: The `date` of the instant that many minutes after `EPOCH`.
+    """
+    return _date(minutes // 1440)
+
+
+def minutes_to_str(minutes):
+    """Format a number of minutes since `EPOCH` like `datetime_to_str`, without a `datetime`.
+
+    :param minutes: A whole number of minutes from `EPOCH`.
+    :return: That time, as a YYYY-MM-DD hh:mm string.
+    """
+    days, minutes = divmod(minutes, 1440)
+    return _date_str(days) + _CLOCKS[minutes]
@@ -0,0 +1,159 @@
+"""Save the sorted columns of a database in a sidecar file, and map them back at query time.
+
+A `bitmap.SortedColumn` lets the `NEODatabase` find (and count) the close
+approaches within a range of dates, distances, velocities or diameters (and
+those nearest in time to an instant) by binary search, but building one means
+sorting every approach - too slow to do for each run of `main.py query`. So
+`main.py index` builds them once, and saves them in an index file beside the
+close approach data file (`cad.json.index`).
+When a database is loaded from the same data files, the columns are memory-mapped
+straight out of the index file - nothing is parsed, sorted, or even read until
+a binary search touches it.
+
+The index file starts with a line of JSON - a header recording the layout
+version, the byte order, the number of rows, the sizes, modification times and
+SHA-1 checksums of the source data files, and where each column is - followed
+by the columns themselves, as packed arrays of 8-byte floats (the known values,
+ascending) and 4-byte ints (the row of each value, then the rows whose value is
+unknown), each aligned to 8 bytes.
+
+An index file is only used while it still describes the data files: if a data
+file's size changed, or its modification time changed and its checksum no
+longer matches, the index is ignored (and `main.py index` needs to be run
+again). Primary designations and names are indexed by the sidecar of `offsets`,
+which `main.py index` also builds.
+"""
+import json
+import mmap
+import os
+import pathlib
+import sys
+from array import array
+
+# Bump this whenever the layout of the index file changes.
+INDEX_VERSION = 2
+
+# The sorted columns saved in an index file, from `bitmap.ATTRIBUTE_COLUMNS`.
+INDEXED_COLUMNS = ('date', 'time', 'distance', 'velocity', 'diameter')
+
+# The alignment of each array in the index file, in bytes.
+_ALIGNMENT = 8
+
+
+def index_path(cad_json_path):
+    """Return the path of the index file for a close approach data file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A `pathlib.Path` next to the data file.
+    """
+    cad_json_path = pathlib.Path(cad_json_path)
+    return cad_json_path.with_name(cad_json_path.name + '.index')
+
+
+def _checksum(path):
+    """Return the SHA-1 checksum of a file's contents, as a hex string."""
+    import hashlib
+    digest = hashlib.sha1()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(path):
+    """Summarize a source file's identity, including a checksum of its contents."""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': _checksum(path)}
+
+
+def matches(expected, path):
+    """Return whether a source file still matches a fingerprint of it.
+
+    The checksum is only computed if the file's modification time has changed.
+
+    :param expected: A fingerprint returned by `fingerprint`, or anything else if there's none.
+    :param path: The path of the source file.
+    :return: Whether the file's contents are the same as when it was fingerprinted.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if not isinstance(expected, dict) or expected.get('size') != stat.st_size:
+        return False
+    return expected.get('mtime_ns') == stat.st_mtime_ns or expected.get('sha1') == _checksum(path)
+
+
+def _pad(length):
+    """Return the number of bytes needed to align a length to `_ALIGNMENT`."""
+    return -length % _ALIGNMENT
+
+
+def build_index(database, neo_csv_path, cad_json_path):
+    """Sort the columns of a database, and save them in the index file of its data files.
+
+    :param database: An `NEODatabase` loaded from exactly these data files, in file order.
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: The path of the index file.
+    """
+    size = database.count()
+    columns = {}
+    body = bytearray()
+    for name in INDEXED_COLUMNS:
+        column = database.bitmaps.sorted_column(name)
+        entry = columns[name] = {'known': len(column.values)}
+        for part, data in (('values', column.values), ('rows', column.rows)):
+            entry[part] = len(body)
+            body += data.tobytes()
+            body += bytes(_pad(len(body)))
+
+    header = json.dumps({
+        'version': INDEX_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': size,
+        'neofile': fingerprint(neo_csv_path),
+        'cadfile': fingerprint(cad_json_path),
+        'columns': columns,
+    }).encode('utf-8') + b'\n'
+
+    path = index_path(cad_json_path)
+    partial = path.with_name(path.name + '.tmp')
+    with open(partial, 'wb') as outfile:
+        outfile.write(header + bytes(_pad(len(header))))
+        outfile.write(body)
+    os.replace(partial, path)
+    return path
+
+
+def open_index(neo_csv_path, cad_json_path, size):
+    """Map the sorted columns out of the index file of some data files, if it's up to date.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param size: The number of close approaches loaded from the data file.
+    :return: A dictionary mapping column names to `SortedColumn`s backed by the mapped
+             file, or None if there's no index file, or it's out of date.
+    """
+    from bitmap import SortedColumn
+    try:
+        with open(index_path(cad_json_path), 'rb') as infile:
+            header = json.loads(infile.readline())
+            if (header.get('version') != INDEX_VERSION or header.get('byteorder') != sys.byteorder
+                    or header.get('rows') != size
+                    or not matches(header.get('neofile'), neo_csv_path)
+                    or not matches(header.get('cadfile'), cad_json_path)):
+                return None
+            buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    start = buffer.find(b'\n') + 1
+    body = memoryview(buffer)[start + _pad(start):]
+    rows_size = array('i').itemsize
+    columns = {}
+    for name, entry in header['columns'].items():
+        values = body[entry['values']:entry['values'] + 8 * entry['known']].cast('d')
+        rows = body[entry['rows']:entry['rows'] + rows_size * size].cast('i')
+        columns[name] = SortedColumn.from_arrays(values, rows)
+    return columns
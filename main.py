@@ -5,15 +5,21 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,near,search,aggregate,neos,partition,index,interactive} [args]
 
-The `inspect` subcommand looks up an NEO by name or by primary designation, and
-optionally lists all of that NEO's known close approaches:
+The `inspect` subcommand looks up an NEO by name or by primary designation,
+summarizes its close approaches, and optionally lists all of them:
 
     $ python3 main.py inspect --pdes 1P
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
 
+The `search` subcommand lists the NEOs whose names or primary designations match
+a partial, case-insensitive, or slightly misspelled search text:
+
+    $ python3 main.py search apo
+    $ python3 main.py search --limit 3 eros
+
 The `query` subcommand searches for close approaches that match given criteria:
 
     $ python3 main.py query --date 1969-07-29
@@ -22,6 +28,16 @@ The `query` subcommand searches for close approaches that match given criteria:
     $ python3 main.py query --date 2020-03-14 --max-velocity 25 --min-diameter 0.5 --hazardous
     $ python3 main.py query --start-date 2000-01-01 --max-diameter 0.1 --not-hazardous
     $ python3 main.py query --hazardous --max-distance 0.05 --min-velocity 30
+    $ python3 main.py query --orbit-class ATE --max-moid 0.01
+    $ python3 main.py query --count --hazardous --max-distance 0.05
+    $ python3 main.py query --exists --date 2020-01-01 --min-velocity 40
+    $ python3 main.py query --max-dist-min 0.01 --columns dist_min,dist_max,t_sigma_f
+
+The `near` subcommand finds the close approaches nearest in time to an instant,
+nearest first. It accepts the same filters as `query`:
+
+    $ python3 main.py near --time "2020-03-02 14:00" -k 5
+    $ python3 main.py near --time "2020-03-02 14:00" -k 20 --hazardous --outfile around.csv
 
 The set of results can be limited in size and/or saved to an output file in CSV
 or JSON format:
@@ -29,54 +45,226 @@ or JSON format:
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
 
+Extra columns of the data files (such as `dist_min`, `v_inf`, `moid` or
+`orbit_class`) are only parsed when a filter or `--columns` needs them, and
+`--columns` adds them to the printed or saved results.
+
+The results can also be sorted by time, distance, velocity or diameter. Large
+sorted exports are spilled to temporary files beyond a memory budget:
+
+    $ python3 main.py query --sort-by distance --limit 5
+    $ python3 main.py query --sort-by velocity --reverse --memory-budget 16M --outfile fast.csv
+
+With `--stream`, `query` reads the close approach data file in one pass instead,
+writing each match as soon as it's found, without building the database - so
+a one-off export starts at once, and only the NEOs are held in memory:
+
+    $ python3 main.py query --stream --hazardous --max-distance 0.05 --outfile risky.csv
+
+The `aggregate` subcommand accepts the same filters as `query`, and summarizes the
+matching close approaches by NEO, year, month, day, or hazardousness - counting
+them and computing the min, max, and mean of their distances, velocities, and
+diameters. The summaries can also be saved in CSV or JSON format:
+
+    $ python3 main.py aggregate --group-by year --hazardous
+    $ python3 main.py aggregate --group-by month --start-date 2020-01-01 --outfile months.csv
+
+The `neos` subcommand lists NEOs with a summary of their close approaches - how
+many there are, the closest and fastest, and the first and last - which the
+database computes once, as it groups the approaches by NEO. The NEOs can be filtered by their attributes
+and their summaries, and sorted by any statistic of the summaries:
+
+    $ python3 main.py neos --sort-by closest --limit 5
+    $ python3 main.py neos --min-approaches 11 --outfile frequent.csv
+    $ python3 main.py neos --hazardous --sort-by fastest --reverse
+
+With `--approx`, `query` and `aggregate` instead estimate the number of matching
+close approaches (and their mean attributes), with 95% confidence intervals,
+from a sample of the close approaches stratified by year:
+
+    $ python3 main.py aggregate --group-by year --max-distance 0.05 --min-velocity 20 --approx
+    $ python3 main.py query --hazardous --approx --sample-size 5000 --seed 1
+
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+having to wait to reload the database each time. When the data files change, the
+shell rebuilds the database in the background and swaps it in once it's ready.
 
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. Data files compressed with gzip, xz or bzip2 are
+decompressed on the fly, in a background thread, as they're read:
+
+    $ python3 main.py --neofile archive/neos.csv.gz --cadfile archive/cad.json.xz query --hazardous
+
+With `--backend sqlite`, `inspect`, `query`, `near` and `aggregate` import the data files
+into a SQLite database beside the close approach data file (the first time, or
+whenever the data files change), and translate the filters into SQL, rather than
+loading every NEO and close approach into memory:
+
+    $ python3 main.py --backend sqlite query --hazardous --max-distance 0.05 --min-velocity 30
+
+The `partition` subcommand splits the close approach data file into one file per
+year (or per month), alongside a manifest of the time span of each file. When
+`--cadfile` names such a directory, `query` and `aggregate` load only the
+partitions that overlap the requested dates:
+
+    $ python3 main.py partition --granularity year --outdir data/cad.partitions
+    $ python3 main.py --cadfile data/cad.partitions query --start-date 2020-01-01 --end-date 2020-03-31
+
+`--cadfile` can also name several close approach data files (such as one per
+year) with a glob pattern or a directory. The files are loaded concurrently and
+merged in time order, dropping approaches that appear in more than one file:
+
+    $ python3 main.py --cadfile 'data/cad-*.json' query --start-date 2019-12-25 --end-date 2020-01-05
+
+The `index` subcommand sorts the close approaches by date, time, distance, velocity
+and diameter once, and saves the sorted columns in an index file beside the close
+approach data file (as well as the designation index used by `inspect`). While
+the index file is up to date with the data files, `query`, `near` and `aggregate`
+map it into memory and find the approaches within ranges of these attributes (or
+nearest in time) by binary search, without building anything:
+
+    $ python3 main.py index
+    $ python3 main.py query --min-distance 0.49 --count
+
+To keep startup fast, each subcommand imports only the modules (and loads only
+the data) that it needs. In particular, `inspect` reads a single NEO out of the
+data files by offset instead of building the whole `NEODatabase`. Startup cost
+can be measured with `python3 -X importtime main.py ...` or `python3 benchmark.py startup`.
 """
 import argparse
-import cmd
-import datetime
 import pathlib
-import shlex
 import sys
-import time
-
-from extract import load_neos, load_approaches
-from database import NEODatabase
-from filters import create_filters, limit
-from write import write_to_csv, write_to_json
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
 
-# The current time, for use with the kill-on-change feature of the interactive shell.
-_START = time.time()
-
 
 def date_fromisoformat(date_string):
     """Return a `datetime.date` corresponding to a string in YYYY-MM-DD format.
 
     In Python 3.7+, there is `datetime.date.fromisoformat`, but alas - we're
-    supporting Python 3.6+.
+    supporting Python 3.6+. The date is parsed by hand rather than with
+    `strptime`, which would load the locale machinery on every invocation.
 
     :param date_string: A date in the format YYYY-MM-DD.
     :return: A `datetime.date` correspondingo the given date string.
     """
+    import datetime
     try:
-        return datetime.datetime.strptime(date_string, '%Y-%m-%d').date()
+        year, month, day = date_string.split('-')
+        return datetime.date(int(year), int(month), int(day))
     except ValueError:
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
+def datetime_fromisoformat(datetime_string):
+    """Return a `datetime.datetime` corresponding to a string in YYYY-MM-DD HH:MM format.
+
+    Like `date_fromisoformat`, the datetime is parsed by hand. A bare date means its midnight.
+
+    :param datetime_string: A datetime in the format YYYY-MM-DD HH:MM (or YYYY-MM-DDTHH:MM).
+    :return: A `datetime.datetime` corresponding to the given datetime string.
+    """
+    import datetime
+    try:
+        date_string, _, time_string = datetime_string.replace('T', ' ').partition(' ')
+        year, month, day = date_string.split('-')
+        hour, minute = time_string.split(':') if time_string else (0, 0)
+        return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{datetime_string}' is not a valid time. "
+                                         "Use YYYY-MM-DD HH:MM.")
+
+
+def positive_int(int_string):
+    """Return the positive integer in a string, for argparse.
+
+    :param int_string: A whole number, at least 1.
+    :return: The number, as an int.
+    """
+    try:
+        value = int(int_string)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"'{int_string}' is not a positive whole number.")
+    return value
+
+
+def memory_size(size_string):
+    """Return the number of bytes in a size such as '512K', '64M' or '1G'.
+
+    :param size_string: A number of bytes, optionally followed by a K, M, or G suffix.
+    :return: The number of bytes.
+    """
+    from sorting import parse_size
+    try:
+        return parse_size(size_string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{size_string}' is not a valid size. Use e.g. 64M.")
+
+
+def column_names(text):
+    """Convert a comma-separated list of extra column names into a tuple, for argparse.
+
+    :param text: Names of columns in `columns.COLUMNS` or `columns.APPROACH_COLUMNS`.
+    :return: A tuple of the column names.
+    """
+    from columns import COLUMNS, APPROACH_COLUMNS
+    names = tuple(name.strip() for name in text.split(',') if name.strip())
+    for name in names:
+        if name not in COLUMNS and name not in APPROACH_COLUMNS:
+            choices = ', '.join(sorted(set(COLUMNS) | set(APPROACH_COLUMNS)))
+            raise argparse.ArgumentTypeError(f"'{name}' is not a column. Choose from: {choices}.")
+    return names
+
+
+def add_neo_filter_arguments(group, subject):
+    """Add the options of filters on the attributes of NEOs to a group of arguments.
+
+    :param group: An argument parser, or a group of its arguments.
+    :param subject: What the filters select, in their help (such as 'NEOs').
+    """
+    group.add_argument('--min-diameter', dest='diameter_min', type=float,
+                       help=f"In kilometers. Only return {subject} with "
+                            "diameters as large or larger than the given size.")
+    group.add_argument('--max-diameter', dest='diameter_max', type=float,
+                       help=f"In kilometers. Only return {subject} with "
+                            "diameters as small or smaller than the given size.")
+    group.add_argument('--hazardous', dest='hazardous', default=None, action='store_true',
+                       help=f"If specified, only return {subject} that "
+                            "are potentially hazardous.")
+    group.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
+                       help=f"If specified, only return {subject} that "
+                            "are not potentially hazardous.")
+    group.add_argument('--known-diameter', dest='has_diameter', default=None, action='store_true',
+                       help=f"If specified, only return {subject} "
+                            "whose diameters are known.")
+    group.add_argument('--unknown-diameter', dest='has_diameter', default=None, action='store_false',
+                       help=f"If specified, only return {subject} "
+                            "whose diameters are unknown.")
+    group.add_argument('--named', dest='has_name', default=None, action='store_true',
+                       help=f"If specified, only return {subject} with IAU names.")
+    group.add_argument('--unnamed', dest='has_name', default=None, action='store_false',
+                       help=f"If specified, only return {subject} without IAU names.")
+    group.add_argument('--min-moid', dest='moid_min', type=float,
+                       help=f"In astronomical units. Only return {subject} whose "
+                            "minimum orbit intersection distance is as large or larger than the given distance.")
+    group.add_argument('--max-moid', dest='moid_max', type=float,
+                       help=f"In astronomical units. Only return {subject} whose "
+                            "minimum orbit intersection distance is as small or smaller than the given distance.")
+    group.add_argument('--orbit-class',
+                       help=f"Only return {subject} in the given orbit class "
+                            "(e.g. APO, ATE, AMO or IEO).")
+
+
 def make_parser():
     """Create an ArgumentParser for this script.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :return: A tuple of the top-level parser and a dictionary mapping each subcommand to its parser.
     """
     parser = argparse.ArgumentParser(
         description="Explore past and future close approaches of near-Earth objects."
@@ -85,10 +273,18 @@ def make_parser():
     # Add arguments for custom data files.
     parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
                         type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
+                        help="Path to CSV file of near-Earth objects (which may be compressed "
+                             "with gzip, xz or bzip2).")
     parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
                         type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
+                        help="Path to JSON file of close approach data, to a directory "
+                             "of time partitions built by the `partition` subcommand, or to "
+                             "a directory or (quoted) glob pattern of several JSON files. "
+                             "The JSON files may be compressed with gzip, xz or bzip2.")
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory',
+                        help="Where `inspect`, `query`, `near` and `aggregate` keep the data: in memory, "
+                             "or in a SQLite database beside a single close approach data file "
+                             "(imported the first time). Defaults to memory.")
     subparsers = parser.add_subparsers(dest='cmd')
 
     # Add the `inspect` subcommand parser.
@@ -102,11 +298,9 @@ def make_parser():
     inspect_id.add_argument('-n', '--name',
                             help="The IAU name of the NEO to inspect (e.g. 'Halley').")
 
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
+    # The filters are shared by the `query` and `aggregate` subcommands.
+    filters_parser = argparse.ArgumentParser(add_help=False)
+    filters = filters_parser.add_argument_group('Filters',
                                        description="Filter close approaches by their attributes "
                                                    "or the attributes of their NEOs.")
     filters.add_argument('-d', '--date', type=date_fromisoformat,
@@ -132,31 +326,256 @@ def make_parser():
                          help="In kilometers per second. Only return close approaches "
                               "whose relative velocity to Earth at approach is as slow or slower "
                               "than the given velocity.")
-    filters.add_argument('--min-diameter', dest='diameter_min', type=float,
-                         help="In kilometers. Only return close approaches of NEOs with "
-                              "diameters as large or larger than the given size.")
-    filters.add_argument('--max-diameter', dest='diameter_max', type=float,
-                         help="In kilometers. Only return close approaches of NEOs with "
-                              "diameters as small or smaller than the given size.")
-    filters.add_argument('--hazardous', dest='hazardous', default=None, action='store_true',
-                         help="If specified, only return close approaches of NEOs that "
-                              "are potentially hazardous.")
-    filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
-                         help="If specified, only return close approaches of NEOs that "
-                              "are not potentially hazardous.")
+    add_neo_filter_arguments(filters, 'close approaches of NEOs')
+    filters.add_argument('--max-dist-min', dest='dist_min_max', type=float,
+                         help="In astronomical units. Only return close approaches whose 3-sigma "
+                              "minimum approach distance is as small or smaller than the given distance.")
+    filters.add_argument('--max-dist-max', dest='dist_max_max', type=float,
+                         help="In astronomical units. Only return close approaches whose 3-sigma "
+                              "maximum approach distance is as small or smaller than the given distance.")
+
+    # Approximate answers, from a sample, are available to the `query` and `aggregate` subcommands.
+    approx_parser = argparse.ArgumentParser(add_help=False)
+    approx = approx_parser.add_argument_group('Approximation',
+                                              description="Estimate counts and means, with 95% confidence "
+                                                          "intervals, from a sample of the close approaches.")
+    approx.add_argument('--approx', action='store_true',
+                        help="Estimate the results from a sample, stratified by year, instead of "
+                             "scanning every close approach.")
+    approx.add_argument('--sample-size', type=int, default=None,
+                        help="The approximate number of close approaches to sample. Defaults to 20000.")
+    approx.add_argument('--seed', type=int, default=0,
+                        help="The seed for drawing the sample. Defaults to 0.")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query', parents=[filters_parser, approx_parser],
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
+    answer = query.add_mutually_exclusive_group()
+    answer.add_argument('--count', action='store_true',
+                        help="Only print the exact number of matching close approaches.")
+    answer.add_argument('--exists', action='store_true',
+                        help="Only print whether any close approach matches ('yes' or 'no').")
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
                        help="File in which to save structured results. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--sort-by', choices=('time', 'distance', 'velocity', 'diameter'),
+                       help="Sort the matching close approaches by this attribute. "
+                            "Ties keep their original order.")
+    query.add_argument('--reverse', action='store_true',
+                       help="If specified with --sort-by, sort in descending order.")
+    query.add_argument('--memory-budget', type=memory_size, default='64M',
+                       help="The approximate memory (e.g. 512K, 64M, 1G) that --sort-by may use "
+                            "before spilling sorted runs to temporary files. Defaults to 64M.")
+    query.add_argument('--columns', type=column_names, default=(),
+                       help="A comma-separated list of extra columns of the data files to include "
+                            "in the results (e.g. dist_min,dist_max,v_inf,t_sigma_f,moid,orbit_class).")
+    query.add_argument('--stream', action='store_true',
+                       help="Read the close approach data in one pass, writing each match as soon as "
+                            "it's found, without building the database. Can't be combined with "
+                            "--sort-by or --approx.")
+
+    # Add the `near` subcommand parser.
+    near = subparsers.add_parser('near', parents=[filters_parser],
+                                 description="Find the close approaches nearest in time to an "
+                                             "instant that match a collection of filters.")
+    near.add_argument('-t', '--time', type=datetime_fromisoformat, required=True,
+                      help="The instant to search around, in YYYY-MM-DD HH:MM format "
+                           "(e.g. '2020-03-02 14:00').")
+    near.add_argument('-k', type=positive_int, default=10,
+                      help="The number of close approaches to return. Defaults to 10.")
+    near.add_argument('-o', '--outfile', type=pathlib.Path,
+                      help="File in which to save structured results. "
+                           "If omitted, results are printed to standard output.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, query
+
+    # Add the `search` subcommand parser.
+    search = subparsers.add_parser('search',
+                                   description="Search for NEOs by partial or misspelled "
+                                               "name or primary designation.")
+    search.add_argument('text',
+                        help="The (case-insensitive) search text (e.g. 'apo' or 'eros').")
+    search.add_argument('-l', '--limit', type=int, default=10,
+                        help="The maximum number of matches to return. Defaults to 10.")
+
+    # Add the `aggregate` subcommand parser.
+    aggregate = subparsers.add_parser('aggregate', parents=[filters_parser, approx_parser],
+                                      description="Summarize the close approaches that match a "
+                                                  "collection of filters, by group.")
+    aggregate.add_argument('-g', '--group-by', required=True,
+                           choices=('neo', 'year', 'month', 'day', 'hazardous'),
+                           help="Summarize the matching close approaches of each NEO, or "
+                                "in each year, month, or day, or by whether they're hazardous.")
+    aggregate.add_argument('-o', '--outfile', type=pathlib.Path,
+                           help="File in which to save structured results. "
+                                "If omitted, results are printed to standard output.")
+
+    # Add the `neos` subcommand parser.
+    neos = subparsers.add_parser('neos',
+                                 description="List NEOs with summaries of their close approaches, "
+                                             "filtered and sorted by their attributes and summaries.")
+    neo_filters = neos.add_argument_group('Filters', description="Filter NEOs by their attributes, "
+                                                                 "or the summaries of their approaches.")
+    add_neo_filter_arguments(neo_filters, 'NEOs')
+    neo_filters.add_argument('--min-approaches', dest='approaches_min', type=int,
+                             help="Only return NEOs with at least the given number of close approaches.")
+    neo_filters.add_argument('--max-approaches', dest='approaches_max', type=int,
+                             help="Only return NEOs with at most the given number of close approaches.")
+    neo_filters.add_argument('--max-closest', dest='closest_max', type=float,
+                             help="In astronomical units. Only return NEOs whose closest approach "
+                                  "passes as near or nearer to Earth as the given distance.")
+    neo_filters.add_argument('--min-fastest', dest='fastest_min', type=float,
+                             help="In kilometers per second. Only return NEOs whose fastest approach "
+                                  "is as fast or faster than the given velocity.")
+    neos.add_argument('--sort-by', choices=('approaches', 'closest', 'fastest', 'first', 'last'),
+                      help="Sort the NEOs by their number of close approaches, the distance of the "
+                           "closest, the velocity of the fastest, or the time of the first or last. "
+                           "NEOs without close approaches come last.")
+    neos.add_argument('--reverse', action='store_true',
+                      help="If specified with --sort-by, sort in descending order.")
+    neos.add_argument('-l', '--limit', type=int,
+                      help="The maximum number of NEOs to return. Defaults to 10 if no --outfile is given.")
+    neos.add_argument('-o', '--outfile', type=pathlib.Path,
+                      help="File in which to save structured results. "
+                           "If omitted, results are printed to standard output.")
+
+    # Add the `partition` subcommand parser.
+    partition = subparsers.add_parser('partition',
+                                      description="Split the close approach data file into "
+                                                  "time partitions, for faster date-range queries.")
+    partition.add_argument('-g', '--granularity', choices=('year', 'month'), default='year',
+                           help="Whether to create one partition per year or per month. "
+                                "Defaults to year.")
+    partition.add_argument('-o', '--outdir', type=pathlib.Path,
+                           help="Directory in which to save the partitions. Defaults to a "
+                                "`.partitions` directory beside the close approach data file.")
+
+    # Add the `index` subcommand parser.
+    subparsers.add_parser('index',
+                          description="Build index files beside the data files, so that queries "
+                                      "on dates, distances, velocities and diameters use them.")
+
+    return parser, {'inspect': inspect, 'query': query, 'search': search, 'aggregate': aggregate}
+
+
+def load_database(neo_csv_path, cad_json_path=None, start_date=None, end_date=None, loaded=None):
+    """Extract the data files into a fully-linked `NEODatabase`.
+
+    The close approaches are loaded by `load_close_approaches`; see there for the
+    forms that `cad_json_path` can take, and how the range of dates is used. If
+    `cad_json_path` is a single file with an up-to-date index file (see `indexes`),
+    the index's sorted columns are mapped into the database.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file (or a directory of partitioned JSON files,
+                          or a directory or glob pattern of JSON files) containing data
+                          about close approaches, or None to load only the NEOs.
+    :param start_date: A `date` before which close approaches are not needed, or None.
+    :param end_date: A `date` after which close approaches are not needed, or None.
+    :param loaded: A tuple of unlinked close approaches already loaded from `cad_json_path`, and
+                   their `ApproachColumnStore` (as by `load_close_approaches`), or None to load them.
+    :return: A new `NEODatabase`.
+    """
+    from database import NEODatabase
+    from extract import load_neos
+    if loaded is None:
+        loaded = load_close_approaches(cad_json_path, start_date, end_date)
+    approaches, columns = loaded
+    database = NEODatabase(load_neos(neo_csv_path), approaches, columns)
+
+    # The sorted columns of a single data file may have been saved by the `index` subcommand.
+    if cad_json_path is not None and pathlib.Path(cad_json_path).is_file():
+        from indexes import open_index
+        sorted_columns = open_index(neo_csv_path, cad_json_path, len(approaches))
+        if sorted_columns is not None:
+            database.bitmaps.add_sorted_columns(sorted_columns)
+    return database
+
+
+def load_close_approaches(cad_json_path, start_date=None, end_date=None):
+    """Extract the close approaches (and their lazily-loaded extra columns) from the data files.
+
+    If `cad_json_path` is a directory of time partitions, only the partitions that
+    overlap the range from `start_date` to `end_date` are loaded, so there may also
+    be some approaches outside of that range.
+
+    If it's a glob pattern or another directory, all of the matching files are
+    loaded concurrently and merged in time order, without duplicates (see
+    `federation`), skipping the approaches outside of the range of dates.
+
+    The extra columns of the close approach data (see `columns`) aren't parsed
+    until they're needed.
+
+    :param cad_json_path: A path to a JSON file (or a directory of partitioned JSON files,
+                          or a directory or glob pattern of JSON files) containing data
+                          about close approaches, or None to load no approaches.
+    :param start_date: A `date` before which close approaches are not needed, or None.
+    :param end_date: A `date` after which close approaches are not needed, or None.
+    :return: A tuple of a list of unlinked `CloseApproach`es and their `ApproachColumnStore`.
+    """
+    from columns import ApproachColumnStore
+    from extract import load_approaches
+
+    # The position of each loaded approach among the records of the files, if they were reordered.
+    order = None
+    paths = cad_data_paths(cad_json_path, start_date, end_date)
+    if len(paths) > 1 and not is_partitioned(cad_json_path):
+        from federation import load_federated_approaches
+        approaches, order = load_federated_approaches(paths, start_date, end_date)
+    else:
+        approaches = []
+        for path in paths:
+            approaches.extend(load_approaches(path))
+    return approaches, ApproachColumnStore(paths, len(approaches), order)
+
+
+def has_compressed_data(args):
+    """Return whether either data file named on the command line is compressed."""
+    from compressed import is_compressed
+    return is_compressed(args.neofile) or (args.cadfile.is_file() and is_compressed(args.cadfile))
+
+
+def is_partitioned(cad_json_path):
+    """Return whether a path is the directory of a time-partitioned close approach data set."""
+    from partition import is_partitioned
+    return cad_json_path is not None and is_partitioned(cad_json_path)
+
+
+def cad_data_paths(cad_json_path, start_date=None, end_date=None):
+    """Resolve the paths of the close approach data files that `load_close_approaches` reads.
+
+    :param cad_json_path: A path to a JSON file (or a directory of partitioned JSON files,
+                          or a directory or glob pattern of JSON files), or None.
+    :param start_date: A `date` before which close approaches are not needed, or None.
+    :param end_date: A `date` after which close approaches are not needed, or None.
+    :return: A list of paths to JSON files.
+    """
+    if cad_json_path is None:
+        return []
+    if is_partitioned(cad_json_path):
+        from partition import partition_paths
+        return partition_paths(cad_json_path, start_date, end_date)
+    from federation import cad_paths
+    return cad_paths(cad_json_path)
+
+
+def date_range_from_args(args):
+    """Compute the range of dates that the close approaches matching the filters fall within.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A tuple of the earliest and latest matching `date`s, each None if unbounded.
+    """
+    starts = [date for date in (args.date, args.start_date) if date is not None]
+    ends = [date for date in (args.date, args.end_date) if date is not None]
+    return (max(starts) if starts else None), (min(ends) if ends else None)
 
 
 def inspect(database, pdes=None, name=None, verbose=False):
@@ -187,15 +606,110 @@ def inspect(database, pdes=None, name=None, verbose=False):
         print("No matching NEOs exist in the database.", file=sys.stderr)
         return None
 
-    # Display information about this NEO, and optionally its close approaches if verbose.
+    # Display information about this NEO and a summary of its close approaches (computed
+    # without walking them), and optionally the close approaches themselves if verbose.
     print(neo)
+    print(f"It has {neo.approaches.summary.approaches_str}.")
     if verbose:
         for approach in neo.approaches:
             print(f"- {approach}")
     return neo
 
 
-def query(database, args):
+def search(database, text, limit=10):
+    """Perform the `search` subcommand.
+
+    This function prints the NEOs whose names or primary designations best
+    match some (partial, case-insensitive, or slightly misspelled) search text,
+    or a message noting that there are no matching NEOs.
+
+    :param database: The `NEODatabase` containing data on NEOs.
+    :param text: The search text.
+    :param limit: The maximum number of matching NEOs to print.
+    :return: The list of matching `NearEarthObject`s, best matches first.
+    """
+    neos = database.search(text, limit=limit)
+    if not neos:
+        print("No matching NEOs exist in the database.", file=sys.stderr)
+    for neo in neos:
+        print(neo)
+    return neos
+
+
+def filters_from_args(args):
+    """Construct a collection of filters from arguments supplied at the command line.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A collection of filters for use with `NEODatabase.query`.
+    """
+    from filters import create_filters
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous, has_diameter=args.has_diameter, has_name=args.has_name,
+        moid_min=args.moid_min, moid_max=args.moid_max, orbit_class=args.orbit_class,
+        dist_min_max=args.dist_min_max, dist_max_max=args.dist_max_max
+    )
+
+
+def neo_filters_from_args(args):
+    """Construct a collection of NEO-level and summary filters from arguments supplied at the command line.
+
+    :param args: All arguments from the `neos` subcommand, as parsed by the top-level parser.
+    :return: A collection of filters for use with `NEODatabase.query_neos`.
+    """
+    import operator
+    from filters import create_filters
+    from summaries import SummaryFilter
+    filters = create_filters(
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous, has_diameter=args.has_diameter, has_name=args.has_name,
+        moid_min=args.moid_min, moid_max=args.moid_max, orbit_class=args.orbit_class
+    )
+    for column, op, value in (('approaches', operator.ge, args.approaches_min),
+                              ('approaches', operator.le, args.approaches_max),
+                              ('closest', operator.le, args.closest_max),
+                              ('fastest', operator.ge, args.fastest_min)):
+        if value is not None:
+            filters.append(SummaryFilter(column, op, value))
+    return filters
+
+
+def neos(database, args):
+    """Perform the `neos` subcommand.
+
+    List the summaries of the close approaches of the NEOs that match the
+    filters, optionally sorted by one of their statistics. The summaries are
+    computed once, as the database groups its approaches by NEO, so no close
+    approach is visited again.
+
+    If an output file wasn't given, print the summaries to stdout, limiting to
+    10 entries if no limit was specified. Otherwise, write them to the output
+    file in CSV or JSON format, according to its extension.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    from filters import limit
+
+    summaries = database.query_neos(neo_filters_from_args(args), args.sort_by, reverse=args.reverse)
+    summaries = limit(summaries, args.limit or (None if args.outfile else 10))
+    if not args.outfile:
+        for summary in summaries:
+            print(summary)
+    else:
+        from write import write_neo_summaries_to_csv, write_summaries_to_json
+        if args.outfile.suffix == '.csv':
+            write_neo_summaries_to_csv(summaries, args.outfile)
+        elif args.outfile.suffix == '.json':
+            write_summaries_to_json(summaries, args.outfile)
+        else:
+            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+
+
+def query(database, args, paginate=False):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
@@ -206,191 +720,325 @@ def query(database, args):
     file's extension to infer whether the file should hold CSV or JSON data, and
     then write the results to the output file in that format.
 
+    With `--count` or `--exists`, only print the number of matching close
+    approaches, or whether there are any - answered from the database's indexes,
+    without creating any results. Otherwise, with `--approx`, estimate the number
+    of matching close approaches (and their mean attributes) from a sample, as
+    with `aggregate`. The exact and estimated answers can't be combined.
+
+    If `paginate` is true (as in the interactive shell), the results printed to
+    stdout are only the first page of the stream, and the rest of the stream is
+    returned, so that the next page can be printed later without querying again.
+
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param paginate: Whether to return the results that weren't printed to stdout.
+    :return: If paginating, an iterator of the results after the first page, or None if there are none.
     """
-    # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
+    from filters import limit
+
+    if args.approx and (args.count or args.exists):
+        print("--approx can't be combined with --count or --exists.", file=sys.stderr)
+        return
+    if args.count:
+        print(database.count(filters_from_args(args)))
+        return
+    if args.exists:
+        print('yes' if database.exists(filters_from_args(args)) else 'no')
+        return
+    if args.approx:
+        estimate(database, args, None)
+        return
+
+    # Query the database with the collection of filters, keeping the row of each result.
+    results = database.query_rows(filters_from_args(args))
+    n = args.limit or (None if args.outfile else 10)
+
+    # Sort the results, if requested, spilling to disk beyond the memory budget.
+    paginate = paginate and not args.outfile
+    if args.sort_by:
+        from sorting import sort_rows
+        results = sort_rows(results, database.get_approach_by_row, args.sort_by,
+                            args.memory_budget, reverse=args.reverse, limit=None if paginate else n)
+    if not paginate:
+        results = limit(results, n)
+
+    # Attach the values of any requested extra columns to the results.
+    if args.columns:
+        from columns import ApproachWithColumns
+        results = (ApproachWithColumns(approach, database.column_values(row, approach, args.columns))
+                   for row, approach in results)
+    else:
+        results = (approach for _, approach in results)
 
     if not args.outfile:
         # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        from write import write_to_stdout
+        if write_to_stdout(results, n) == n and paginate:
+            return results
     else:
         # Write the results to a file.
+        from write import write_to_csv, write_to_json
+        if args.outfile.suffix == '.csv':
+            write_to_csv(results, args.outfile, args.columns)
+        elif args.outfile.suffix == '.json':
+            write_to_json(results, args.outfile)
+        else:
+            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+
+
+def near(database, args):
+    """Perform the `near` subcommand.
+
+    Find the close approaches that match the filters nearest in time to the
+    given instant with the database's `nearest` method, and print the nearest
+    `k` of them to stdout, nearest first - or write them to the output file in
+    CSV or JSON format, according to its extension.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    from filters import limit
+    from helpers import datetime_to_minutes
+
+    results = limit(database.nearest(datetime_to_minutes(args.time), filters_from_args(args)), args.k)
+    if not args.outfile:
+        from write import write_to_stdout
+        write_to_stdout(results)
+    else:
+        from write import write_to_csv, write_to_json
         if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
+            write_to_csv(results, args.outfile)
         elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+            write_to_json(results, args.outfile)
         else:
             print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
 
 
-class NEOShell(cmd.Cmd):
-    """Perform the `interactive` subcommand.
+def aggregate(database, args):
+    """Perform the `aggregate` subcommand.
+
+    Query the database for the close approaches that match the filters, and
+    summarize them by group in a single pass with `aggregate.aggregate`.
 
-    This is a `cmd.Cmd` shell - a specialized tool for command-based REPL sessions.
+    If an output file wasn't given, print the summaries to stdout. If an output
+    file was given, use the file's extension to infer whether the file should
+    hold CSV or JSON data, and then write the summaries to it in that format.
 
-    It wraps the `inspect` and `query` parsers to parse flags for those commands
-    as if they were supplied at the command line.
+    With `--approx`, estimate each summary's count and means from a sample instead.
 
-    The primary purpose of this shell is to allow users to repeatedly perform
-    inspect and query commands, while only loading the data (which can be quite
-    slow) once.
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: The list of `GroupSummary`s (or `ApproxSummary`s), sorted by group.
     """
-    intro = ("Explore close approaches of near-Earth objects. "
-             "Type `help` or `?` to list commands and `exit` to exit.\n")
-    prompt = '(neo) '
-
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
-        """Create a new `NEOShell`.
-
-        Creating this object doesn't start the session - for that, use `.cmdloop()`.
-
-        :param database: The `NEODatabase` containing data on NEOs and their close approaches.
-        :param inspect_parser: The subparser for the `inspect` subcommand.
-        :param query_parser: The subparser for the `query` subcommand.
-        :param aggressive: Whether to kill the session whenever a project file is changed.
-        :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
-        """
-        super().__init__(**kwargs)
-        self.db = database
-        self.inspect = inspect_parser
-        self.query = query_parser
-        self.aggressive = aggressive
-
-    @classmethod
-    def parse_arg_with(cls, arg, parser):
-        """Parse the additional text passed to a command, using a given parser.
-
-        If any error is encountered (in lexical parsing or argument parsing),
-        print the error to stderr and return None.
-
-        :param arg: The additional text supplied after the command.
-        :param parser: An `argparse.ArgumentParser` to parse the arguments.
-        :return: A `Namespace` of the arguments (produced by `parse_args`) or None.
-        """
-        # Lexically parse the additional text with POSIX shell-like syntax.
-        try:
-            args = shlex.split(arg)
-        except ValueError as err:
-            print(err, file=sys.stderr)
-            return None
-
-        # Use the ArgumentParser to parse the shell arguments.
-        try:
-            return parser.parse_args(args)
-        except SystemExit as err:
-            # The `parse_args` method doesn't actually surface `ArgumentError`s
-            # nor `ArgumentTypeError`s - instead, it calls its own `error`
-            # method which prints the error message and then calls `sys.exit`.
-            return None
-
-    def do_i(self, arg):
-        """Shorthand for `inspect`."""
-        self.do_inspect(arg)
-
-    def do_inspect(self, arg):
-        """Perform the `inspect` subcommand within the REPL session.
-
-        Inspect an NEO by designation or by name:
-
-            (neo) inspect --pdes 1P
-            (neo) inspect --name Halley
-
-        Additionally, list all known close approaches:
-
-            (neo) inspect --verbose --name Eros
-        """
-        args = self.parse_arg_with(arg, self.inspect)
-        if not args:
-            return
+    if args.approx:
+        return estimate(database, args, args.group_by)
 
-        # Run the `inspect` subcommand.
-        inspect(self.db,
-                pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+    from aggregate import aggregate as summarize
 
-    def do_q(self, arg):
-        """Shorthand for `query`."""
-        self.do_query(arg)
+    summaries = summarize(database.query(filters_from_args(args)), args.group_by)
+    write_summaries(summaries, args.group_by, args.outfile)
+    return summaries
 
-    def do_query(self, arg):
-        """Perform the `query` subcommand within the REPL session.
 
-        This command behaves the same as the `query` subcommand from the command
-        line. For example, to query close approaches on January 1st, 2020:
+def estimate(database, args, group_by):
+    """Estimate the results of the `query` or `aggregate` subcommand from a sample.
 
-            (neo) query --date 2020-01-01
+    The sample is drawn from the database (once for each size and seed), and the
+    estimates are written like the summaries of `aggregate`.
 
-        You can use any of the other filters: `--start-date`, `--end-date`,
-        `--min-distance`, `--max-distance`, `--min-velocity`, `--max-velocity`,
-        `--min-diameter`, `--max-diameter`, `--hazardous`, `--not-hazardous`.
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param group_by: The grouping to use, one of the keys of `aggregate.GROUP_KEYS`, or None.
+    :return: The list of `ApproxSummary`s, sorted by group.
+    """
+    sample = database.sample(args.sample_size, args.seed)
+    summaries = sample.estimate(filters_from_args(args), group_by)
+    if not summaries and not args.outfile:
+        print(f"No matches in a sample of {sample.size} of {sample.population} approaches.")
+    write_summaries(summaries, group_by, args.outfile, approximate=True)
+    return summaries
 
-        The number of results shown can be limited to a maximum number with `--limit`:
 
-            (neo) query --limit 2
+def write_summaries(summaries, group_by, outfile=None, approximate=False):
+    """Print summaries to stdout, or write them to an output file in CSV or JSON format.
 
-        The results can be saved to a file (instead of displayed to stdout) with
-        `--outfile`:
+    :param summaries: A list of `GroupSummary`s (or `ApproxSummary`s).
+    :param group_by: The grouping used to produce the summaries, or None.
+    :param outfile: A path to the output file, whose extension is `.csv` or `.json`, or None.
+    :param approximate: Whether the summaries are estimates (`ApproxSummary`s).
+    """
+    if not outfile:
+        for summary in summaries:
+            print(summary)
+    else:
+        from write import write_summaries_to_csv, write_summaries_to_json
+        if outfile.suffix == '.csv':
+            write_summaries_to_csv(summaries, group_by, outfile, approximate=approximate)
+        elif outfile.suffix == '.json':
+            write_summaries_to_json(summaries, outfile)
+        else:
+            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
 
-            (neo) query --limit 5 --outfile results.csv
-            (neo) query --limit 5 --outfile results.json
-        """
-        args = self.parse_arg_with(arg, self.query)
-        if not args:
-            return
 
-        # Run the `inspect` subcommand.
-        query(self.db, args)
-
-    def do_EOF(self, _arg):
-        """Exit the interactive session."""
-        return True
-
-    # Alternative ways to quit.
-    do_exit = do_EOF
-    do_quit = do_EOF
-
-    def precmd(self, line):
-        """Watch for changes to the files in this project."""
-        changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
-        if changed:
-            print("The following file(s) have been modified since this interactive session began: "
-                  f"{', '.join(str(f.relative_to(PROJECT_ROOT)) for f in changed)}.",
-                  file=sys.stderr)
-            if not self.aggressive:
-                print("To include these changes, please exit and restart this interactive session.",
-                      file=sys.stderr)
-            else:
-                print("Preemptively terminating the session aggressively.", file=sys.stderr)
-                return 'exit'
-        return line
+def partition(cad_json_path, outdir=None, granularity='year'):
+    """Perform the `partition` subcommand.
+
+    Split the close approach data file into time partitions with
+    `partition.build_partitions`, and print a summary of the partitions.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param outdir: The directory in which to save the partitions, or None for the default.
+    :param granularity: Whether to create one partition per 'year' or per 'month'.
+    :return: The manifest of the partitioned data set, or None if the directory can't be used.
+    """
+    from partition import build_partitions, default_partition_dir
+    outdir = outdir or default_partition_dir(cad_json_path)
+    try:
+        manifest = build_partitions(cad_json_path, outdir, granularity=granularity)
+    except ValueError as error:
+        print(f"{error} Choose an empty --outdir.", file=sys.stderr)
+        return None
+    total = sum(entry['count'] for entry in manifest['partitions'])
+    print(f"Wrote {total} close approaches into {len(manifest['partitions'])} "
+          f"partitions in {outdir}.")
+    return manifest
+
+
+def index(neo_csv_path, cad_json_path):
+    """Build the index files of a pair of data files, for indexed queries with no build cost.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    """
+    if not pathlib.Path(cad_json_path).is_file():
+        print(f"Only a single close approach data file can be indexed, not '{cad_json_path}'.",
+              file=sys.stderr)
+        return
+    from compressed import is_compressed
+    from indexes import INDEXED_COLUMNS, build_index
+    from offsets import OffsetIndex
+    database = load_database(neo_csv_path, cad_json_path)
+    path = build_index(database, neo_csv_path, cad_json_path)
+    if is_compressed(neo_csv_path) or is_compressed(cad_json_path):
+        # The designation index needs byte offsets into uncompressed data files.
+        print(f"Indexed {database.count()} close approaches by {', '.join(INDEXED_COLUMNS)} in {path}.")
+        return
+    OffsetIndex.open(neo_csv_path, cad_json_path)
+    print(f"Indexed {database.count()} close approaches by {', '.join(INDEXED_COLUMNS)} "
+          f"and designation in {path}.")
+
+
+def sqlite_main(args):
+    """Run the `inspect`, `query`, `near` or `aggregate` subcommand against the SQLite backend.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    if args.cmd not in ('inspect', 'query', 'near', 'aggregate'):
+        print(f"The `{args.cmd}` subcommand isn't supported by the SQLite backend.", file=sys.stderr)
+        return
+    if not args.cadfile.is_file():
+        print("The SQLite backend needs a single close approach data file.", file=sys.stderr)
+        return
+    if getattr(args, 'approx', False) or getattr(args, 'stream', False):
+        print("--approx and --stream aren't supported by the SQLite backend.", file=sys.stderr)
+        return
+
+    from sqlstore import SQLiteDatabase
+    database = SQLiteDatabase.open(args.neofile, args.cadfile)
+    try:
+        if args.cmd == 'inspect':
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        elif args.cmd == 'query':
+            query(database, args)
+        elif args.cmd == 'near':
+            near(database, args)
+        else:
+            aggregate(database, args)
+    finally:
+        database.close()
+
+
+def stream_query(args):
+    """Run the `query` subcommand in one pass over the data files, without building a database.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    if args.sort_by or args.approx:
+        print("--stream can't be combined with --sort-by or --approx.", file=sys.stderr)
+        return
+    start_date, end_date = date_range_from_args(args)
+    paths = cad_data_paths(args.cadfile, start_date, end_date)
+    if len(paths) > 1 and not is_partitioned(args.cadfile):
+        print("--stream needs a single close approach data file, or a partitioned directory.",
+              file=sys.stderr)
+        return
+
+    from stream import StreamingSource
+    query(StreamingSource(args.neofile, paths), args)
 
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    parser, subparsers = make_parser()
     args = parser.parse_args()
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    if args.backend == 'sqlite':
+        sqlite_main(args)
+        return
 
-    # Run the chosen subcommand.
+    # A single NEO can be read directly out of a single uncompressed data file by offset.
     if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
-    elif args.cmd == 'query':
+        if not args.cadfile.is_file() or has_compressed_data(args):
+            source = load_database(args.neofile, args.cadfile)
+        else:
+            from offsets import OffsetIndex
+            source = OffsetIndex.open(args.neofile, args.cadfile)
+        inspect(source, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        return
+    if args.cmd == 'partition':
+        if has_compressed_data(args):
+            print("Only an uncompressed close approach data file can be partitioned.", file=sys.stderr)
+            return
+        partition(args.cadfile, outdir=args.outdir, granularity=args.granularity)
+        return
+    if args.cmd == 'index':
+        index(args.neofile, args.cadfile)
+        return
+    if args.cmd == 'search':
+        search(load_database(args.neofile), args.text, limit=args.limit)
+        return
+    if args.cmd not in ('query', 'near', 'aggregate', 'neos', 'interactive'):
+        parser.print_usage()
+        return
+
+    if args.cmd == 'query' and args.stream:
+        stream_query(args)
+        return
+
+    # Extract data from the data files into structured Python objects. If the close
+    # approaches are partitioned, only those partitions that could match are loaded.
+    start_date, end_date = date_range_from_args(args) if args.cmd in ('query', 'near', 'aggregate') else (None, None)
+    database = load_database(args.neofile, args.cadfile, start_date, end_date)
+
+    # Run the chosen subcommand.
+    if args.cmd == 'query':
         query(database, args)
+    elif args.cmd == 'near':
+        near(database, args)
+    elif args.cmd == 'aggregate':
+        aggregate(database, args)
+    elif args.cmd == 'neos':
+        neos(database, args)
     elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+        from reload import DatabaseReloader
+        from shell import NEOShell
+        # This module is passed to the reloader and the shell, rather than imported
+        # again by name, since it may be running as `__main__`.
+        reloader = DatabaseReloader(database, sys.modules[__name__], args.neofile, args.cadfile,
+                                    start_date, end_date)
+        NEOShell(database, subparsers, sys.modules[__name__], aggressive=args.aggressive,
+                 reloader=reloader).cmdloop()
 
 
 if __name__ == '__main__':
@@ -17,7 +17,9 @@ quirks of the data set, such as missing names and unknown diameters.
 
 You'll edit this file in Task 1.
 """
-from helpers import cd_to_datetime, datetime_to_str
+import datetime
+
+from helpers import cd_to_minutes, datetime_to_minutes, minutes_to_datetime, minutes_to_str
 
 
 class NearEarthObject:
@@ -31,8 +33,15 @@ class NearEarthObject:
     A `NearEarthObject` also maintains a collection of its close approaches -
     initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
+
+    The other columns of the NEO data file (such as the MOID or the orbit class)
+    aren't kept on each NEO, but can be read with `column` if the NEO was loaded
+    along with a `columns.ColumnStore`.
     """
 
+    # There are tens of thousands of NEOs, so they don't each carry a `__dict__`.
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'approaches', '_columns', '_row')
+
     # If you make changes, be sure to update the comments in this file.
     def __init__(self, name, designation, hazardous, diameter):
         """Create a new `NearEarthObject`.
@@ -51,6 +60,35 @@ class NearEarthObject:
         # Create an empty initial collection of linked approaches.
         self.approaches = []
 
+        # The extra columns of the data file, and this NEO's row in them, if loaded from a file.
+        self._columns = None
+        self._row = None
+
+    def column(self, name):
+        """Return the value of an extra column of the NEO data file for this NEO.
+
+        :param name: The name of the column, one of `columns.COLUMNS`.
+        :return: The value, or None if this NEO wasn't loaded along with its columns.
+        """
+        if self._columns is None:
+            return None
+        return self._columns[name][self._row]
+
+    def copy(self):
+        """Return an unlinked copy of this NEO, sharing its extra columns.
+
+        :return: A new `NearEarthObject` with the same attributes and no close approaches.
+        """
+        neo = NearEarthObject.__new__(NearEarthObject)
+        neo.designation = self.designation
+        neo.name = self.name
+        neo.diameter = self.diameter
+        neo.hazardous = self.hazardous
+        neo.approaches = []
+        neo._columns = self._columns
+        neo._row = self._row
+        return neo
+
     @property
     def fullname(self):
         """Return a representation of the full name of this NEO."""
@@ -98,9 +136,17 @@ class CloseApproach:
     A `CloseApproach` also maintains a reference to its `NearEarthObject` -
     initially, this information (the NEO's primary designation) is saved in a
     private attribute, but the referenced NEO is eventually replaced in the
-    `NEODatabase` constructor.
+    `NEODatabase` constructor. Once linked, the private copy of the designation
+    is dropped, and `designation` reads it from the NEO instead.
+
+    The time of closest approach is kept as a whole number of minutes since
+    `helpers.EPOCH` (in `minutes`), which is cheap to parse, store, and compare;
+    the `time` property only builds a `datetime` from it when it's asked for.
     """
 
+    # There are hundreds of thousands of close approaches, so they don't each carry a `__dict__`.
+    __slots__ = ('_designation', 'minutes', 'distance', 'velocity', 'neo')
+
     # If you make changes, be sure to update the comments in this file.
     def __init__(self, designation, time, distance, velocity, neo=None):
         """Create a new `CloseApproach`.
@@ -109,30 +155,50 @@ class CloseApproach:
         """
         # onto attributes named `_designation`, `time`, `distance`, and `velocity`.
         # You should coerce these values to their appropriate data type and handle any edge cases.
-        # The `cd_to_datetime` function will be useful.
-        self._designation = designation
-        self.time = cd_to_datetime(time)
+        # The `cd_to_minutes` function will be useful. An already-parsed time (as
+        # when an approach is copied, or rebuilt from a row of an SQLite store) may
+        # be given as minutes, or as a `datetime`.
+        self._designation = designation if neo is None else None
+        if isinstance(time, int):
+            self.minutes = time
+        elif isinstance(time, datetime.datetime):
+            self.minutes = datetime_to_minutes(time)
+        else:
+            self.minutes = cd_to_minutes(time)
         self.distance = float(distance)
         self.velocity = float(velocity)
 
         # Create an attribute for the referenced NEO, originally None.
         self.neo = neo
 
+    @property
+    def designation(self):
+        """Return the primary designation of this approach's NEO."""
+        return self._designation if self.neo is None else self.neo.designation
+
+    def copy(self):
+        """Return an unlinked copy of this approach, ready to be linked into another `NEODatabase`."""
+        return CloseApproach(self.designation, self.minutes, self.distance, self.velocity)
+
+    @property
+    def time(self):
+        """Return this `CloseApproach`'s approach time, as a naive Python `datetime` (in UTC)."""
+        return minutes_to_datetime(self.minutes)
+
     @property
     def time_str(self):
         """Return a formatted representation of this `CloseApproach`'s approach time.
 
-        The value in `self.time` should be a Python `datetime` object. While a
-        `datetime` object has a string representation, the default representation
-        includes seconds - significant figures that don't exist in our input
-        data set.
+        While a `datetime` object has a string representation, the default
+        representation includes seconds - significant figures that don't exist
+        in our input data set.
 
-        The `datetime_to_str` method converts a `datetime` object to a
-        formatted string that can be used in human-readable representations and
-        in serialization to CSV and JSON files.
+        The `minutes_to_str` function formats the time, without seconds, as a
+        string that can be used in human-readable representations and in
+        serialization to CSV and JSON files - the same string that
+        `datetime_to_str` would make of `self.time`, without building it.
         """
-        new_time = datetime_to_str(self.time)
-        return new_time
+        return minutes_to_str(self.minutes)
 
     def __str__(self):
         """Return `str(self)`."""
@@ -0,0 +1,337 @@
+"""Look up single NEOs and their close approaches without loading the data files.
+
+Building a full `NEODatabase` parses every row of `neos.csv` and every record of
+`cad.json`, which is wasteful when the user only wants to `inspect` one NEO. An
+`OffsetIndex` instead consults a sidecar file (saved next to the close approach
+data file) that maps each primary designation to the byte offsets of its NEO row
+and of each of its close approach records. Only those few records are read and
+parsed.
+
+The sidecar is a sorted, line-oriented text file so that a lookup is a binary
+search over a memory-mapped file - its cost doesn't depend on the size of the
+data set. The first line is a JSON header that records the sizes and
+modification times of the source data files; whenever these no longer match,
+the sidecar is rebuilt automatically.
+
+The `OffsetIndex` offers the same `get_neo_by_designation` and `get_neo_by_name`
+methods as an `NEODatabase`, so it can be handed directly to `main.inspect`.
+"""
+import csv
+import json
+import mmap
+import os
+import pathlib
+import re
+
+from database import NEODatabase
+from extract import parse_neo, parse_approach
+
+# Bump this whenever the layout of the sidecar file changes.
+INDEX_VERSION = 1
+
+# The opening of the `data` array in a close approach JSON file.
+_DATA_START = re.compile(rb'"data"\s*:\s*\[')
+
+# The `fields` array of a close approach JSON file, which names the fields of each record.
+_FIELDS = re.compile(rb'"fields"\s*:\s*(\[[^\]]*\])')
+
+# A single close approach record: a flat JSON array of strings (or nulls), whose
+# first element is the primary designation. Group 1 captures the whole record
+# and group 2 the raw (still JSON-escaped) designation.
+_RECORD = re.compile(rb'\s*,?\s*(\[\s*"((?:[^"\\]|\\.)*)"(?:"(?:[^"\\]|\\.)*"|[^"\[\]])*\])')
+
+
+def sidecar_path(cad_json_path):
+    """Return the path of the offset sidecar file for a close approach data file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A `pathlib.Path` next to the data file.
+    """
+    cad_json_path = pathlib.Path(cad_json_path)
+    return cad_json_path.with_name(cad_json_path.name + '.offsets')
+
+
+def iter_neo_rows(neo_csv_path):
+    """Generate the position and fields of each row of a CSV file of NEOs.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :yield: Tuples of (byte offset, byte length, list of fields) for each data row.
+    """
+    with open(neo_csv_path, 'rb') as infile:
+        offset = len(infile.readline())  # Skip the header.
+        for line in infile:
+            row = next(csv.reader([line.decode('utf-8')]))
+            yield offset, len(line), row
+            offset += len(line)
+
+
+def iter_approach_spans(buffer):
+    """Generate the position and designation of each record in close approach JSON data.
+
+    The records are located with a regular expression instead of a JSON parser,
+    so none of their values are decoded other than the designation.
+
+    :param buffer: A bytes-like object holding the contents of a `cad.json`-formatted file.
+    :yield: Tuples of (byte offset, byte length, designation) for each record.
+    """
+    start = _DATA_START.search(buffer)
+    if start is None:
+        return
+    pos = start.end()
+    while True:
+        match = _RECORD.match(buffer, pos)
+        if match is None:
+            return
+        designation = match.group(2)
+        if b'\\' in designation:
+            designation = json.loads(b'"' + designation + b'"')
+        else:
+            designation = designation.decode('utf-8')
+        yield match.start(1), match.end(1) - match.start(1), designation
+        pos = match.end()
+
+
+def approach_fields(buffer):
+    """Find the names of the fields of each record in close approach JSON data.
+
+    NASA's files list the fields after the data, so the search starts from the end.
+
+    :param buffer: A bytes-like object holding the contents of a `cad.json`-formatted file.
+    :return: A list of the field names, in the order of the values in each record.
+    :raises ValueError: If the data has no `fields` array.
+    """
+    match = _FIELDS.search(buffer, max(buffer.rfind(b'"fields"'), 0))
+    if match is None:
+        raise ValueError("The close approach data has no 'fields'.")
+    return json.loads(match.group(1))
+
+
+def iter_approach_records(infile, chunk_size=1 << 20):
+    """Decode each record of close approach JSON data read from a file, a chunk at a time.
+
+    Unlike `json.load`, this never holds more than a chunk (and one record) of
+    the data in memory, so it suits files that can't be memory-mapped, such as
+    compressed ones. Reading stops at the end of the `data` array.
+
+    :param infile: A binary file object holding `cad.json`-formatted data.
+    :param chunk_size: The number of bytes to read at a time.
+    :yield: Each record, as a list of its (raw) values.
+    """
+    buffer = b''
+    pos = None
+    while True:
+        if pos is None:
+            start = _DATA_START.search(buffer)
+            if start is not None:
+                pos = start.end()
+                continue
+            # Keep enough of the buffer to find an opening split across chunks.
+            found = buffer.rfind(b'"data"')
+            buffer = buffer[found:] if found >= 0 else buffer[-5:]
+        else:
+            match = _RECORD.match(buffer, pos)
+            if match is not None:
+                yield json.loads(match.group(1))
+                pos = match.end()
+                continue
+            if buffer[pos:].lstrip().startswith(b']'):
+                return
+            buffer = buffer[pos:]
+            pos = 0
+        chunk = infile.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+
+def read_approach_fields(infile, chunk_size=1 << 20):
+    """Find the names of the fields of close approach JSON data read from a file, a chunk at a time.
+
+    :param infile: A binary file object holding `cad.json`-formatted data.
+    :param chunk_size: The number of bytes to read at a time.
+    :return: A list of the field names, in the order of the values in each record.
+    :raises ValueError: If the data has no `fields` array.
+    """
+    buffer = b''
+    while True:
+        start = buffer.find(b'"fields"')
+        if start >= 0:
+            buffer = buffer[start:]
+            match = _FIELDS.match(buffer)
+            if match is not None:
+                return json.loads(match.group(1))
+        else:
+            buffer = buffer[-7:]
+        chunk = infile.read(chunk_size)
+        if not chunk:
+            raise ValueError("The close approach data has no 'fields'.")
+        buffer += chunk
+
+
+def _fingerprint(path):
+    """Summarize a source file's identity so that changes to it can be detected."""
+    stat = os.stat(path)
+    return {'path': str(pathlib.Path(path).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def build_sidecar(neo_csv_path, cad_json_path):
+    """Scan the data files and produce the contents of an offset sidecar file.
+
+    Each line after the header is a tab-separated entry, sorted by its key:
+
+        d:<designation>  <neo offset>  <neo length>  <offset>:<length>,...
+        n:<name>         <designation>
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: The sidecar's contents, as bytes.
+    """
+    header = {
+        'version': INDEX_VERSION,
+        'neofile': _fingerprint(neo_csv_path),
+        'cadfile': _fingerprint(cad_json_path),
+    }
+
+    neo_spans = {}
+    name_to_designation = {}
+    for offset, length, row in iter_neo_rows(neo_csv_path):
+        neo_spans[row[3]] = (offset, length)
+        if row[4]:
+            name_to_designation[row[4]] = row[3]
+
+    approach_spans = {designation: [] for designation in neo_spans}
+    with open(cad_json_path, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for offset, length, designation in iter_approach_spans(buffer):
+                approach_spans.setdefault(designation, []).append(f'{offset}:{length}')
+
+    lines = []
+    for designation, (offset, length) in neo_spans.items():
+        spans = ','.join(approach_spans[designation])
+        lines.append(f'd:{designation}\t{offset}\t{length}\t{spans}'.encode('utf-8'))
+    for name, designation in name_to_designation.items():
+        lines.append(f'n:{name}\t{designation}'.encode('utf-8'))
+    lines.sort(key=lambda line: line.split(b'\t', 1)[0])
+
+    return json.dumps(header).encode('utf-8') + b'\n' + b'\n'.join(lines) + b'\n'
+
+
+def _is_fresh(header, neo_csv_path, cad_json_path):
+    """Return whether a sidecar header still describes the given data files."""
+    return (header.get('version') == INDEX_VERSION
+            and header.get('neofile') == _fingerprint(neo_csv_path)
+            and header.get('cadfile') == _fingerprint(cad_json_path))
+
+
+class OffsetIndex:
+    """A sidecar-backed index for fetching single NEOs and their close approaches.
+
+    Construct one with `OffsetIndex.open`, which (re)builds the sidecar file if
+    it is missing or stale.
+    """
+
+    def __init__(self, buffer, neo_csv_path, cad_json_path):
+        """Create a new `OffsetIndex` over the contents of a sidecar file.
+
+        :param buffer: A bytes-like object (such as an `mmap`) of the sidecar's contents.
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_path: A path to a JSON file containing data about close approaches.
+        """
+        self._buffer = buffer
+        self._entries_start = buffer.find(b'\n') + 1
+        self._neo_csv_path = neo_csv_path
+        self._cad_json_path = cad_json_path
+
+    @classmethod
+    def open(cls, neo_csv_path, cad_json_path):
+        """Open the offset index for a pair of data files, rebuilding it if needed.
+
+        If the sidecar can't be written (for example, if the data directory is
+        read-only), the index is built and used in memory instead.
+
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_path: A path to a JSON file containing data about close approaches.
+        :return: An `OffsetIndex` that is up to date with the data files.
+        """
+        path = sidecar_path(cad_json_path)
+        try:
+            with open(path, 'rb') as infile:
+                header = json.loads(infile.readline())
+                if _is_fresh(header, neo_csv_path, cad_json_path):
+                    return cls(mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ),
+                               neo_csv_path, cad_json_path)
+        except (OSError, ValueError):
+            pass
+
+        contents = build_sidecar(neo_csv_path, cad_json_path)
+        try:
+            partial = path.with_name(path.name + '.tmp')
+            with open(partial, 'wb') as outfile:
+                outfile.write(contents)
+            os.replace(partial, path)
+        except OSError:
+            pass
+        return cls(contents, neo_csv_path, cad_json_path)
+
+    def _find(self, key):
+        """Binary search the sorted entries for the fields of the line with the given key.
+
+        :param key: The full key (including its `d:` or `n:` prefix), as bytes.
+        :return: A list of the line's fields after the key, or None if absent.
+        """
+        buffer = self._buffer
+        lo, hi = self._entries_start, len(buffer)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = max(lo, buffer.rfind(b'\n', lo, mid) + 1)
+            end = buffer.find(b'\n', start, hi)
+            if end < 0:
+                end = hi
+            fields = buffer[start:end].split(b'\t')
+            if fields[0] < key:
+                lo = end + 1
+            elif fields[0] > key:
+                hi = start
+            else:
+                return fields[1:]
+        return None
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO, linked to its close approaches, by primary designation.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        fields = self._find(b'd:' + designation.encode('utf-8'))
+        if fields is None:
+            return None
+
+        with open(self._neo_csv_path, 'rb') as infile:
+            infile.seek(int(fields[0]))
+            line = infile.read(int(fields[1])).decode('utf-8')
+        neo = parse_neo(next(csv.reader([line])))
+
+        approaches = []
+        if fields[2]:
+            with open(self._cad_json_path, 'rb') as infile:
+                for span in fields[2].split(b','):
+                    offset, length = span.split(b':')
+                    infile.seek(int(offset))
+                    approaches.append(parse_approach(json.loads(infile.read(int(length)))))
+
+        # Only needed to link together these objects.
+        NEODatabase([neo], approaches)
+        return neo
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO, linked to its close approaches, by name.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        if not name:
+            return None
+        fields = self._find(b'n:' + name.encode('utf-8'))
+        if fields is None:
+            return None
+        return self.get_neo_by_designation(fields[0].decode('utf-8'))
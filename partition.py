@@ -0,0 +1,184 @@
+"""Split close approach data into time partitions, and load only the ones needed.
+
+Most queries cover a window of a few months, but `extract.load_approaches` must
+load the entire history of close approaches from `cad.json`. The
+`build_partitions` function instead splits `cad.json` into one file per year (or
+per month) in a directory, each in the same format as `cad.json` itself, along
+with a `manifest.json` that records the number of approaches in each partition
+and the earliest and latest approach times within it.
+
+The `partition_paths` function then reads the manifest and selects only the
+partitions whose time span overlaps a requested range of dates, so the cost of
+loading (and of scanning) scales with the size of the window rather than with
+the size of the whole history.
+
+The main module treats a `--cadfile` that names a directory holding a
+`manifest.json` as a partitioned data set, and loads the selected partitions
+(see `main.load_close_approaches`).
+"""
+import datetime
+import json
+import mmap
+import pathlib
+
+from helpers import cd_to_datetime, datetime_to_str
+from offsets import approach_fields, iter_approach_spans
+
+# Bump this whenever the layout of a partitioned data set changes.
+MANIFEST_VERSION = 1
+
+# The name of the manifest file within a partitioned data set.
+MANIFEST_NAME = 'manifest.json'
+
+# The field names of `cad.json`, used if they can't be read from the source file.
+CAD_FIELDS = ['des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max',
+              'v_rel', 'v_inf', 't_sigma_f', 'h']
+
+# Functions to compute the partition of an approach from its datetime.
+PARTITION_KEYS = {
+    'year': lambda time: f'{time.year:04d}',
+    'month': lambda time: f'{time.year:04d}-{time.month:02d}',
+}
+
+
+def is_partitioned(path):
+    """Return whether a path is the directory of a partitioned data set."""
+    path = pathlib.Path(path)
+    return path.is_dir() and (path / MANIFEST_NAME).is_file()
+
+
+def default_partition_dir(cad_json_path):
+    """Return the default directory for the partitions of a close approach data file."""
+    cad_json_path = pathlib.Path(cad_json_path)
+    return cad_json_path.with_name(cad_json_path.stem + '.partitions')
+
+
+def build_partitions(cad_json_path, directory, granularity='year'):
+    """Split a close approach JSON file into time partitions in a directory.
+
+    Only the `cd` (calendar date) field of each record is decoded - the records
+    themselves are copied byte for byte into their partition files.
+
+    If the directory already holds a partitioned data set, the partitions named
+    in its manifest are replaced. Any other non-empty directory is refused, so
+    that files which merely look like partitions are never deleted.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param directory: A path to the directory in which to save the partitions.
+    :param granularity: Whether to partition by 'year' or by 'month'.
+    :return: The manifest of the partitioned data set, as a dictionary.
+    :raises ValueError: If the directory isn't empty, and holds no partition manifest.
+    """
+    directory = pathlib.Path(directory)
+    stale = _partition_files(directory)
+
+    key = PARTITION_KEYS[granularity]
+    partitions = {}
+    with open(cad_json_path, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            try:
+                fields = approach_fields(buffer)
+            except ValueError:
+                fields = CAD_FIELDS
+            date_field = fields.index('cd')
+            for offset, length, _ in iter_approach_spans(buffer):
+                raw = buffer[offset:offset + length]
+                time = cd_to_datetime(json.loads(raw)[date_field])
+                partition = partitions.setdefault(key(time), {'records': [], 'min': time, 'max': time})
+                partition['records'].append(raw)
+                partition['min'] = min(partition['min'], time)
+                partition['max'] = max(partition['max'], time)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in stale:
+        if path.is_file():
+            path.unlink()
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'granularity': granularity,
+        'source': str(pathlib.Path(cad_json_path).resolve()),
+        'partitions': [],
+    }
+    for name in sorted(partitions):
+        partition = partitions[name]
+        filename = f'cad-{name}.json'
+        with open(directory / filename, 'wb') as outfile:
+            outfile.write(b'{"fields": ' + json.dumps(fields).encode('utf-8')
+                          + b', "count": ' + str(len(partition['records'])).encode('ascii')
+                          + b', "data": [\n')
+            outfile.write(b',\n'.join(partition['records']))
+            outfile.write(b'\n]}\n')
+        manifest['partitions'].append({
+            'file': filename,
+            'count': len(partition['records']),
+            'min_time': datetime_to_str(partition['min']),
+            'max_time': datetime_to_str(partition['max']),
+        })
+
+    with open(directory / MANIFEST_NAME, 'w') as outfile:
+        json.dump(manifest, outfile, indent=2)
+    return manifest
+
+
+def _partition_files(directory):
+    """Return the paths of the partition files of an existing partitioned data set in a directory.
+
+    :param directory: A `pathlib.Path` to a directory, which needn't exist.
+    :return: A list of the paths named in the directory's manifest, or an empty list if
+             the directory is missing or empty.
+    :raises ValueError: If the directory isn't empty, and holds no partition manifest.
+    """
+    if not directory.is_dir() or not any(directory.iterdir()):
+        return []
+    if not is_partitioned(directory):
+        raise ValueError(f"{directory} isn't empty, and isn't a partitioned data set.")
+    with open(directory / MANIFEST_NAME) as infile:
+        manifest = json.load(infile)
+    # Only bare file names within the directory are ever written to a manifest.
+    return [directory / pathlib.Path(entry['file']).name for entry in manifest.get('partitions', [])]
+
+
+def read_manifest(directory):
+    """Read the manifest of a partitioned data set.
+
+    :param directory: A path to the directory of a partitioned data set.
+    :return: The manifest, as a dictionary.
+    :raises ValueError: If the manifest has an unsupported version.
+    """
+    with open(pathlib.Path(directory) / MANIFEST_NAME) as infile:
+        manifest = json.load(infile)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported partition manifest version in {directory}.")
+    return manifest
+
+
+def select_partitions(manifest, start_date=None, end_date=None):
+    """Choose the partitions whose approaches could fall within a range of dates.
+
+    :param manifest: The manifest of a partitioned data set.
+    :param start_date: A `date` on or after which matching approaches occur, or None.
+    :param end_date: A `date` on or before which matching approaches occur, or None.
+    :return: A list of the manifest's entries for the overlapping partitions, in time order.
+    """
+    selected = []
+    for partition in manifest['partitions']:
+        first = datetime.date(*map(int, partition['min_time'][:10].split('-')))
+        last = datetime.date(*map(int, partition['max_time'][:10].split('-')))
+        if (start_date is None or last >= start_date) and (end_date is None or first <= end_date):
+            selected.append(partition)
+    return selected
+
+
+def partition_paths(directory, start_date=None, end_date=None):
+    """Return the paths of the partition files overlapping a range of dates, in time order.
+
+    :param directory: A path to the directory of a partitioned data set.
+    :param start_date: A `date` on or after which matching approaches occur, or None.
+    :param end_date: A `date` on or before which matching approaches occur, or None.
+    :return: A list of paths to partition files.
+    """
+    directory = pathlib.Path(directory)
+    return [directory / partition['file']
+            for partition in select_partitions(read_manifest(directory), start_date, end_date)]
+
@@ -0,0 +1,147 @@
+"""Rebuild an `NEODatabase` in the background when its data files change.
+
+The interactive shell can run for a long time, during which `neos.csv` or
+`cad.json` may be updated. A `DatabaseReloader` watches the data files that a
+database was loaded from (by their modification times and sizes), and when
+they change, builds a new `NEODatabase` from them in a background thread. The
+current database isn't touched while this happens, so queries keep running
+against it; once the new database is complete, the shell swaps it in between
+two commands, with a single assignment.
+
+A rebuild loads the data files just as they were loaded at startup, by
+`main.load_database` with the same range of dates, so the reloaded database maps
+the same index files. It's incremental where possible: if none of the close
+approach data files changed (only `neos.csv` did), the close approaches aren't
+parsed again, but are copied from the current database - and their extra columns
+are shared with it. NEOs are always read again, since linking a database
+modifies them.
+
+If the files can't be loaded (for example, because they're still being
+written), the error is reported, and the current database is kept until the
+files change again.
+"""
+import os
+import threading
+import time
+
+
+class Reload:
+    """The outcome of a background reload: a new database (or an error), and how long it took."""
+
+    __slots__ = ('database', 'error', 'elapsed')
+
+    def __init__(self, database, error, elapsed):
+        """Create a new `Reload`.
+
+        :param database: The new `NEODatabase`, or None if the reload failed.
+        :param error: The exception that made the reload fail, or None.
+        :param elapsed: The time that the reload took, in seconds.
+        """
+        self.database = database
+        self.error = error
+        self.elapsed = elapsed
+
+
+class DatabaseReloader:
+    """Watch the data files of an `NEODatabase`, and rebuild it in the background when they change."""
+
+    def __init__(self, database, main, neo_csv_path, cad_json_path, start_date=None, end_date=None):
+        """Create a new `DatabaseReloader`.
+
+        :param database: The current `NEODatabase`, loaded from the data files.
+        :param main: The main module, whose `load_database` loaded the database, and whose
+                     `cad_data_paths` finds the close approach data files.
+        :param neo_csv_path: A path to the CSV file of near-Earth objects.
+        :param cad_json_path: The path (or directory, or glob pattern) of the close approach data.
+        :param start_date: The `date` before which close approaches weren't needed, or None.
+        :param end_date: The `date` after which close approaches weren't needed, or None.
+        """
+        self.database = database
+        self.main = main
+        self.neo_csv_path = neo_csv_path
+        self.cad_json_path = cad_json_path
+        self.start_date = start_date
+        self.end_date = end_date
+        self._signature = self.signature()
+        self._thread = None
+        self._result = None
+
+    def signature(self):
+        """Return the modification time and size of each data file, keyed by path.
+
+        A file that's missing (perhaps while it's being replaced) has a signature of None.
+        """
+        try:
+            paths = [self.neo_csv_path] + self.main.cad_data_paths(self.cad_json_path)
+        except (OSError, ValueError):
+            paths = [self.neo_csv_path]
+        signature = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                signature[str(path)] = None
+            else:
+                signature[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return signature
+
+    @property
+    def reloading(self):
+        """Return whether a reload is running in the background."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def changed(self):
+        """Return whether the data files have changed since the database (or failed reload) was loaded."""
+        return self.signature() != self._signature
+
+    def start(self):
+        """Start rebuilding the database in a background thread, unless a rebuild is already running.
+
+        :return: Whether a new rebuild was started.
+        """
+        if self.reloading or self._result is not None:
+            return False
+        signature = self.signature()
+        self._thread = threading.Thread(target=self._reload, args=(self.database, signature),
+                                        name='neo-reload', daemon=True)
+        self._thread.start()
+        return True
+
+    def _reload(self, current, signature):
+        """Build a new database (in the background), and keep the outcome for `poll`."""
+        start = time.perf_counter()
+        neo_key = str(self.neo_csv_path)
+        old_cad = {path: stamp for path, stamp in self._signature.items() if path != neo_key}
+        new_cad = {path: stamp for path, stamp in signature.items() if path != neo_key}
+        try:
+            loaded = None
+            if new_cad == old_cad:
+                loaded = [approach.copy() for approach in current.query()], current.approach_columns
+            database = self.main.load_database(self.neo_csv_path, self.cad_json_path,
+                                               self.start_date, self.end_date, loaded=loaded)
+        except Exception as error:
+            # Whatever went wrong, the current database is kept, and the error is reported.
+            self._result = Reload(None, error, time.perf_counter() - start)
+        else:
+            self._result = Reload(database, None, time.perf_counter() - start)
+        self._signature = signature
+
+    def poll(self):
+        """Return the outcome of a finished background reload, once, or None.
+
+        If the reload succeeded, its database becomes the current database.
+
+        :return: A `Reload`, or None if no reload has finished since the last poll.
+        """
+        if self.reloading or self._result is None:
+            return None
+        result, self._result = self._result, None
+        if result.database is not None:
+            self.database = result.database
+        return result
+
+    def wait(self, timeout=None):
+        """Wait for a background reload to finish, and return its outcome, like `poll`."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.poll()
@@ -0,0 +1,256 @@
+"""Estimate the results of queries from a stratified sample of close approaches.
+
+Exploratory questions - about how many close approaches are closer than 0.05
+au each year, say - don't need an exact scan of every approach. A
+`StratifiedSample` holds a fixed random sample of the rows of an `NEODatabase`,
+drawn separately from each year (stratum) in proportion to the number of
+approaches in that year, so that every year is represented. Filters are then
+evaluated only on the sampled approaches, and the counts and means of the
+matching approaches (by group, as in `aggregate`) are estimated, each with a
+95% confidence interval.
+
+Counts are estimated by weighting each sampled match by the number of
+approaches that its sampled row stands for in its stratum. Means are estimated
+as the ratio of two such weighted totals, with a linearized (Taylor series)
+variance. Both variances include the finite population correction, so a
+sample of every approach gives exact results with zero-width intervals.
+
+Groups with no sampled matches can't be estimated, and so are left out.
+"""
+import math
+import random
+
+from aggregate import GROUP_KEYS, MEASURES
+from helpers import minutes_to_date
+
+# The number of standard errors on either side of an estimate in a 95% confidence interval.
+Z_95 = 1.959963984540054
+
+# The default number of close approaches in a sample.
+DEFAULT_SAMPLE_SIZE = 20000
+
+
+class Estimate:
+    """An estimated value, with the half-width of its 95% confidence interval."""
+
+    __slots__ = ('value', 'margin')
+
+    def __init__(self, value, margin):
+        """Create a new `Estimate`.
+
+        :param value: The estimated value, or NaN if it can't be estimated.
+        :param margin: The half-width of the 95% confidence interval around the value.
+        """
+        self.value = value
+        self.margin = margin
+
+    @property
+    def low(self):
+        """Return the lower bound of the 95% confidence interval."""
+        return self.value - self.margin
+
+    @property
+    def high(self):
+        """Return the upper bound of the 95% confidence interval."""
+        return self.value + self.margin
+
+    def __str__(self):
+        """Return `str(self)`."""
+        return f"{self.value:.3f} ± {self.margin:.3f}"
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"Estimate(value={self.value!r}, margin={self.margin!r})"
+
+
+class _Totals:
+    """Running totals of the sampled matches of one group in one stratum."""
+
+    __slots__ = ('count', 'measures')
+
+    def __init__(self):
+        """Create new, empty `_Totals`."""
+        self.count = 0
+        # For each measure: the number of known values, their sum, and the sum of their squares.
+        self.measures = [[0, 0.0, 0.0] for _ in MEASURES]
+
+
+def _sample_variance(total, total_squares, n):
+    """Return the sample variance of `n` values (including zeros) with the given sums."""
+    if n < 2:
+        return 0.0
+    return max(0.0, (total_squares - total * total / n) / (n - 1))
+
+
+class ApproxSummary:
+    """Estimates of the number of matching close approaches in a group, and of their mean attributes."""
+
+    __slots__ = ('group_by', 'group', 'count', 'distance', 'velocity', 'diameter',
+                 'sample_count', 'sample_size', 'population')
+
+    def __init__(self, group_by, group, count, means, sample_count, sample_size, population):
+        """Create a new `ApproxSummary`.
+
+        :param group_by: The name of the grouping, one of the keys of `GROUP_KEYS`, or None.
+        :param group: The value shared by the close approaches in this group.
+        :param count: An `Estimate` of the number of matching close approaches in the group.
+        :param means: A list of `Estimate`s of the mean of each of `MEASURES`.
+        :param sample_count: The number of sampled close approaches that matched, in the group.
+        :param sample_size: The number of close approaches in the sample.
+        :param population: The number of close approaches that the sample was drawn from.
+        """
+        self.group_by = group_by
+        self.group = group
+        self.count = count
+        self.distance, self.velocity, self.diameter = means
+        self.sample_count = sample_count
+        self.sample_size = sample_size
+        self.population = population
+
+    @staticmethod
+    def fieldnames(group_by):
+        """Return the names of the fields of a serialized summary, in order."""
+        names = [group_by] if group_by else []
+        names += ['count', 'count_low', 'count_high']
+        for measure, unit in MEASURES:
+            names += [f'{measure}_{unit}_mean', f'{measure}_{unit}_mean_low', f'{measure}_{unit}_mean_high']
+        return names + ['sample_count', 'sample_size', 'population']
+
+    def serialize(self):
+        """Convert this summary into a serializable data form for JSON and CSV."""
+        values = [self.group] if self.group_by else []
+        for estimate in (self.count,) + tuple(getattr(self, measure) for measure, _ in MEASURES):
+            values += [estimate.value, estimate.low, estimate.high]
+        values += [self.sample_count, self.sample_size, self.population]
+        return dict(zip(self.fieldnames(self.group_by), values))
+
+    def __str__(self):
+        """Return `str(self)`."""
+        prefix = f"{self.group_by} {self.group}: " if self.group_by else ""
+        parts = [f"{prefix}about {self.count.value:.0f} approaches "
+                 f"(95% CI {max(0.0, self.count.low):.0f}-{self.count.high:.0f})"]
+        for measure, unit in MEASURES:
+            estimate = getattr(self, measure)
+            if estimate.value == estimate.value:
+                parts.append(f"mean {measure} {estimate} {unit.replace('_', '/')}")
+            else:
+                parts.append(f"{measure} unknown")
+        parts.append(f"from {self.sample_count} matches in a sample of "
+                     f"{self.sample_size} of {self.population} approaches")
+        return ', '.join(parts)
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"ApproxSummary(group_by={self.group_by!r}, group={self.group!r}, count={self.count!r})"
+
+
+class StratifiedSample:
+    """A random sample of the rows of the close approaches, stratified by year."""
+
+    def __init__(self, approaches, size=DEFAULT_SAMPLE_SIZE, seed=0, approach_columns=None):
+        """Draw a new `StratifiedSample`.
+
+        Each year gets a share of the sample in proportion to its number of close
+        approaches (but at least one row), and its rows are drawn uniformly at
+        random, without replacement.
+
+        :param approaches: The sequence of linked close approaches to sample, indexed by row.
+        :param size: The approximate number of close approaches to sample.
+        :param seed: The seed of the random number generator, for repeatable samples.
+        :param approach_columns: The `ApproachColumnStore` of the approaches, or None.
+        """
+        self._approaches = approaches
+        self._approach_columns = approach_columns
+        self.population = len(approaches)
+
+        strata = {}
+        for row, approach in enumerate(approaches):
+            strata.setdefault(minutes_to_date(approach.minutes).year, []).append(row)
+
+        rng = random.Random(seed)
+        fraction = min(1.0, size / self.population) if self.population else 1.0
+        # A list of (number of approaches, sampled rows) for each stratum, in order.
+        self.strata = []
+        for year in sorted(strata):
+            rows = strata[year]
+            n = min(len(rows), max(1, round(len(rows) * fraction)))
+            self.strata.append((len(rows), sorted(rng.sample(rows, n))))
+        self.size = sum(len(rows) for _, rows in self.strata)
+
+    def _row_tests(self, filters):
+        """Return a predicate on (row, approach) for each filter."""
+        from filters import ApproachColumnFilter
+        tests = []
+        for f in filters:
+            if isinstance(f, ApproachColumnFilter):
+                if self._approach_columns is None:
+                    raise ValueError(f"The '{f.column}' column isn't available for these close approaches.")
+                values = self._approach_columns[f.column]
+                tests.append(lambda row, approach, f=f, values=values: f.op(values[row], f.value))
+            else:
+                tests.append(lambda row, approach, f=f: f(approach))
+        return tests
+
+    def estimate(self, filters=(), group_by=None):
+        """Estimate the number and mean attributes of the close approaches matching some filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param group_by: The grouping to use, one of the keys of `GROUP_KEYS`, or None for one group.
+        :return: A list of `ApproxSummary`s, sorted by group.
+        """
+        tests = self._row_tests(filters)
+        key = GROUP_KEYS[group_by] if group_by else (lambda approach: None)
+        approaches = self._approaches
+
+        # For each group, the running totals in each stratum.
+        totals = {}
+        for index, (_, rows) in enumerate(self.strata):
+            for row in rows:
+                approach = approaches[row]
+                if not all(test(row, approach) for test in tests):
+                    continue
+                groups = totals.setdefault(key(approach), {})
+                cell = groups.get(index)
+                if cell is None:
+                    cell = groups[index] = _Totals()
+                cell.count += 1
+                for values, x in zip(cell.measures, (approach.distance, approach.velocity,
+                                                     approach.neo.diameter)):
+                    if x == x:
+                        values[0] += 1
+                        values[1] += x
+                        values[2] += x * x
+
+        return [self._summarize(group_by, group, totals[group]) for group in sorted(totals)]
+
+    def _summarize(self, group_by, group, cells):
+        """Turn the per-stratum totals of one group into an `ApproxSummary`."""
+        count = variance = 0.0
+        for index, cell in cells.items():
+            population, rows = self.strata[index]
+            n = len(rows)
+            count += population / n * cell.count
+            # The matches are indicators (0 or 1), so the sum of their squares is their count.
+            variance += population ** 2 * (1 - n / population) / n * _sample_variance(cell.count, cell.count, n)
+        count_estimate = Estimate(count, Z_95 * math.sqrt(variance))
+
+        means = []
+        for measure in range(len(MEASURES)):
+            weighted = [(self.strata[index], cell.measures[measure]) for index, cell in cells.items()]
+            known = sum(population / len(rows) * m for (population, rows), (m, _, _) in weighted)
+            if not known:
+                means.append(Estimate(float('nan'), float('nan')))
+                continue
+            mean = sum(population / len(rows) * sx for (population, rows), (_, sx, _) in weighted) / known
+            # Linearize the ratio: each sampled row contributes d = y * (x - mean), where y = 0
+            # for rows that aren't matches with a known value.
+            variance = 0.0
+            for (population, rows), (m, sx, sxx) in weighted:
+                n = len(rows)
+                total = sx - mean * m
+                squares = sxx - 2 * mean * sx + mean * mean * m
+                variance += population ** 2 * (1 - n / population) / n * _sample_variance(total, squares, n)
+            means.append(Estimate(mean, Z_95 * math.sqrt(variance) / known))
+
+        return ApproxSummary(group_by, group, count_estimate, means,
+                             sum(cell.count for cell in cells.values()), self.size, self.population)
@@ -0,0 +1,109 @@
+"""Search for near-Earth objects by partial or misspelled names and designations.
+
+A `NameIndex` supports the `search` subcommand. It holds two auxiliary
+structures built from a collection of `NearEarthObject`s:
+
+- a sorted list of the case-folded names and primary designations, so that all
+  of the keys starting with a prefix are found by binary search, and
+- an n-gram index over the case-folded names, so that names that are spelled
+  slightly differently from the search text (e.g. "apophs" for "Apophis") can
+  be found without comparing the search text against every name.
+
+Matches are ranked: exact matches come first, then prefix matches (in
+alphabetical order), and then fuzzy matches (by decreasing n-gram similarity).
+Designations are only matched exactly or by prefix - designations like
+"2020 AB1" share too many n-grams with one another for fuzzy matching to help.
+"""
+import bisect
+import collections
+
+# The length of the n-grams used for typo-tolerant matching. Names are short, so
+# bigrams tolerate a typo better than trigrams do.
+NGRAM = 2
+
+# The minimum Dice coefficient between n-gram sets for a fuzzy match.
+MIN_SIMILARITY = 0.4
+
+
+def normalize(text):
+    """Normalize search text or a key for case-insensitive comparisons."""
+    return ' '.join(text.casefold().split())
+
+
+def ngrams(text):
+    """Return the set of n-grams of normalized text, padded to weight its first and last letters."""
+    padded = f' {text} '
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class NameIndex:
+    """An index of NEOs by name and primary designation, for prefix and fuzzy search."""
+
+    def __init__(self, neos):
+        """Create a new `NameIndex`.
+
+        :param neos: A collection of `NearEarthObject`s.
+        """
+        entries = []
+        for neo in neos:
+            entries.append((normalize(neo.designation), neo))
+            if neo.name:
+                entries.append((normalize(neo.name), neo))
+        entries.sort(key=lambda entry: entry[0])
+        self._keys = [key for key, _ in entries]
+        self._neos = [neo for _, neo in entries]
+
+        # Map each n-gram to the names containing it, by position in `self._names`.
+        self._names = sorted(((normalize(neo.name), neo) for neo in neos if neo.name),
+                             key=lambda entry: entry[0])
+        self._name_ngrams = []
+        self._postings = collections.defaultdict(list)
+        for position, (name, _) in enumerate(self._names):
+            grams = ngrams(name)
+            self._name_ngrams.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(position)
+
+    def search(self, text, limit=10):
+        """Find the NEOs best matching some search text.
+
+        :param text: The search text, such as a partial name or designation.
+        :param limit: The maximum number of matches to return.
+        :return: A list of at most `limit` `NearEarthObject`s, best matches first.
+        """
+        query = normalize(text)
+        if not query or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(neo):
+            if id(neo) not in seen:
+                seen.add(id(neo))
+                results.append(neo)
+            return len(results) >= limit
+
+        # All keys with this prefix are contiguous, starting with an exact match if any.
+        start = bisect.bisect_left(self._keys, query)
+        for position in range(start, len(self._keys)):
+            if not self._keys[position].startswith(query) or add(self._neos[position]):
+                break
+        if len(results) >= limit:
+            return results
+
+        # Count the n-grams each name shares with the search text.
+        grams = ngrams(query)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for position, count in shared.items():
+            similarity = 2 * count / (len(grams) + self._name_ngrams[position])
+            if similarity >= MIN_SIMILARITY:
+                scored.append((-similarity, self._names[position][0], position))
+        scored.sort()
+        for _, _, position in scored:
+            if add(self._names[position][1]):
+                break
+        return results
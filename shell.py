@@ -0,0 +1,298 @@
+"""An interactive command shell for repeatedly inspecting and querying NEOs.
+
+The `NEOShell` is started by the `interactive` subcommand of the main module. It
+lives in its own module so that `cmd`, `shlex` and the rest of the shell's
+machinery are only imported by sessions that actually use them. The main module
+is passed to the shell, which runs its subcommand functions; it isn't imported
+here, since a script run as `python3 main.py` would then be imported a second
+time, as a separate module.
+"""
+import cmd
+import shlex
+import sys
+import time
+
+from write import write_to_stdout
+
+# The current time, for use with the kill-on-change feature of the interactive shell.
+_START = time.time()
+
+
+class NEOShell(cmd.Cmd):
+    """Perform the `interactive` subcommand.
+
+    This is a `cmd.Cmd` shell - a specialized tool for command-based REPL sessions.
+
+    It wraps the `inspect`, `query`, `search` and `aggregate` parsers to parse
+    flags for those commands as if they were supplied at the command line.
+
+    The primary purpose of this shell is to allow users to repeatedly perform
+    inspect and query commands, while only loading the data (which can be quite
+    slow) once.
+
+    The shell also keeps a cursor into the results of the latest query printed
+    to stdout, so that the `more` command can print the next page of results by
+    resuming the same stream, rather than by running the query again.
+
+    If the shell has a `reload.DatabaseReloader`, it checks the data files before
+    each command. When they change, a new database is built in the background
+    while commands keep running against the current one, and the new database
+    is swapped in before the first command after it's ready.
+    """
+    intro = ("Explore close approaches of near-Earth objects. "
+             "Type `help` or `?` to list commands and `exit` to exit.\n")
+    prompt = '(neo) '
+
+    def __init__(self, database, parsers, main, aggressive=False, reloader=None, **kwargs):
+        """Create a new `NEOShell`.
+
+        Creating this object doesn't start the session - for that, use `.cmdloop()`.
+
+        :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+        :param parsers: A dictionary mapping each subcommand to its subparser.
+        :param main: The main module, whose `inspect`, `query`, `search` and `aggregate`
+                     functions perform the subcommands.
+        :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param reloader: A `DatabaseReloader` watching the database's data files, or None.
+        :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
+        """
+        super().__init__(**kwargs)
+        self.db = database
+        self.parsers = parsers
+        self.main = main
+        self.aggressive = aggressive
+        self.reloader = reloader
+
+        # The unprinted results of the latest query, and the number of them to print per page.
+        self.cursor = None
+        self.page_size = 10
+
+    @classmethod
+    def parse_arg_with(cls, arg, parser):
+        """Parse the additional text passed to a command, using a given parser.
+
+        If any error is encountered (in lexical parsing or argument parsing),
+        print the error to stderr and return None.
+
+        :param arg: The additional text supplied after the command.
+        :param parser: An `argparse.ArgumentParser` to parse the arguments.
+        :return: A `Namespace` of the arguments (produced by `parse_args`) or None.
+        """
+        # Lexically parse the additional text with POSIX shell-like syntax.
+        try:
+            args = shlex.split(arg)
+        except ValueError as err:
+            print(err, file=sys.stderr)
+            return None
+
+        # Use the ArgumentParser to parse the shell arguments.
+        try:
+            return parser.parse_args(args)
+        except SystemExit as err:
+            # The `parse_args` method doesn't actually surface `ArgumentError`s
+            # nor `ArgumentTypeError`s - instead, it calls its own `error`
+            # method which prints the error message and then calls `sys.exit`.
+            return None
+
+    def do_i(self, arg):
+        """Shorthand for `inspect`."""
+        self.do_inspect(arg)
+
+    def do_inspect(self, arg):
+        """Perform the `inspect` subcommand within the REPL session.
+
+        Inspect an NEO by designation or by name:
+
+            (neo) inspect --pdes 1P
+            (neo) inspect --name Halley
+
+        Additionally, list all known close approaches:
+
+            (neo) inspect --verbose --name Eros
+        """
+        args = self.parse_arg_with(arg, self.parsers['inspect'])
+        if not args:
+            return
+
+        # Run the `inspect` subcommand.
+        self.main.inspect(self.db,
+                          pdes=args.pdes, name=args.name,
+                          verbose=args.verbose)
+
+    def do_q(self, arg):
+        """Shorthand for `query`."""
+        self.do_query(arg)
+
+    def do_query(self, arg):
+        """Perform the `query` subcommand within the REPL session.
+
+        This command behaves the same as the `query` subcommand from the command
+        line. For example, to query close approaches on January 1st, 2020:
+
+            (neo) query --date 2020-01-01
+
+        You can use any of the other filters: `--start-date`, `--end-date`,
+        `--min-distance`, `--max-distance`, `--min-velocity`, `--max-velocity`,
+        `--min-diameter`, `--max-diameter`, `--hazardous`, `--not-hazardous`,
+        `--known-diameter`, `--unknown-diameter`, `--named`, `--unnamed`,
+        `--min-moid`, `--max-moid`, `--orbit-class`, `--max-dist-min`, `--max-dist-max`.
+
+        Extra columns of the data files can be added to the results with `--columns`:
+
+            (neo) query --max-dist-min 0.01 --columns dist_min,dist_max
+
+        To print only the number of matches, or whether there are any, use `--count` or `--exists`:
+
+            (neo) query --count --hazardous --max-distance 0.05
+
+        The number of results shown can be limited to a maximum number with `--limit`:
+
+            (neo) query --limit 2
+
+        That many results are printed per page, and `more` prints the next page:
+
+            (neo) query --limit 5 --hazardous
+            (neo) more
+
+        The results can be saved to a file (instead of displayed to stdout) with
+        `--outfile`:
+
+            (neo) query --limit 5 --outfile results.csv
+            (neo) query --limit 5 --outfile results.json
+        """
+        args = self.parse_arg_with(arg, self.parsers['query'])
+        if not args:
+            return
+
+        # Run the `query` subcommand, keeping the rest of the results for `more`.
+        self.cursor = self.main.query(self.db, args, paginate=True)
+        self.page_size = args.limit or 10
+
+    def do_next(self, arg):
+        """Shorthand for `more`."""
+        self.do_more(arg)
+
+    def do_more(self, arg):
+        """Print the next page of results of the latest `query`.
+
+        The results continue from where the previous page stopped, without
+        running the query again. By default, a page has as many results as the
+        query's `--limit` (or 10), but another number can be given:
+
+            (neo) more
+            (neo) more 50
+        """
+        try:
+            size = int(arg) if arg.strip() else self.page_size
+        except ValueError:
+            print(f"'{arg}' is not a number of results.", file=sys.stderr)
+            return
+        if size < 1:
+            print(f"The number of results must be at least 1, not {size}.", file=sys.stderr)
+            return
+        if self.cursor is None:
+            print("There are no more results. Run a `query` first.", file=sys.stderr)
+            return
+        if write_to_stdout(self.cursor, size) < size:
+            # The stream is exhausted.
+            self.cursor = None
+
+    def do_s(self, arg):
+        """Shorthand for `search`."""
+        self.do_search(arg)
+
+    def do_search(self, arg):
+        """Perform the `search` subcommand within the REPL session.
+
+        List the NEOs whose names or primary designations match a partial,
+        case-insensitive, or slightly misspelled search text:
+
+            (neo) search apo
+            (neo) search --limit 3 eros
+        """
+        args = self.parse_arg_with(arg, self.parsers['search'])
+        if not args:
+            return
+
+        # Run the `search` subcommand.
+        self.main.search(self.db, args.text, limit=args.limit)
+
+    def do_a(self, arg):
+        """Shorthand for `aggregate`."""
+        self.do_aggregate(arg)
+
+    def do_aggregate(self, arg):
+        """Perform the `aggregate` subcommand within the REPL session.
+
+        Summarize the close approaches matching any of the `query` filters by
+        `neo`, `year`, `month`, `day`, or `hazardous`:
+
+            (neo) aggregate --group-by month --hazardous
+            (neo) aggregate --group-by neo --max-distance 0.01 --outfile neos.csv
+        """
+        args = self.parse_arg_with(arg, self.parsers['aggregate'])
+        if not args:
+            return
+
+        # Run the `aggregate` subcommand.
+        self.main.aggregate(self.db, args)
+
+    def do_EOF(self, _arg):
+        """Exit the interactive session."""
+        return True
+
+    # Alternative ways to quit.
+    do_exit = do_EOF
+    do_quit = do_EOF
+
+    def do_reload(self, _arg):
+        """Reload the data files now, waiting for the new database.
+
+        Changes to the data files are normally picked up in the background; this
+        waits for any reload in progress (or starts one, if the files changed).
+        """
+        if self.reloader is None:
+            print("This session can't reload its data files.", file=sys.stderr)
+            return
+        if self.reloader.changed():
+            self.reloader.start()
+        self.swap_database(self.reloader.wait())
+
+    def swap_database(self, result):
+        """Swap in the database built by a finished background reload, and report how it went.
+
+        :param result: A `reload.Reload`, or None if no reload has finished.
+        """
+        if result is None:
+            return
+        if result.database is None:
+            print(f"Couldn't reload the data files ({result.error}); "
+                  "keeping the current database.", file=sys.stderr)
+            return
+        self.db = result.database
+        print(f"Reloaded the data files in {result.elapsed:.2f} seconds.", file=sys.stderr)
+
+    def check_data_files(self):
+        """Swap in a reloaded database if one is ready, or start reloading if the data files changed."""
+        if self.reloader is None:
+            return
+        self.swap_database(self.reloader.poll())
+        if not self.reloader.reloading and self.reloader.changed() and self.reloader.start():
+            print("The data files have changed; reloading them in the background.", file=sys.stderr)
+
+    def precmd(self, line):
+        """Watch for changes to the files in this project, and to the data files."""
+        self.check_data_files()
+        root = self.main.PROJECT_ROOT
+        changed = [f for f in root.glob('*.py') if f.stat().st_mtime > _START]
+        if changed:
+            print("The following file(s) have been modified since this interactive session began: "
+                  f"{', '.join(str(f.relative_to(root)) for f in changed)}.",
+                  file=sys.stderr)
+            if not self.aggressive:
+                print("To include these changes, please exit and restart this interactive session.",
+                      file=sys.stderr)
+            else:
+                print("Preemptively terminating the session aggressively.", file=sys.stderr)
+                return 'exit'
+        return line
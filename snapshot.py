@@ -0,0 +1,120 @@
+"""Share an `NEODatabase` between threads as a sequence of immutable versions.
+
+A `NEODatabase` isn't safe to modify while other threads query it: `query` is a
+generator over its list of close approaches, and linking a database modifies its
+NEOs and approaches. So, once a database is published to a `VersionedDatabase`,
+it must not be modified again. Nothing enforces this - the versions are immutable
+only by convention, and code that modifies a published database (or its NEOs and
+approaches) breaks the readers of that version.
+
+Readers call `snapshot` to get the current `Version` (a version number and its
+database), and query that. Taking a snapshot is a single attribute read, and
+queries take no locks at all; a reader keeps using the same version for as long
+as it holds it, even if newer versions are published in the meantime.
+
+Writers build a whole new database, without touching the current one, and
+publish it with a single assignment. Only writers are serialized (by a lock), so
+that a writer that builds on the current version - such as `append` - doesn't
+lose another writer's changes. Readers never wait for writers.
+
+Versions share nothing but the extra approach columns: building a version on
+the current one (as `append` does) copies every NEO and close approach, so each
+append costs time and memory in proportion to the whole database, however few
+approaches it adds. Appends should be batched rather than made one at a time.
+
+The indexes and caches that a database builds lazily (such as its bitmap index,
+search index, samples and extra columns) are each built completely and then
+stored with a single assignment, so readers that race to build one may each
+build it, but never see one half-built.
+"""
+import collections
+import threading
+
+from columns import ExtendedColumns
+from database import NEODatabase
+
+
+# A published version of the database: its number, counting from 1, and the (immutable) database.
+Version = collections.namedtuple('Version', ['number', 'database'])
+
+
+def copy_database(database, approaches=()):
+    """Build a new database with copies of the NEOs and close approaches of another.
+
+    The existing database isn't modified. Every NEO and approach is copied, in
+    O(n) time and memory, and only its extra approach columns are shared with the
+    copy. New approaches have no extra columns, so their values in the
+    copy's columns are unknown, and never match a filter on those columns.
+
+    :param database: The `NEODatabase` to copy.
+    :param approaches: A collection of new, unlinked `CloseApproach`es to add to the copy.
+    :return: A new `NEODatabase`.
+    """
+    approaches = list(approaches)
+    copies = [approach.copy() for approach in database.query()]
+    columns = database.approach_columns
+    if approaches and columns is not None:
+        columns = ExtendedColumns(columns, len(approaches))
+    return NEODatabase([neo.copy() for neo in database.neos], copies + approaches, columns)
+
+
+class VersionedDatabase:
+    """A holder of the current version of an `NEODatabase`, shared by reader and writer threads."""
+
+    def __init__(self, database):
+        """Create a new `VersionedDatabase`, publishing a first version.
+
+        :param database: The initial `NEODatabase`, which must not be modified after this.
+        """
+        self._write_lock = threading.Lock()
+        self._current = Version(1, database)
+
+    def snapshot(self):
+        """Return the current `Version`, to query without locks for as long as it's needed."""
+        return self._current
+
+    @property
+    def database(self):
+        """Return the database of the current version."""
+        return self._current.database
+
+    def publish(self, database):
+        """Publish a new database as the current version.
+
+        Readers that already hold an older version keep using it.
+
+        :param database: The new `NEODatabase`, which must not be modified after this.
+        :return: The new `Version`.
+        """
+        with self._write_lock:
+            return self._publish(database)
+
+    def _publish(self, database):
+        """Publish a new version; the caller holds the write lock."""
+        version = Version(self._current.number + 1, database)
+        self._current = version
+        return version
+
+    def update(self, build):
+        """Build a new version from the current one, and publish it.
+
+        No other writer can publish a version in the meantime.
+
+        :param build: A function that takes the current `NEODatabase` (without modifying it)
+                      and returns a new `NEODatabase`.
+        :return: The new `Version`.
+        """
+        with self._write_lock:
+            return self._publish(build(self._current.database))
+
+    def append(self, approaches):
+        """Publish a new version with some close approaches added to the current version's.
+
+        The whole current version is copied (see `copy_database`), so an append
+        costs as much as the database's size, not as the number of new approaches.
+
+        :param approaches: A collection of new, unlinked `CloseApproach`es, whose
+                           designations match NEOs in the database.
+        :return: The new `Version`.
+        """
+        return self.update(lambda database: copy_database(database, approaches))
@@ -0,0 +1,213 @@
+"""Sort streams of close approaches that may not fit in memory.
+
+An `ExternalSorter` sorts a stream of items while holding at most about
+`memory_budget` bytes of them in memory. Items are collected into runs that fit
+within the budget; each run is sorted and spilled to a temporary file, and the
+sorted runs are then combined with a k-way heap merge that reads them back one
+item at a time. If the whole stream fits within the budget, nothing is spilled.
+
+The sort is stable - items with equal keys keep their original relative order,
+in both ascending and descending sorts.
+
+The approaches of an `NEODatabase` are sorted with their rows (see
+`sort_rows`): only the rows are spilled, and each approach is looked up again by
+its row as the runs are merged.
+
+The `SORT_KEYS` dictionary maps the supported values of `--sort-by` to a
+function that computes the sort key of a close approach.
+"""
+import heapq
+import itertools
+import pickle
+import sys
+import tempfile
+
+# Functions to compute the value by which a close approach is sorted.
+SORT_KEYS = {
+    'time': lambda approach: approach.minutes,
+    'distance': lambda approach: approach.distance,
+    'velocity': lambda approach: approach.velocity,
+    'diameter': lambda approach: approach.neo.diameter,
+}
+
+# The most spilled runs of the same length that are kept before they're merged
+# into one longer run, to bound the number of open files.
+MAX_MERGE_FAN_IN = 64
+
+# The multipliers for the suffixes accepted by `parse_size`.
+_SIZE_SUFFIXES = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """Convert a size like '512K', '64M', or '1G' (or a plain number of bytes) into bytes.
+
+    :param text: A number of bytes, optionally followed by a K, M, or G suffix.
+    :return: The number of bytes, as an int.
+    :raises ValueError: If the text isn't a valid, positive size.
+    """
+    text = text.strip().upper().rstrip('B')
+    suffix = text[-1:] if text[-1:] in _SIZE_SUFFIXES else ''
+    size = int(float(text[:len(text) - len(suffix)]) * _SIZE_SUFFIXES[suffix])
+    if size <= 0:
+        raise ValueError(f"'{text}' is not a positive size.")
+    return size
+
+
+def _deep_size(value):
+    """Estimate the memory used by a value and (for tuples) everything it holds."""
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_deep_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _spill(records):
+    """Write sorted records to a new temporary file, and return the file."""
+    spill = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(spill, protocol=pickle.HIGHEST_PROTOCOL)
+    # Records hold no shared or recursive references, so memoizing is unneeded -
+    # and it would keep every record alive in both the pickler and the unpickler.
+    pickler.fast = True
+    for record in records:
+        pickler.dump(record)
+    spill.seek(0)
+    return spill
+
+
+def _read(spill):
+    """Generate the records from a spill file, one at a time, and then close it."""
+    unpickler = pickle.Unpickler(spill)
+    try:
+        while True:
+            try:
+                record = unpickler.load()
+            except EOFError:
+                return
+            yield record
+    finally:
+        spill.close()
+
+
+class ExternalSorter:
+    """A stable sort of a stream of items within a memory budget."""
+
+    def __init__(self, key, memory_budget, reverse=False, encode=None, decode=None):
+        """Create a new `ExternalSorter`.
+
+        :param key: A function computing the sort key of an item.
+        :param memory_budget: The approximate maximum number of bytes of items to hold in memory.
+        :param reverse: Whether to sort in descending order.
+        :param encode: A function converting an item into a compact, picklable record.
+        :param decode: A function converting such a record back into an item.
+        """
+        self.key = key
+        self.memory_budget = memory_budget
+        self.reverse = reverse
+        self.encode = encode or (lambda item: item)
+        self.decode = decode or (lambda record: record)
+
+        # The number of runs spilled to disk by the latest sort, for reporting.
+        self.spilled_runs = 0
+
+    def _records(self, items):
+        """Generate (key, tiebreaker, record) tuples that sort stably in the requested order."""
+        sign = -1 if self.reverse else 1
+        for sequence, item in enumerate(items):
+            yield self.key(item), sign * sequence, self.encode(item)
+
+    def sort(self, items, limit=None):
+        """Generate the items of a stream in sorted order.
+
+        :param items: An iterable of items to sort.
+        :param limit: If given, only the first `limit` items in sorted order are needed.
+        :yield: The items, in sorted order.
+        """
+        self.spilled_runs = 0
+        records = self._records(items)
+        first = next(records, None)
+        if first is None:
+            return
+        run_length = max(1, self.memory_budget // _deep_size(first))
+        records = itertools.chain([first], records)
+
+        # Only the best `limit` records ever need to be held.
+        if limit and limit <= run_length:
+            select = heapq.nlargest if self.reverse else heapq.nsmallest
+            for record in select(limit, records):
+                yield self.decode(record[2])
+            return
+
+        # Spilled runs are kept in levels, where a run at level `i` is the merge of
+        # `MAX_MERGE_FAN_IN ** i` original runs. Whenever a level fills up, its runs are
+        # merged into one run at the next level, to bound the number of open files.
+        levels = []
+        in_memory = None
+        while True:
+            run = list(itertools.islice(records, run_length))
+            if not run:
+                break
+            run.sort(reverse=self.reverse)
+            if not levels and len(run) < run_length:
+                # Everything fit in memory, so there's no need to spill.
+                in_memory = run
+                break
+            self._add_run(levels, _spill(run))
+            del run
+
+        runs = [in_memory] if in_memory is not None else [run for level in levels for run in level]
+        merged = self._merge(runs)
+        if limit:
+            merged = itertools.islice(merged, limit)
+        for record in merged:
+            yield self.decode(record[2])
+
+    def _add_run(self, levels, run, level=0):
+        """Add a spilled run to the given level, cascading merges into higher levels."""
+        self.spilled_runs += 1
+        while True:
+            if len(levels) <= level:
+                levels.append([])
+            levels[level].append(run)
+            if len(levels[level]) < MAX_MERGE_FAN_IN:
+                return
+            run = _spill(self._merge(levels[level]))
+            levels[level] = []
+            level += 1
+
+    def _merge(self, runs):
+        """Merge sorted runs (in-memory lists or spill files) into one sorted stream of records."""
+        streams = [run if isinstance(run, list) else _read(run) for run in runs]
+        return heapq.merge(*streams, key=lambda record: record[:2], reverse=self.reverse)
+
+
+def _sort_key(sort_by, reverse):
+    """Return a function computing the sort key of a close approach, with NaNs sorted last."""
+    value = SORT_KEYS[sort_by]
+    missing = -1 if reverse else 1
+
+    def key(approach):
+        result = value(approach)
+        return (missing, 0.0) if result != result else (0, result)
+
+    return key
+
+
+def sort_rows(rows, get_approach, sort_by, memory_budget, reverse=False, limit=None):
+    """Sort a stream of (row, close approach) pairs, as generated by `NEODatabase.query_rows`.
+
+    Unknown (NaN) diameters are sorted last, whether ascending or descending.
+    Only the row of each approach is spilled, and the approach is looked up again
+    by its row as the runs are merged, so the rows stay available to look up the
+    extra columns of the sorted approaches.
+
+    :param rows: An iterable of (row, linked `CloseApproach`) tuples.
+    :param get_approach: A function returning the `CloseApproach` in a row.
+    :param sort_by: The attribute to sort by, one of the keys of `SORT_KEYS`.
+    :param memory_budget: The approximate maximum number of bytes of approaches to hold in memory.
+    :param reverse: Whether to sort in descending order.
+    :param limit: If given, only the first `limit` approaches in sorted order are needed.
+    :return: A stream of (row, `CloseApproach`) tuples, in sorted order.
+    """
+    key = _sort_key(sort_by, reverse)
+    sorter = ExternalSorter(lambda pair: key(pair[1]), memory_budget, reverse=reverse,
+                            encode=lambda pair: pair[0], decode=lambda row: (row, get_approach(row)))
+    return sorter.sort(rows, limit=limit)
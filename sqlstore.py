@@ -0,0 +1,440 @@
+"""Store near-Earth objects and their close approaches in SQLite, and query them with SQL.
+
+An `NEODatabase` keeps every NEO and close approach in memory, which doesn't
+suit data sets that don't fit comfortably in RAM. A `SQLiteDatabase` offers the
+same query interface over a SQLite database file instead. `main.py` uses it when
+it's given `--backend sqlite`.
+
+The first time, `SQLiteDatabase.open` imports `neos.csv` and `cad.json` into two
+tables of a database file beside the close approach data file (`cad.json.sqlite`).
+The rows are inserted in bulk, within a single transaction. The database records
+fingerprints of the data files (see `indexes.fingerprint`), and is rebuilt when
+they change.
+
+- `neos` has one row per NEO. Its `id` is the NEO's position in `neos.csv`. It
+  holds the attributes of a `NearEarthObject` and the extra columns in
+  `columns.COLUMNS`.
+- `approaches` has one row per close approach. Its `row` is the approach's
+  position in `cad.json`, the same row as in an `NEODatabase`. It holds the
+  approach's NEO's `id`, its time (as minutes since `helpers.EPOCH`), its
+  distance and velocity, and the extra columns in `columns.APPROACH_COLUMNS`.
+
+Unknown values (NaN diameters, empty names and so on) are stored as NULL. Every
+filterable column has an index.
+
+A query translates each filter into a parameterized SQL predicate with
+`AttributeFilter.sql`. Each predicate compares a bare column with a value, so
+SQLite can answer it from an index. The matching rows stream back from a cursor,
+in internal order, as linked `CloseApproach` objects. Each NEO is created only
+once per database, and its `.approaches` are read from SQLite when they're used.
+"""
+import csv
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+
+from columns import COLUMNS, APPROACH_COLUMNS
+from compressed import approach_data, open_data
+from extract import parse_neo, parse_approach
+from indexes import fingerprint, matches
+from models import NearEarthObject, CloseApproach
+
+# Bump this whenever the schema changes.
+SCHEMA_VERSION = 1
+
+# The number of rows inserted by each call to `executemany` while importing.
+IMPORT_BATCH_SIZE = 10000
+
+_SCHEMA = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE neos (
+    id INTEGER PRIMARY KEY,
+    designation TEXT NOT NULL UNIQUE,
+    name TEXT,
+    diameter REAL,
+    hazardous INTEGER NOT NULL,
+    {', '.join(f'{name} {"TEXT" if name == "orbit_class" else "REAL"}' for name in COLUMNS)}
+);
+CREATE TABLE approaches (
+    row INTEGER PRIMARY KEY,
+    neo INTEGER NOT NULL REFERENCES neos (id),
+    time INTEGER NOT NULL,
+    distance REAL NOT NULL,
+    velocity REAL NOT NULL,
+    {', '.join(f'{name} {"TEXT" if name == "t_sigma_f" else "REAL"}' for name in APPROACH_COLUMNS)}
+);
+"""
+
+# The indexes created once the tables are full, as (table, column) tuples.
+_INDEXES = [('neos', 'name'), ('neos', 'diameter'), ('neos', 'hazardous'),
+            ('neos', 'moid'), ('neos', 'orbit_class'),
+            ('approaches', 'neo'), ('approaches', 'time'), ('approaches', 'distance'),
+            ('approaches', 'velocity'), ('approaches', 'dist_min'), ('approaches', 'dist_max')]
+
+# The columns selected for each close approach and its NEO, in the order that `_select` expects.
+_SELECT = ("SELECT a.row, a.time, a.distance, a.velocity, "
+           "n.id, n.designation, n.name, n.diameter, n.hazardous "
+           "FROM approaches AS a JOIN neos AS n ON n.id = a.neo")
+
+
+def sqlite_path(cad_json_path):
+    """Return the path of the SQLite database file for a close approach data file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: A `pathlib.Path` next to the data file.
+    """
+    cad_json_path = pathlib.Path(cad_json_path)
+    return cad_json_path.with_name(cad_json_path.name + '.sqlite')
+
+
+def _null(value):
+    """Return None in place of NaN, for storing unknown values as NULL."""
+    return None if value != value else value
+
+
+def _neo_rows(neo_csv_path):
+    """Generate a row of the `neos` table for each row of a CSV file of NEOs."""
+    with open_data(neo_csv_path) as infile:
+        reader = csv.reader(infile)
+        header = next(reader)
+        fields = [(header.index(field), parse) for field, parse in COLUMNS.values()]
+        for id, row in enumerate(reader):
+            neo = parse_neo(row)
+            yield ((id, neo.designation, neo.name, _null(neo.diameter), neo.hazardous)
+                   + tuple(_null(parse(row[index])) for index, parse in fields))
+
+
+def _approach_rows(cad_json_path, neo_ids):
+    """Generate a row of the `approaches` table for each record of a JSON file of close approaches."""
+    names, records = approach_data(cad_json_path)
+    fields = [(names.index(field), parse) for field, parse in APPROACH_COLUMNS.values()]
+    for row, record in enumerate(records):
+        approach = parse_approach(record)
+        yield ((row, neo_ids[approach.designation], approach.minutes,
+                approach.distance, approach.velocity)
+               + tuple(_null(parse(record[index])) for index, parse in fields))
+
+
+def _insert(connection, table, rows):
+    """Insert rows into a table in batches of `IMPORT_BATCH_SIZE`."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == IMPORT_BATCH_SIZE:
+            connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(row))})", batch)
+            batch = []
+    if batch:
+        connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(batch[0]))})", batch)
+
+
+def build_sqlite(neo_csv_path, cad_json_path, path):
+    """Import the data files into a new SQLite database file.
+
+    The rows are inserted in one transaction, and the indexes are created after
+    the tables are full, which is much faster than updating them row by row.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param path: The path of the database file to create, replacing any existing file.
+    """
+    path = pathlib.Path(path)
+    partial = path.with_name(path.name + '.tmp')
+    if partial.exists():
+        partial.unlink()
+    connection = sqlite3.connect(str(partial))
+    try:
+        with connection:
+            connection.executescript(_SCHEMA)
+            _insert(connection, 'neos', _neo_rows(neo_csv_path))
+            neo_ids = dict(connection.execute("SELECT designation, id FROM neos"))
+            _insert(connection, 'approaches', _approach_rows(cad_json_path, neo_ids))
+            for table, column in _INDEXES:
+                connection.execute(f"CREATE INDEX {table}_{column} ON {table} ({column})")
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('version', str(SCHEMA_VERSION)),
+                ('neofile', json.dumps(fingerprint(neo_csv_path))),
+                ('cadfile', json.dumps(fingerprint(cad_json_path))),
+            ])
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    os.replace(partial, path)
+
+
+def _is_fresh(connection, neo_csv_path, cad_json_path):
+    """Return whether an open SQLite database still holds the contents of the data files."""
+    try:
+        meta = dict(connection.execute("SELECT key, value FROM meta"))
+    except sqlite3.DatabaseError:
+        return False
+    return (meta.get('version') == str(SCHEMA_VERSION)
+            and matches(json.loads(meta.get('neofile', 'null')), neo_csv_path)
+            and matches(json.loads(meta.get('cadfile', 'null')), cad_json_path))
+
+
+class SQLApproachView:
+    """A read-only sequence of one NEO's close approaches, read from SQLite when it's used."""
+
+    __slots__ = ('_database', '_neo')
+
+    def __init__(self, database, neo):
+        """Create a new `SQLApproachView`.
+
+        :param database: The `SQLiteDatabase` holding the approaches.
+        :param neo: The `NearEarthObject` whose approaches these are.
+        """
+        self._database = database
+        self._neo = neo
+
+    def __len__(self):
+        """Return the number of approaches."""
+        return self._database._execute(
+            "SELECT COUNT(*) FROM approaches WHERE neo = ?", [self._database._neo_ids[self._neo]]
+        ).fetchone()[0]
+
+    def __iter__(self):
+        """Generate the approaches, in internal order."""
+        return (approach for _, approach in self._database._select(
+            "WHERE a.neo = ?", [self._database._neo_ids[self._neo]]))
+
+    def __getitem__(self, index):
+        """Return the approach at an index, or a list of the approaches in a slice.
+
+        An index selects just its approach, at its offset within the NEO's approaches.
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for _, approach in self._database._select(
+                    "WHERE a.neo = ?", [self._database._neo_ids[self._neo], index], "a.row LIMIT 1 OFFSET ?"):
+                return approach
+        raise IndexError("approach index out of range")
+
+    @property
+    def summary(self):
+        """Return the `summaries.NEOSummary` of the approaches, aggregated by SQLite."""
+        from summaries import NEOSummary
+        count, closest, fastest, first, last = self._database._execute(
+            "SELECT COUNT(*), MIN(distance), MAX(velocity), MIN(time), MAX(time) FROM approaches "
+            "WHERE neo = ?", [self._database._neo_ids[self._neo]]).fetchone()
+        if not count:
+            return NEOSummary.from_approaches(self._neo, ())
+        return NEOSummary(self._neo, count, closest, fastest, first, last)
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"SQLApproachView({list(self)!r})"
+
+
+class SQLiteDatabase:
+    """A database of near-Earth objects and their close approaches, stored in SQLite.
+
+    A `SQLiteDatabase` offers the lookup and query methods of an `NEODatabase`
+    (but not its samples or search index). Results are read from the database
+    file as they're needed, rather than being held in memory.
+    """
+
+    def __init__(self, connection):
+        """Create a new `SQLiteDatabase` over an open connection to a database file.
+
+        To import the data files (if needed) and open their database, use `SQLiteDatabase.open`.
+
+        :param connection: A `sqlite3.Connection` to a database built by `build_sqlite`.
+        """
+        self._connection = connection
+        # Every `NearEarthObject` created so far, by id, and the id of each.
+        self._neos = {}
+        self._neo_ids = {}
+
+    @classmethod
+    def open(cls, neo_csv_path, cad_json_path, path=None):
+        """Open the SQLite database of a pair of data files, importing them first if needed.
+
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_path: A path to a JSON file containing data about close approaches.
+        :param path: The path of the database file, or None for the default (see `sqlite_path`).
+        :return: A `SQLiteDatabase` that is up to date with the data files.
+        """
+        path = pathlib.Path(path) if path is not None else sqlite_path(cad_json_path)
+        if path.exists():
+            connection = sqlite3.connect(str(path))
+            if _is_fresh(connection, neo_csv_path, cad_json_path):
+                return cls(connection)
+            connection.close()
+        build_sqlite(neo_csv_path, cad_json_path, path)
+        return cls(sqlite3.connect(str(path)))
+
+    def close(self):
+        """Close the connection to the database file."""
+        self._connection.close()
+
+    def _execute(self, sql, parameters=()):
+        """Execute a SQL statement, and return its cursor."""
+        return self._connection.execute(sql, parameters)
+
+    def _neo(self, id, designation, name, diameter, hazardous):
+        """Return the `NearEarthObject` with an id, creating it from its columns the first time."""
+        neo = self._neos.get(id)
+        if neo is None:
+            neo = NearEarthObject(name or '', sys.intern(designation), 'Y' if hazardous else 'N',
+                                  '' if diameter is None else repr(diameter))
+            neo.approaches = SQLApproachView(self, neo)
+            self._neos[id] = neo
+            self._neo_ids[neo] = id
+        return neo
+
+    def _select(self, where='', parameters=(), order='a.row'):
+        """Select close approaches (with their NEOs), and generate them.
+
+        :param where: A SQL `WHERE` clause over the `approaches` (`a`) and `neos` (`n`) tables.
+        :param parameters: The values of the clause's parameters.
+        :param order: A SQL `ORDER BY` expression, by default the internal order.
+        :return: A stream of (row, `CloseApproach`) tuples.
+        """
+        cursor = self._execute(f"{_SELECT} {where} ORDER BY {order}", parameters)
+        for row, time, distance, velocity, *neo in cursor:
+            yield row, CloseApproach(None, time, distance, velocity,
+                                     neo=self._neo(*neo))
+
+    def _where(self, filters):
+        """Translate a collection of filters into a SQL `WHERE` clause.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A tuple of the clause (or an empty string) and the values of its parameters.
+        :raises ValueError: If a filter can't be translated into SQL.
+        """
+        predicates = []
+        parameters = []
+        for f in filters:
+            translated = f.sql()
+            if translated is None:
+                raise ValueError(f"{f!r} isn't supported by the SQLite backend.")
+            predicates.append(f"({translated[0]})")
+            parameters.extend(translated[1])
+        return ("WHERE " + " AND ".join(predicates) if predicates else ""), parameters
+
+    def _from(self, filters):
+        """Return the tables (and `WHERE` clause and parameters) needed to count matches of filters."""
+        where, parameters = self._where(filters)
+        joined = any(f.sql_column.startswith('n.') for f in filters)
+        tables = "approaches AS a JOIN neos AS n ON n.id = a.neo" if joined else "approaches AS a"
+        return f"{tables} {where}", parameters
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation, or None if there's no match.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        row = self._execute("SELECT id, designation, name, diameter, hazardous FROM neos "
+                            "WHERE designation = ?", [designation]).fetchone()
+        return None if row is None else self._neo(*row)
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name, or None if there's no match.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        if not name:
+            return None
+        row = self._execute("SELECT id, designation, name, diameter, hazardous FROM neos "
+                            "WHERE name = ?", [name]).fetchone()
+        return None if row is None else self._neo(*row)
+
+    def get_approach_by_row(self, row):
+        """Return the close approach in a row (its position in `cad.json`).
+
+        :param row: The row of a close approach, as generated by `query_rows`.
+        :return: The `CloseApproach` in that row.
+        """
+        return next(self._select("WHERE a.row = ?", [row]))[1]
+
+    def count(self, filters=()):
+        """Count the close approaches that match a collection of filters, in SQL.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: The number of matching `CloseApproach` objects.
+        """
+        tables, parameters = self._from(filters)
+        return self._execute(f"SELECT COUNT(*) FROM {tables}", parameters).fetchone()[0]
+
+    def exists(self, filters=()):
+        """Return whether any close approach matches a collection of filters, in SQL.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: True if at least one `CloseApproach` matches every filter.
+        """
+        tables, parameters = self._from(filters)
+        return bool(self._execute(f"SELECT EXISTS (SELECT 1 FROM {tables})", parameters).fetchone()[0])
+
+    def query(self, filters=()):
+        """Query close approaches to generate those that match a collection of filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects, in internal order.
+        """
+        for _, approach in self.query_rows(filters):
+            yield approach
+
+    def query_rows(self, filters=()):
+        """Query close approaches to generate those that match a collection of filters, with their rows.
+
+        The filters are translated into one parameterized SQL query, whose results
+        are read from the cursor as they're consumed.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of (row, `CloseApproach`) tuples.
+        :raises ValueError: If a filter can't be translated into SQL.
+        """
+        return self._select(*self._where(filters))
+
+    def nearest(self, minutes, filters=()):
+        """Generate the close approaches that match a collection of filters, nearest in time first.
+
+        Two queries walk the index on `time` away from the instant - one forward,
+        one backward - and their results are merged by distance in time as they're
+        consumed.
+
+        :param minutes: The instant, in minutes since `helpers.EPOCH`.
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects, in order of their distance in time.
+        :raises ValueError: If a filter can't be translated into SQL.
+        """
+        import heapq
+        where, parameters = self._where(filters)
+        where = f"{where} AND" if where else "WHERE"
+        earlier = self._select(f"{where} a.time < ?", parameters + [minutes], "a.time DESC, a.row DESC")
+        later = self._select(f"{where} a.time >= ?", parameters + [minutes], "a.time, a.row")
+        for _, approach in heapq.merge(earlier, later, key=lambda item: abs(item[1].minutes - minutes)):
+            yield approach
+
+    def column_values(self, row, approach, names):
+        """Look up the values of extra columns for a close approach and its NEO.
+
+        :param row: The row of the close approach, as generated by `query_rows`.
+        :param approach: The `CloseApproach` in that row.
+        :param names: The names of columns, each in `columns.COLUMNS` or `columns.APPROACH_COLUMNS`.
+        :return: A dictionary mapping each column name to its value (NaN or None if unknown).
+        :raises KeyError: If a column isn't supported.
+        """
+        for name in names:
+            if name not in COLUMNS and name not in APPROACH_COLUMNS:
+                raise KeyError(name)
+        approach_names = [name for name in names if name in APPROACH_COLUMNS]
+        neo_names = [name for name in names if name not in APPROACH_COLUMNS]
+        found = {}
+        if approach_names:
+            found.update(zip(approach_names, self._execute(
+                f"SELECT {', '.join(approach_names)} FROM approaches WHERE row = ?", [row]).fetchone()))
+        if neo_names:
+            found.update(zip(neo_names, self._execute(
+                f"SELECT {', '.join(neo_names)} FROM neos WHERE id = ?",
+                [self._neo_ids[approach.neo]]).fetchone()))
+        # Unknown values are stored as NULL, but reported like those of the in-memory columns.
+        parsers = dict(COLUMNS, **APPROACH_COLUMNS)
+        return {name: parsers[name][1]('') if found[name] is None else found[name] for name in names}
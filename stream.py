@@ -0,0 +1,145 @@
+"""Query close approaches in one pass over the data files, without building an `NEODatabase`.
+
+A one-off `main.py query --outfile` doesn't need every close approach to be
+parsed, linked, and held in memory before the first match is written. With
+`--stream`, a `StreamingSource` is queried instead of a database:
+
+- The NEOs are loaded (as usual, by `extract.load_neos`) into a dictionary by
+  primary designation. NEO-level filters are decided once per NEO, up front.
+- The close approach data file is memory-mapped, and its records are located
+  one at a time by `offsets.iter_approach_spans` (or, if it's compressed, they
+  are decompressed and decoded one at a time by `compressed.approach_data`). Each record is decoded, turned
+  into a `CloseApproach` linked to its NEO, and tested against the filters -
+  including filters on the extra columns of the record - and a match is passed
+  on (to be written) at once. Nothing is kept once a record has been tested.
+
+So memory use is proportional to the number of NEOs, not of close approaches.
+The matches come out in the order of the file's records - the same order as
+`NEODatabase.query`, so the output is identical.
+
+A `StreamingSource` offers the `query_rows`, `count`, `exists` and
+`column_values` methods that `main.query` uses. Its "rows" hold the raw records,
+so the extra columns of a match are read straight out of its record.
+"""
+import json
+import math
+import mmap
+
+from columns import APPROACH_COLUMNS
+from compressed import approach_data, is_compressed
+from extract import load_neos, parse_approach
+from filters import ApproachColumnFilter
+from offsets import approach_fields, iter_approach_spans
+
+
+class StreamingSource:
+    """A one-pass source of close approaches, read straight from the data files as they're queried."""
+
+    def __init__(self, neo_csv_path, cad_json_paths):
+        """Create a new `StreamingSource`, loading the NEOs.
+
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_paths: The paths of the JSON files of close approach data to read,
+                               one after the other, on each query.
+        """
+        self._neos = load_neos(neo_csv_path)
+        self._designation_to_neo = {neo.designation: neo for neo in self._neos}
+        self.paths = list(cad_json_paths)
+
+    def _records(self):
+        """Generate each record of the close approach data files, with its file's field positions.
+
+        :yield: Tuples of a record (a list of the raw values of its fields) and a
+                dictionary mapping the names of fields to their positions in the record.
+        """
+        for path in self.paths:
+            if is_compressed(path):
+                names, records = approach_data(path)
+                fields = {name: index for index, name in enumerate(names)}
+                for record in records:
+                    yield record, fields
+                continue
+            with open(path, 'rb') as infile, \
+                    mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                fields = {name: index for index, name in enumerate(approach_fields(buffer))}
+                for offset, length, _ in iter_approach_spans(buffer):
+                    yield json.loads(buffer[offset:offset + length]), fields
+
+    def _column_test(self, f):
+        """Return a test of a record for a filter on an extra column of the close approach data."""
+        field, parse = APPROACH_COLUMNS[f.column]
+        op, reference = f.op, f.value
+
+        def test(record, fields):
+            value = parse(record[fields[field]])
+            # Missing values never match, as with `ApproachColumnFilter`.
+            return value is not None and not (isinstance(value, float) and math.isnan(value)) \
+                and op(value, reference)
+        return test
+
+    def query_rows(self, filters=()):
+        """Read the close approaches that match a collection of filters, one record at a time.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of (row, `CloseApproach`) tuples, in the order of the files' records,
+                 where each row is a tuple of the raw record and its file's field positions.
+        """
+        neo_filters = [f for f in filters if getattr(f, 'neo_level', False)]
+        column_tests = [self._column_test(f) for f in filters if isinstance(f, ApproachColumnFilter)]
+        approach_filters = [f for f in filters if not getattr(f, 'neo_level', False)
+                            and not isinstance(f, ApproachColumnFilter)]
+
+        # NEO-level filters are decided once for every NEO.
+        neos = self._designation_to_neo
+        if neo_filters:
+            mask = [all(matches) for matches in zip(*(f.neo_mask(self._neos) for f in neo_filters))]
+            neos = {neo.designation: neo for neo, ok in zip(self._neos, mask) if ok}
+
+        for record, fields in self._records():
+            neo = neos.get(record[0])
+            if neo is None:
+                if record[0] not in self._designation_to_neo:
+                    raise KeyError(record[0])
+                continue
+            if not all(test(record, fields) for test in column_tests):
+                continue
+            approach = parse_approach(record)
+            approach.neo = neo
+            approach._designation = None
+            if all(f(approach) for f in approach_filters):
+                yield (record, fields), approach
+
+    def query(self, filters=()):
+        """Read the close approaches that match a collection of filters, one record at a time.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects.
+        """
+        for _, approach in self.query_rows(filters):
+            yield approach
+
+    def count(self, filters=()):
+        """Count the close approaches that match a collection of filters, in one pass."""
+        return sum(1 for _ in self.query_rows(filters))
+
+    def exists(self, filters=()):
+        """Return whether any close approach matches a collection of filters, stopping at the first."""
+        return next(self.query_rows(filters), None) is not None
+
+    def column_values(self, row, approach, names):
+        """Look up the values of extra columns for a close approach and its NEO.
+
+        :param row: The row of the close approach (its record), as generated by `query_rows`.
+        :param approach: The `CloseApproach` read from that record.
+        :param names: The names of columns, each in `columns.COLUMNS` or `columns.APPROACH_COLUMNS`.
+        :return: A dictionary mapping each column name to its value.
+        """
+        record, fields = row
+        values = {}
+        for name in names:
+            if name in APPROACH_COLUMNS:
+                field, parse = APPROACH_COLUMNS[name]
+                values[name] = parse(record[fields[field]])
+            else:
+                values[name] = approach.neo.column(name)
+        return values
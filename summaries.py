@@ -0,0 +1,203 @@
+"""Summarize the close approaches of each NEO once, while the database groups them.
+
+Questions about NEOs rather than approaches - the closest approach ever of each
+NEO, the NEOs with more than 10 approaches, the fastest approaches of hazardous
+NEOs - would otherwise mean scanning every close approach. Instead, while
+`NEODatabase` groups the approaches by NEO, it also keeps a running summary of
+each NEO's approaches: their number, the distance of the closest one, the
+velocity of the fastest one, and the times of the first and last ones.
+
+An `NEOSummaries` holds these summaries column-wise - one compact `array` per
+statistic, indexed by the position of the NEO in the database - so they cost a
+few bytes per NEO, and a filter or sort on one statistic reads one array. The
+summary of a single NEO is an `NEOSummary`, which `main.py inspect` shows and
+`main.py neos` lists (filtered by `SummaryFilter`s and NEO-level filters, and
+sorted by any statistic).
+
+An NEO without any close approaches has a count of zero; its `NEOSummary` has
+no closest or fastest approach (NaN) or first or last approach time (None).
+"""
+import math
+from array import array
+
+from helpers import minutes_to_str
+
+# The statistics of each summary, as the names of the columns of `NEOSummaries`.
+SUMMARY_COLUMNS = ('approaches', 'closest', 'fastest', 'first', 'last')
+
+# The initial times (in minutes) of the first and last approaches of each NEO, before
+# any approach is seen - and so the times stored for an NEO without any approaches.
+NO_FIRST = 2 ** 62
+NO_LAST = -2 ** 62
+
+
+class NEOSummary:
+    """The number of an NEO's close approaches, and the extremes of their attributes."""
+
+    __slots__ = ('neo', 'approaches', 'closest', 'fastest', 'first', 'last')
+
+    def __init__(self, neo, approaches, closest, fastest, first, last):
+        """Create a new `NEOSummary`.
+
+        :param neo: The `NearEarthObject` that is summarized.
+        :param approaches: The number of its close approaches.
+        :param closest: The distance of its closest approach, in astronomical units, or NaN.
+        :param fastest: The velocity of its fastest approach, in kilometers per second, or NaN.
+        :param first: The time of its first approach, in minutes since `helpers.EPOCH`, or None.
+        :param last: The time of its last approach, in minutes since `helpers.EPOCH`, or None.
+        """
+        self.neo = neo
+        self.approaches = approaches
+        self.closest = closest
+        self.fastest = fastest
+        self.first = first
+        self.last = last
+
+    @classmethod
+    def from_approaches(cls, neo, approaches):
+        """Summarize a collection of close approaches of an NEO by walking them.
+
+        :param neo: The `NearEarthObject` that is summarized.
+        :param approaches: An iterable of its `CloseApproach`es.
+        :return: A new `NEOSummary`.
+        """
+        approaches = list(approaches)
+        if not approaches:
+            return cls(neo, 0, math.nan, math.nan, None, None)
+        times = [approach.minutes for approach in approaches]
+        return cls(neo, len(approaches), min(approach.distance for approach in approaches),
+                   max(approach.velocity for approach in approaches), min(times), max(times))
+
+    @staticmethod
+    def fieldnames():
+        """Return the names of the fields of a serialized summary, in order."""
+        return ['designation', 'name', 'diameter_km', 'potentially_hazardous', 'approaches',
+                'closest_distance_au', 'fastest_velocity_km_s', 'first_approach_utc', 'last_approach_utc']
+
+    def serialize(self):
+        """Convert this summary into a serializable data form for JSON and CSV."""
+        return dict(zip(self.fieldnames(), [
+            self.neo.designation, self.neo.name if self.neo.name else " ", self.neo.diameter,
+            self.neo.hazardous, self.approaches, self.closest, self.fastest,
+            None if self.first is None else minutes_to_str(self.first),
+            None if self.last is None else minutes_to_str(self.last),
+        ]))
+
+    @property
+    def approaches_str(self):
+        """Return a human-readable description of the summarized close approaches."""
+        if not self.approaches:
+            return "no known close approaches"
+        if self.approaches == 1:
+            return (f"1 close approach, on {minutes_to_str(self.first)}, "
+                    f"at {self.closest:.4g} au and {self.fastest:.2f} km/s")
+        return (f"{self.approaches} close approaches from {minutes_to_str(self.first)} "
+                f"to {minutes_to_str(self.last)}, the closest at {self.closest:.4g} au "
+                f"and the fastest at {self.fastest:.2f} km/s")
+
+    def __str__(self):
+        """Return `str(self)`."""
+        return f"{self.neo.fullname}: {self.approaches_str}"
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return (f"NEOSummary(neo={self.neo.designation!r}, approaches={self.approaches!r}, "
+                f"closest={self.closest!r}, fastest={self.fastest!r}, first={self.first!r}, "
+                f"last={self.last!r})")
+
+
+class NEOSummaries:
+    """The summaries of the close approaches of every NEO of a database, stored column-wise."""
+
+    def __init__(self, neos, approaches, closest, fastest, first, last):
+        """Create a new `NEOSummaries` from the statistics of each NEO, in the order of the NEOs.
+
+        :param neos: The sequence of `NearEarthObject`s that are summarized.
+        :param approaches: The number of close approaches of each NEO.
+        :param closest: The distance of the closest approach of each NEO (inf if it has none).
+        :param fastest: The velocity of the fastest approach of each NEO (-inf if it has none).
+        :param first: The time of the first approach of each NEO, in minutes (`NO_FIRST` if none).
+        :param last: The time of the last approach of each NEO, in minutes (`NO_LAST` if none).
+        """
+        self._neos = neos
+        self.approaches = array('i', approaches)
+        self.closest = array('d', closest)
+        self.fastest = array('d', fastest)
+        self.first = array('q', first)
+        self.last = array('q', last)
+
+    def __len__(self):
+        """Return the number of summarized NEOs."""
+        return len(self.approaches)
+
+    def column(self, name):
+        """Return a column of the summaries, as an array indexed by the position of each NEO.
+
+        :param name: The name of a statistic, one of `SUMMARY_COLUMNS`.
+        :return: The `array` of that statistic.
+        """
+        if name not in SUMMARY_COLUMNS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __getitem__(self, index):
+        """Return the `NEOSummary` of the NEO at an index."""
+        if not self.approaches[index]:
+            return NEOSummary(self._neos[index], 0, math.nan, math.nan, None, None)
+        return NEOSummary(self._neos[index], self.approaches[index], self.closest[index],
+                          self.fastest[index], self.first[index], self.last[index])
+
+    def order(self, indices, sort_by, reverse=False):
+        """Sort the positions of some NEOs by a statistic of their summaries.
+
+        The NEOs without any close approaches come last, whatever the order, since
+        they have no closest, fastest, first or last approach. Ties keep their order.
+
+        :param indices: A list of the positions of NEOs.
+        :param sort_by: The name of the statistic to sort by, one of `SUMMARY_COLUMNS`.
+        :param reverse: Whether to sort in descending order.
+        :return: A new list of the positions.
+        """
+        column = self.column(sort_by)
+        counts = self.approaches
+        known = [index for index in indices if counts[index]]
+        known.sort(key=column.__getitem__, reverse=reverse)
+        return known + [index for index in indices if not counts[index]]
+
+
+class SummaryFilter:
+    """A filter on a statistic of the summaries of NEOs, such as their number of approaches.
+
+    Like the NEO-level filters of `filters`, a `SummaryFilter` decides a whole
+    sequence of NEOs at once, but from the columns of an `NEOSummaries`. An NEO
+    without any close approaches never matches a filter on their distances,
+    velocities or times.
+    """
+
+    def __init__(self, column, op, value):
+        """Create a new `SummaryFilter`.
+
+        :param column: The name of the statistic, one of `SUMMARY_COLUMNS`.
+        :param op: A 2-argument predicate comparator (such as `operator.le`).
+        :param value: The reference value to compare against.
+        """
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def summary_mask(self, summaries):
+        """Return a list of whether the summary of each NEO satisfies this filter.
+
+        :param summaries: An `NEOSummaries`.
+        :return: A list of bools, in the order of the NEOs.
+        """
+        op, value = self.op, self.value
+        column = summaries.column(self.column)
+        if self.column == 'approaches':
+            return [op(count, value) for count in column]
+        return [bool(count) and op(statistic, value)
+                for count, statistic in zip(summaries.approaches, column)]
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"SummaryFilter(column={self.column!r}, op=operator.{self.op.__name__}, value={self.value!r})"
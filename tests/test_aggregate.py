@@ -0,0 +1,85 @@
+"""Check that close approaches are correctly summarized by group.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_aggregate
+"""
+import collections
+import math
+import pathlib
+import statistics
+import unittest
+
+from aggregate import aggregate, GroupSummary
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestAggregate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def group(self, key):
+        groups = collections.defaultdict(list)
+        for approach in self.approaches:
+            groups[key(approach)].append(approach)
+        return groups
+
+    def assertSummaryMatches(self, summary, approaches):
+        self.assertEqual(summary.count, len(approaches))
+        distances = [approach.distance for approach in approaches]
+        self.assertEqual(summary.distance.minimum, min(distances))
+        self.assertEqual(summary.distance.maximum, max(distances))
+        self.assertAlmostEqual(summary.distance.mean, statistics.mean(distances))
+        velocities = [approach.velocity for approach in approaches]
+        self.assertAlmostEqual(summary.velocity.mean, statistics.mean(velocities))
+        diameters = [approach.neo.diameter for approach in approaches
+                     if not math.isnan(approach.neo.diameter)]
+        self.assertEqual(summary.diameter.count, len(diameters))
+        if diameters:
+            self.assertAlmostEqual(summary.diameter.mean, statistics.mean(diameters))
+        else:
+            self.assertTrue(math.isnan(summary.diameter.mean))
+
+    def test_aggregate_by_month(self):
+        expected = self.group(lambda approach: approach.time.strftime('%Y-%m'))
+        summaries = aggregate(self.db.query(), 'month')
+        self.assertEqual([summary.group for summary in summaries], sorted(expected))
+        for summary in summaries:
+            self.assertSummaryMatches(summary, expected[summary.group])
+
+    def test_aggregate_by_neo(self):
+        expected = self.group(lambda approach: approach.neo.designation)
+        summaries = aggregate(self.db.query(), 'neo')
+        self.assertEqual(len(summaries), len(expected))
+        for summary in summaries:
+            self.assertSummaryMatches(summary, expected[summary.group])
+
+    def test_aggregate_filtered_by_hazardous(self):
+        summaries = aggregate(self.db.query(create_filters(hazardous=True)), 'hazardous')
+        self.assertEqual(len(summaries), 1)
+        self.assertIs(summaries[0].group, True)
+        self.assertSummaryMatches(summaries[0], self.group(lambda a: a.neo.hazardous)[True])
+
+    def test_aggregate_nothing(self):
+        self.assertEqual(aggregate([], 'year'), [])
+
+    def test_serialized_summary_has_every_field(self):
+        summary = aggregate(self.db.query(), 'year')[0]
+        serialized = summary.serialize()
+        self.assertEqual(list(serialized), GroupSummary.fieldnames('year'))
+        self.assertEqual(serialized['year'], 2020)
+        self.assertEqual(serialized['count'], len(self.approaches))
+
+
+if __name__ == '__main__':
+    unittest.main()
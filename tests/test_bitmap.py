@@ -0,0 +1,162 @@
+"""Check that bitmap indexes answer boolean filters and counts like a full scan.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_bitmap
+"""
+import datetime
+import math
+import operator
+import pathlib
+import unittest
+
+from bitmap import Bitmap, BitmapIndex, SortedColumn
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestBitmap(unittest.TestCase):
+    def setUp(self):
+        self.evens = Bitmap.from_predicate(range(20), lambda row: row % 2 == 0)
+        self.threes = Bitmap.from_rows([0, 3, 6, 9, 12, 15, 18], 20)
+
+    def test_iteration_and_length(self):
+        self.assertEqual(list(self.evens), list(range(0, 20, 2)))
+        self.assertEqual(len(self.evens), 10)
+        self.assertIn(4, self.evens)
+        self.assertNotIn(5, self.evens)
+        self.assertNotIn(20, self.evens)
+
+    def test_combination(self):
+        self.assertEqual(list(self.evens & self.threes), [0, 6, 12, 18])
+        self.assertEqual(len(self.evens | self.threes), 13)
+        self.assertEqual(list(~self.evens), list(range(1, 20, 2)))
+        self.assertEqual(~~self.threes, self.threes)
+
+    def test_empty(self):
+        empty = Bitmap.from_rows([], 20)
+        self.assertFalse(empty)
+        self.assertEqual(list(empty), [])
+        self.assertEqual(len(~empty), 20)
+        self.assertEqual(list(Bitmap.from_rows([], 0)), [])
+
+    def test_mismatched_sizes(self):
+        with self.assertRaises(ValueError):
+            self.evens & Bitmap.from_rows([1], 21)
+
+
+class TestBitmapIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def test_index_matches_attributes(self):
+        index = BitmapIndex(self.approaches)
+        self.assertEqual(list(index['hazardous']),
+                         [row for row, approach in enumerate(self.approaches) if approach.neo.hazardous])
+        self.assertEqual(list(index['has_diameter']),
+                         [row for row, approach in enumerate(self.approaches)
+                          if not math.isnan(approach.neo.diameter)])
+        self.assertEqual(list(index['has_name']),
+                         [row for row, approach in enumerate(self.approaches) if approach.neo.name])
+        self.assertEqual(len(index.all()), len(self.approaches))
+
+    def assertQueryMatchesScan(self, **criteria):
+        filters = create_filters(**criteria)
+        expected = [approach for approach in self.approaches if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertEqual(self.db.count(filters), len(expected))
+
+    def test_boolean_filters(self):
+        self.assertQueryMatchesScan(hazardous=True)
+        self.assertQueryMatchesScan(hazardous=False, has_diameter=True)
+        self.assertQueryMatchesScan(has_name=True, has_diameter=False)
+        self.assertQueryMatchesScan(has_name=False)
+
+    def test_boolean_filters_with_other_filters(self):
+        self.assertQueryMatchesScan(hazardous=True, start_date=datetime.date(2020, 6, 1),
+                                    velocity_min=15)
+        self.assertQueryMatchesScan(has_diameter=True, diameter_max=1)
+
+    def test_count_without_filters(self):
+        self.assertEqual(self.db.count(), len(self.approaches))
+
+
+class Unvisitable(list):
+    """A list of close approaches that fails if any of them is visited."""
+
+    def __getitem__(self, index):
+        raise AssertionError("A close approach was visited.")
+
+    def __iter__(self):
+        raise AssertionError("The close approaches were iterated.")
+
+
+class TestIndexedCounts(unittest.TestCase):
+    CRITERIA = (
+        dict(distance_max=0.05),
+        dict(distance_min=0.01, distance_max=0.05),
+        dict(velocity_min=20, velocity_max=20.5),
+        dict(date=datetime.date(2020, 3, 14)),
+        dict(start_date=datetime.date(2020, 6, 1), end_date=datetime.date(2020, 6, 30)),
+        dict(hazardous=True, distance_max=0.1),
+        dict(diameter_min=0.5, start_date=datetime.date(2020, 3, 1)),
+        dict(has_name=False, velocity_min=25, distance_min=0.3),
+        dict(date=datetime.date(2020, 1, 1), velocity_min=40),
+        dict(hazardous=False, diameter_max=0.01),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def test_sorted_column_span(self):
+        column = SortedColumn([3.0, 1.0, 2.0, 2.0, 5.0], float)
+        self.assertEqual(list(column.values), [1.0, 2.0, 2.0, 3.0, 5.0])
+        self.assertEqual(list(column.rows), [1, 2, 3, 0, 4])
+        self.assertEqual(column.span([(operator.eq, 2.0)]), (1, 3))
+        self.assertEqual(column.span([(operator.gt, 1.0), (operator.lt, 5.0)]), (1, 4))
+        self.assertEqual(column.span([(operator.ge, 4.0), (operator.le, 3.0)]), (4, 4))
+        self.assertIsNone(column.span([(operator.ne, 2.0)]))
+        self.assertEqual(list(column.bitmap(1, 4)), [0, 2, 3])
+        self.assertEqual(list(column.bitmap(0, 1)), [1])
+
+    def test_count_and_exists_match_query(self):
+        for criteria in self.CRITERIA:
+            with self.subTest(**criteria):
+                filters = create_filters(**criteria)
+                expected = sum(1 for _ in self.db.query(filters))
+                self.assertEqual(self.db.count(filters), expected)
+                self.assertEqual(self.db.exists(filters), expected > 0)
+
+    def test_count_visits_no_approach(self):
+        for criteria in self.CRITERIA:
+            self.db.count(create_filters(**criteria))
+        db = self.db
+        approaches, db._approaches = db._approaches, Unvisitable(db._approaches)
+        try:
+            for criteria in self.CRITERIA:
+                filters = create_filters(**criteria)
+                db.count(filters)
+                db.exists(filters)
+        finally:
+            db._approaches = approaches
+
+    def test_unindexed_filters_fall_back_to_a_query(self):
+        filters = create_filters(distance_max=0.05)
+        filters[0].op = operator.ne
+        self.assertEqual(self.db.count(filters), sum(1 for a in self.approaches if a.distance != 0.05))
+        self.assertTrue(self.db.exists(filters))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Check that extra NEO and close approach columns are parsed on demand and can be filtered on.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columns
+"""
+import csv
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from columns import ApproachColumnStore, ApproachWithColumns
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from write import write_to_csv
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestColumnStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_NEO_FILE) as infile:
+            cls.rows = {row['pdes']: row for row in csv.DictReader(infile)}
+
+    def setUp(self):
+        self.neos = load_neos(TEST_NEO_FILE)
+        self.columns = self.neos[0]._columns
+
+    def test_columns_are_parsed_on_demand(self):
+        self.assertNotIn('moid', self.columns)
+        self.neos[0].column('moid')
+        self.assertIn('moid', self.columns)
+        self.assertNotIn('orbit_class', self.columns)
+
+    def test_column_values(self):
+        for neo in self.neos:
+            row = self.rows[neo.designation]
+            self.assertEqual(neo.column('orbit_class'), row['class'] or None)
+            if row['moid']:
+                self.assertEqual(neo.column('moid'), float(row['moid']))
+            else:
+                self.assertTrue(math.isnan(neo.column('moid')))
+
+    def test_load_several_columns(self):
+        self.columns.load('eccentricity', 'inclination')
+        self.assertIn('eccentricity', self.columns)
+        self.assertIn('inclination', self.columns)
+        self.assertEqual(len(self.columns['eccentricity']), len(self.neos))
+
+    def test_unknown_column(self):
+        with self.assertRaises(KeyError):
+            self.neos[0].column('not-a-column')
+
+
+class TestColumnFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def assertQueryMatchesScan(self, **criteria):
+        filters = create_filters(**criteria)
+        expected = [approach for approach in self.approaches if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_moid(self):
+        self.assertQueryMatchesScan(moid_max=0.01)
+        self.assertQueryMatchesScan(moid_min=0.2, distance_max=0.3)
+
+    def test_orbit_class(self):
+        self.assertQueryMatchesScan(orbit_class='apo')
+        self.assertQueryMatchesScan(orbit_class='ATE', moid_max=0.05, hazardous=False)
+        self.assertEqual(list(self.db.query(create_filters(orbit_class='XYZ'))), [])
+
+    def test_filters_on_single_neo(self):
+        neo = self.db.get_neo_by_designation('1865')
+        moid = neo.column('moid')
+        neo_filter, = create_filters(moid_max=moid)
+        self.assertTrue(neo_filter.matches_neo(neo))
+        self.assertEqual(neo_filter.neo_mask([neo]), [True])
+
+
+class TestApproachColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as infile:
+            contents = json.load(infile)
+        cls.records = [dict(zip(contents['fields'], record)) for record in contents['data']]
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.columns = ApproachColumnStore([TEST_CAD_FILE], len(cls.approaches))
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches, cls.columns)
+
+    def test_columns_are_parsed_on_demand(self):
+        columns = ApproachColumnStore([TEST_CAD_FILE], len(self.approaches))
+        self.assertNotIn('dist_min', columns)
+        self.assertEqual(columns['dist_min'][0], float(self.records[0]['dist_min']))
+        self.assertIn('dist_min', columns)
+        self.assertNotIn('v_inf', columns)
+
+    def test_changed_data_file(self):
+        columns = ApproachColumnStore([TEST_CAD_FILE], len(self.approaches) + 1)
+        with self.assertRaises(ValueError):
+            columns.load('dist_max')
+
+    def test_dist_min_filter(self):
+        filters = create_filters(dist_min_max=0.01, moid_max=0.005)
+        expected = [approach for approach, record in zip(self.approaches, self.records)
+                    if float(record['dist_min']) <= 0.01 and approach.neo.column('moid') <= 0.005]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+        self.assertEqual(self.db.count(create_filters(dist_max_max=0.01)),
+                         sum(1 for record in self.records if float(record['dist_max']) <= 0.01))
+
+    def test_filter_without_columns(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        with self.assertRaises(ValueError):
+            list(db.query(create_filters(dist_min_max=0.01)))
+
+    def test_column_values(self):
+        row, approach = next(self.db.query_rows(create_filters(distance_max=0.01)))
+        values = self.db.column_values(row, approach, ('t_sigma_f', 'v_inf', 'orbit_class'))
+        record = self.records[row]
+        self.assertEqual(values['t_sigma_f'], record['t_sigma_f'])
+        self.assertEqual(values['v_inf'], float(record['v_inf']))
+        self.assertEqual(values['orbit_class'], approach.neo.column('orbit_class'))
+
+    def test_write_columns_to_csv(self):
+        results = [ApproachWithColumns(approach, self.db.column_values(row, approach, ('dist_min',)))
+                   for row, approach in self.db.query_rows(create_filters(hazardous=True))][:5]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'results.csv'
+            write_to_csv(results, path, ('dist_min',))
+            with open(path) as infile:
+                rows = list(csv.DictReader(infile))
+        self.assertEqual(len(rows), 5)
+        for row, result in zip(rows, results):
+            self.assertEqual(float(row['dist_min']), result.columns['dist_min'])
+
+
+if __name__ == '__main__':
+    unittest.main()
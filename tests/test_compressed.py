@@ -0,0 +1,143 @@
+"""Check that compressed data files are read exactly like the uncompressed ones.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_compressed
+"""
+import bz2
+import gzip
+import io
+import json
+import lzma
+import pathlib
+import tempfile
+import unittest
+
+from columns import ApproachColumnStore
+from compressed import DecompressingReader, approach_data, compression, open_data
+from extract import load_neos, load_approaches
+from offsets import iter_approach_records, read_approach_fields
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+CODECS = {'.gz': gzip, '.xz': lzma, '.bz2': bz2}
+
+
+def compress(path, directory, suffix):
+    """Save a compressed copy of a file in a directory, and return its path."""
+    target = pathlib.Path(directory) / (path.name + suffix)
+    target.write_bytes(CODECS[suffix].compress(path.read_bytes()))
+    return target
+
+
+def summarize(approach):
+    """Summarize an unlinked close approach for comparison."""
+    return approach._designation, approach.time, approach.distance, approach.velocity
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = pathlib.Path(tmpdir.name)
+        # A small data file, to keep compressing it quick.
+        self.sample = self.tmpdir / 'neos.csv'
+        with open(TEST_NEO_FILE) as infile:
+            self.sample.write_text(''.join(infile.readline() for _ in range(200)))
+
+    def test_detected_by_extension(self):
+        for suffix, codec in (('.gz', 'gzip'), ('.xz', 'lzma'), ('.bz2', 'bz2')):
+            self.assertEqual(compression(compress(self.sample, self.tmpdir, suffix)), codec)
+        self.assertIsNone(compression(TEST_NEO_FILE))
+        self.assertIsNone(compression(TEST_CAD_FILE))
+
+    def test_detected_by_magic_bytes(self):
+        for suffix, codec in (('.gz', 'gzip'), ('.xz', 'lzma'), ('.bz2', 'bz2')):
+            path = compress(self.sample, self.tmpdir, suffix).rename(self.tmpdir / f'neos{suffix}.csv')
+            self.assertEqual(compression(path), codec)
+
+    def test_open_data(self):
+        for suffix in CODECS:
+            with self.subTest(suffix=suffix):
+                path = compress(self.sample, self.tmpdir, suffix)
+                with open_data(path) as infile:
+                    self.assertEqual(infile.read(), self.sample.read_text())
+                with open_data(path, 'rb') as infile:
+                    self.assertEqual(infile.read(), self.sample.read_bytes())
+
+    def test_small_chunks(self):
+        path = compress(self.sample, self.tmpdir, '.gz')
+        with io.BufferedReader(DecompressingReader(path, 'gzip', chunk_size=100, max_chunks=2)) as infile:
+            self.assertEqual(infile.read(), self.sample.read_bytes())
+
+    def test_close_before_the_end(self):
+        path = compress(TEST_CAD_FILE, self.tmpdir, '.gz')
+        reader = DecompressingReader(path, 'gzip', chunk_size=100, max_chunks=2)
+        self.assertEqual(len(reader.read(10)), 10)
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
+
+    def test_corrupt_file(self):
+        path = self.tmpdir / 'neos.csv.gz'
+        path.write_bytes(gzip.compress(self.sample.read_bytes())[:1000])
+        with self.assertRaises(EOFError):
+            with open_data(path) as infile:
+                infile.read()
+
+
+class TestCompressedData(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.neos = [repr(neo) for neo in load_neos(TEST_NEO_FILE)]
+        cls.approaches = [summarize(approach) for approach in load_approaches(TEST_CAD_FILE)]
+        with open(TEST_CAD_FILE) as infile:
+            cls.contents = json.load(infile)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_load_neos(self):
+        for suffix in CODECS:
+            with self.subTest(suffix=suffix):
+                path = compress(TEST_NEO_FILE, self.tmpdir.name, suffix)
+                neos = load_neos(path)
+                self.assertEqual([repr(neo) for neo in neos], self.neos)
+                self.assertEqual([neo.column('orbit_class') for neo in neos[:100]],
+                                 [neo.column('orbit_class') for neo in load_neos(TEST_NEO_FILE)[:100]])
+
+    def test_load_approaches(self):
+        for suffix in CODECS:
+            with self.subTest(suffix=suffix):
+                path = compress(TEST_CAD_FILE, self.tmpdir.name, suffix)
+                self.assertEqual([summarize(approach) for approach in load_approaches(path)],
+                                 self.approaches)
+
+    def test_approach_columns(self):
+        path = compress(TEST_CAD_FILE, self.tmpdir.name, '.xz')
+        names = ['dist_min', 't_sigma_f']
+        compressed = ApproachColumnStore([path], len(self.approaches))
+        plain = ApproachColumnStore([TEST_CAD_FILE], len(self.approaches))
+        for name in names:
+            self.assertEqual(list(compressed[name]), list(plain[name]))
+
+    def test_approach_data(self):
+        fields, records = approach_data(compress(TEST_CAD_FILE, self.tmpdir.name, '.bz2'))
+        self.assertEqual(fields, self.contents['fields'])
+        self.assertEqual(list(records), self.contents['data'])
+
+    def test_records_across_chunk_boundaries(self):
+        data = TEST_CAD_FILE.read_bytes()
+        for chunk_size in (50, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_approach_records(io.BytesIO(data), chunk_size)),
+                                 self.contents['data'])
+                self.assertEqual(read_approach_fields(io.BytesIO(data), chunk_size), self.contents['fields'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import datetime
 import pathlib
 import math
 import unittest
@@ -17,6 +18,8 @@ import unittest
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
+from filters import create_filters
+from models import NearEarthObject
 
 
 # Paths to the test data files.
@@ -54,6 +57,42 @@ class TestDatabase(unittest.TestCase):
                     self.fail(f"{approach} appears in the approaches of multiple NEOs.")
                 seen.add(approach)
 
+    def test_database_construction_groups_approaches_in_supplied_order(self):
+        expected = {}
+        for approach in self.approaches:
+            expected.setdefault(approach.neo.designation, []).append(approach)
+        for neo in self.neos:
+            approaches = expected.get(neo.designation, [])
+            self.assertEqual(len(neo.approaches), len(approaches))
+            self.assertEqual(list(neo.approaches), approaches)
+            if approaches:
+                self.assertIs(neo.approaches[0], approaches[0])
+                self.assertIs(neo.approaches[-1], approaches[-1])
+                self.assertEqual(neo.approaches[1:], approaches[1:])
+
+    def test_approach_view_indexes_within_its_group(self):
+        neo = max(self.neos, key=lambda neo: len(neo.approaches))
+        approaches = list(neo.approaches)
+        for index in range(-len(approaches), len(approaches)):
+            self.assertIs(neo.approaches[index], approaches[index])
+        for index in (len(approaches), -len(approaches) - 1):
+            with self.assertRaises(IndexError):
+                neo.approaches[index]
+        empty = NearEarthObject('', '2020 AB', 'N', '')
+        NEODatabase([empty], [])
+        with self.assertRaises(IndexError):
+            empty.approaches[0]
+
+    def test_database_construction_drops_redundant_designations(self):
+        for approach in self.approaches:
+            self.assertIsNone(approach._designation)
+            self.assertIs(approach.designation, approach.neo.designation)
+
+    def test_extracted_strings_are_shared(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        for approach in approaches[:100]:
+            self.assertIs(approach._designation, self.db.get_neo_by_designation(approach._designation).designation)
+
     def test_get_neo_by_designation(self):
         cerberus = self.db.get_neo_by_designation('1865')
         self.assertIsNotNone(cerberus)
@@ -115,5 +154,29 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNone(nonexistent)
 
 
+class TestDatabaseQueryPlanning(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def assertQueryMatchesScan(self, **criteria):
+        filters = create_filters(**criteria)
+        expected = [approach for approach in self.approaches if all(f(approach) for f in filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_selective_neo_filters_preserve_time_order(self):
+        self.assertQueryMatchesScan(hazardous=True, diameter_min=0.5)
+
+    def test_selective_neo_filters_with_approach_filters(self):
+        self.assertQueryMatchesScan(hazardous=True, start_date=datetime.date(2020, 6, 1),
+                                    distance_max=0.3)
+
+    def test_unselective_neo_filters(self):
+        self.assertQueryMatchesScan(hazardous=False, velocity_min=10)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+"""Check that several close approach data files are loaded and merged like one.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_federation
+"""
+import datetime
+import json
+import pathlib
+import random
+import tempfile
+import unittest
+
+from federation import cad_paths, load_federated_approaches
+from main import load_database
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestFederation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as infile:
+            cls.contents = json.load(infile)
+        cls.fields = cls.contents['fields']
+        records = cls.contents['data']
+
+        # Split the records into three overlapping files, each shuffled.
+        cls.tempdir = tempfile.TemporaryDirectory()
+        cls.directory = pathlib.Path(cls.tempdir.name)
+        third = len(records) // 3
+        rng = random.Random(3)
+        for index, (start, stop) in enumerate([(0, third + 50), (third, 2 * third + 50), (2 * third, None)]):
+            part = records[start:stop]
+            rng.shuffle(part)
+            with open(cls.directory / f'cad-part{index}.json', 'w') as outfile:
+                json.dump({'fields': cls.fields, 'count': len(part), 'data': part}, outfile)
+        cls.records = {(record[0], record[3]): record for record in records}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tempdir.cleanup()
+
+    def keys(self, approaches):
+        return [(approach.designation, approach.time) for approach in approaches]
+
+    def test_cad_paths(self):
+        expected = [self.directory / f'cad-part{index}.json' for index in range(3)]
+        self.assertEqual(cad_paths(self.directory), expected)
+        self.assertEqual(cad_paths(self.directory / 'cad-part*.json'), expected)
+        self.assertEqual(cad_paths(self.directory / 'cad-part[02].json'), expected[::2])
+        self.assertEqual(cad_paths(TEST_CAD_FILE), [TEST_CAD_FILE])
+        with self.assertRaises(FileNotFoundError):
+            cad_paths(self.directory / 'missing-*.json')
+
+    def test_merged_in_time_order_without_duplicates(self):
+        approaches, order = load_federated_approaches(cad_paths(self.directory), max_workers=3)
+        self.assertEqual(len(approaches), len(self.records))
+        self.assertEqual(len(order), len(approaches))
+        keys = self.keys(approaches)
+        self.assertEqual(len(set(keys)), len(keys))
+        times = [approach.time for approach in approaches]
+        self.assertEqual(times, sorted(times))
+
+    def test_scan_skips_dates_outside_of_the_range(self):
+        start, end = datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)
+        approaches, _ = load_federated_approaches(cad_paths(self.directory), start, end)
+        expected = [key for key, record in self.records.items()
+                    if start <= datetime.datetime.strptime(key[1], '%Y-%b-%d %H:%M').date() <= end]
+        self.assertEqual(len(approaches), len(expected))
+        self.assertTrue(all(start <= approach.time.date() <= end for approach in approaches))
+
+    def test_load_database_with_columns(self):
+        database = load_database(TEST_NEO_FILE, self.directory / '*.json')
+        single = load_database(TEST_NEO_FILE, TEST_CAD_FILE)
+        self.assertEqual(sorted(self.keys(database.query())), sorted(self.keys(single.query())))
+
+        dist_min = self.fields.index('dist_min')
+        for row, approach in database.query_rows():
+            record = self.records[approach.designation, approach.time.strftime('%Y-%b-%d %H:%M')]
+            self.assertEqual(database.column_values(row, approach, ['dist_min'])['dist_min'],
+                             float(record[dist_min]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Check the conversions of times to and from minutes since the epoch, and filters on them.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+
+from extract import load_approaches
+from filters import TimeFilter
+from helpers import (DATE_CACHE_DAYS, _date, _date_str, cd_to_datetime, cd_to_minutes,
+                     datetime_to_minutes, datetime_to_str, minutes_to_date, minutes_to_datetime,
+                     minutes_to_str)
+from models import CloseApproach
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+CALENDAR_DATES = ['1900-Jan-01 00:00', '1969-Dec-31 23:59', '1970-Jan-01 00:00',
+                  '2000-Feb-29 12:34', '2020-Dec-31 23:59', '2199-Jul-04 06:07']
+
+
+class TestEpochMinutes(unittest.TestCase):
+    def test_cd_to_minutes(self):
+        for calendar_date in CALENDAR_DATES:
+            with self.subTest(calendar_date=calendar_date):
+                self.assertEqual(cd_to_minutes(calendar_date),
+                                 datetime_to_minutes(cd_to_datetime(calendar_date)))
+
+    def test_invalid_calendar_dates(self):
+        for calendar_date in ['2020-Feb-30 00:00', '2020-Foo-01 00:00', '2020-Jan-01 24:00',
+                              '2020-Jan-01 00:60', '2020-01-01 00:00', '2020-Jan-01']:
+            with self.subTest(calendar_date=calendar_date):
+                with self.assertRaises(ValueError):
+                    cd_to_minutes(calendar_date)
+
+    def test_minutes_to_str_and_date(self):
+        for calendar_date in CALENDAR_DATES:
+            with self.subTest(calendar_date=calendar_date):
+                minutes = cd_to_minutes(calendar_date)
+                dt = cd_to_datetime(calendar_date)
+                self.assertEqual(minutes_to_datetime(minutes), dt)
+                self.assertEqual(minutes_to_str(minutes), datetime_to_str(dt))
+                self.assertEqual(minutes_to_date(minutes), dt.date())
+
+    def test_date_caches_are_bounded(self):
+        start = cd_to_datetime(CALENDAR_DATES[0])
+        for days in range(2 * DATE_CACHE_DAYS):
+            dt = start + datetime.timedelta(days=days)
+            self.assertEqual(minutes_to_str(datetime_to_minutes(dt)), datetime_to_str(dt))
+            self.assertEqual(minutes_to_date(datetime_to_minutes(dt)), dt.date())
+        self.assertLessEqual(_date.cache_info().currsize, DATE_CACHE_DAYS)
+        self.assertLessEqual(_date_str.cache_info().currsize, DATE_CACHE_DAYS)
+
+    def test_close_approach_time(self):
+        approach = CloseApproach('433', '2000-Feb-29 12:34', '0.1', '5')
+        self.assertEqual(approach.minutes, cd_to_minutes('2000-Feb-29 12:34'))
+        self.assertEqual(approach.time, datetime.datetime(2000, 2, 29, 12, 34))
+        self.assertEqual(approach.time_str, '2000-02-29 12:34')
+        self.assertEqual(CloseApproach('433', approach.time, 0.1, 5).minutes, approach.minutes)
+        self.assertEqual(approach.copy().minutes, approach.minutes)
+
+
+class TestTimeFilter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    def test_matches_date_comparisons(self):
+        for op in (operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge):
+            for date in (datetime.date(2020, 3, 2), datetime.date(2020, 7, 1)):
+                with self.subTest(op=op.__name__, date=date):
+                    f = TimeFilter(op, date)
+                    expected = [approach for approach in self.approaches if op(approach.time.date(), date)]
+                    self.assertGreater(len(expected), 0)
+                    self.assertEqual([approach for approach in self.approaches if f(approach)], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Check that queries on sorted columns mapped from an index file match a full scan.
+
+The index file is written next to the close approach data, so these tests work
+on copies of the test data files in a temporary directory.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_indexes
+"""
+import contextlib
+import datetime
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from columns import ApproachColumnStore
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from indexes import INDEXED_COLUMNS, index_path, open_index
+from main import index, load_database
+from offsets import sidecar_path
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestIndexFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        approaches = load_approaches(TEST_CAD_FILE)
+        cls.scan = NEODatabase(load_neos(TEST_NEO_FILE), approaches,
+                               ApproachColumnStore([TEST_CAD_FILE], len(approaches)))
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        root = pathlib.Path(tmpdir.name)
+        self.neo_file = pathlib.Path(shutil.copy(TEST_NEO_FILE, root / 'neos.csv'))
+        self.cad_file = pathlib.Path(shutil.copy(TEST_CAD_FILE, root / 'cad.json'))
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            index(self.neo_file, self.cad_file)
+        self.assertIn('Indexed 4700 close approaches', stdout.getvalue())
+        self.db = load_database(self.neo_file, self.cad_file)
+
+    def keys(self, approaches):
+        return [(approach.designation, approach.time) for approach in approaches]
+
+    def test_index_files_are_written(self):
+        self.assertTrue(index_path(self.cad_file).exists())
+        self.assertTrue(sidecar_path(self.cad_file).exists())
+
+    def test_columns_are_mapped(self):
+        for name in INDEXED_COLUMNS:
+            self.assertTrue(self.db.bitmaps.has_sorted_column(name))
+            self.assertIsInstance(self.db.bitmaps.sorted_column(name).values, memoryview)
+
+    def test_queries_match_a_scan(self):
+        criteria = [
+            dict(distance_min=0.3),
+            dict(distance_max=0.01, velocity_min=20),
+            dict(start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 3, 7)),
+            dict(date=datetime.date(2020, 6, 30), velocity_max=10),
+            dict(diameter_min=0.5),
+            dict(diameter_max=0.2, hazardous=True),
+            dict(diameter_min=0.1, moid_max=0.05, distance_max=0.2),
+            dict(velocity_min=5, has_name=False, dist_min_max=0.1),
+        ]
+        for kwargs in criteria:
+            with self.subTest(**kwargs):
+                filters = create_filters(**kwargs)
+                expected = self.keys(self.scan.query(filters))
+                self.assertEqual(self.keys(self.db.query(filters)), expected)
+                self.assertEqual(self.db.count(filters), len(expected))
+
+    def test_stale_index_is_ignored(self):
+        with open(self.cad_file, 'a') as outfile:
+            outfile.write('\n')
+        self.assertIsNone(open_index(self.neo_file, self.cad_file, 4700))
+        self.assertFalse(load_database(self.neo_file, self.cad_file).bitmaps.has_sorted_column('date'))
+
+    def test_touched_data_file_is_checked_by_checksum(self):
+        stat = os.stat(self.cad_file)
+        os.utime(self.cad_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(open_index(self.neo_file, self.cad_file, 4700))
+        self.assertIsNone(open_index(self.neo_file, self.cad_file, 4699))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""Check that the close approaches nearest in time to an instant are found like a full sort.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_near
+"""
+import contextlib
+import csv
+import io
+import itertools
+import math
+import pathlib
+import tempfile
+import unittest
+
+from bitmap import SortedColumn
+from columns import ApproachColumnStore
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from helpers import cd_to_minutes
+from main import make_parser, near
+from sqlstore import SQLiteDatabase
+from tests.test_sqlstore import copy_data_files
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+# Instants within, between, and on either side of the approaches in the test data.
+INSTANTS = ['2020-Mar-02 14:00', '2020-Jan-01 00:00', '2020-Jul-15 09:31', '1999-Jan-01 00:00',
+            '2050-Jan-01 00:00']
+
+
+def offsets(approaches, minutes):
+    """Return the distance in time of each approach from an instant, and its time, in order."""
+    return [(abs(approach.minutes - minutes), approach.minutes) for approach in approaches]
+
+
+class TestSortedColumnAround(unittest.TestCase):
+    def test_nearest_first(self):
+        column = SortedColumn([5.0, 1.0, math.nan, 3.0, 3.0, 9.0], lambda value: value)
+        self.assertEqual([column.values[position] for position in column.around(4.0)],
+                         [3.0, 3.0, 5.0, 1.0, 9.0])
+        self.assertEqual([column.values[position] for position in column.around(7.0)],
+                         [5.0, 9.0, 3.0, 3.0, 1.0])
+        self.assertEqual(list(column.around(0.0)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(column.around(10.0)), [4, 3, 2, 1, 0])
+
+    def test_empty(self):
+        self.assertEqual(list(SortedColumn([], lambda value: value).around(1.0)), [])
+
+
+class TestNearest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches,
+                             ApproachColumnStore([TEST_CAD_FILE], len(cls.approaches)))
+
+    def assertNearest(self, filters, k=25):
+        for instant in INSTANTS:
+            with self.subTest(instant=instant, filters=filters):
+                minutes = cd_to_minutes(instant)
+                matches = [approach for approach in self.db.query(filters)]
+                received = list(itertools.islice(self.db.nearest(minutes, filters), k))
+                self.assertEqual(offsets(received, minutes), sorted(offsets(matches, minutes))[:k])
+                self.assertTrue(set(received) <= set(matches))
+
+    def test_without_filters(self):
+        self.assertNearest(())
+
+    def test_with_filters(self):
+        self.assertNearest(create_filters(hazardous=True))
+        self.assertNearest(create_filters(distance_max=0.05, diameter_min=0.1))
+        self.assertNearest(create_filters(dist_min_max=0.01, orbit_class='APO'))
+
+    def test_every_approach(self):
+        received = list(self.db.nearest(cd_to_minutes(INSTANTS[0])))
+        self.assertEqual(len(received), len(self.approaches))
+
+
+class TestSQLiteNearest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        neo_csv_path, cad_json_path = copy_data_files(cls.tmpdir.name)
+        cls.sqlite = SQLiteDatabase.open(neo_csv_path, cad_json_path)
+        cls.db = NEODatabase(load_neos(neo_csv_path), load_approaches(cad_json_path))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sqlite.close()
+        cls.tmpdir.cleanup()
+
+    def test_matches_the_database(self):
+        for filters in ((), create_filters(hazardous=True, velocity_min=20)):
+            for instant in INSTANTS:
+                with self.subTest(instant=instant, filters=filters):
+                    minutes = cd_to_minutes(instant)
+                    expected = itertools.islice(self.db.nearest(minutes, filters), 30)
+                    received = itertools.islice(self.sqlite.nearest(minutes, filters), 30)
+                    self.assertEqual([str(approach) for approach in received],
+                                     [str(approach) for approach in expected])
+
+
+class TestNearSubcommand(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _ = make_parser()
+
+    def test_stdout(self):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            near(self.db, self.parser.parse_args(['near', '--time', '2020-03-02 14:00', '-k', '4']))
+        expected = itertools.islice(self.db.nearest(cd_to_minutes('2020-Mar-02 14:00')), 4)
+        self.assertEqual(stdout.getvalue().splitlines(), [str(approach) for approach in expected])
+
+    def test_outfile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfile = pathlib.Path(tmpdir) / 'near.csv'
+            near(self.db, self.parser.parse_args(['near', '--time', '2020-03-02', '-k', '7', '--hazardous',
+                                                  '--outfile', str(outfile)]))
+            with open(outfile) as infile:
+                rows = list(csv.DictReader(infile))
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(row['potentially_hazardous'] == 'True' for row in rows))
+
+    def test_invalid_k(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            for text in ('0', '-3', 'ten'):
+                with self.subTest(k=text):
+                    with self.assertRaises(SystemExit):
+                        self.parser.parse_args(['near', '--time', '2020-03-02 14:00', '-k', text])
+        self.assertEqual(self.parser.parse_args(['near', '--time', '2020-03-02 14:00', '-k', '1']).k, 1)
+
+    def test_invalid_time(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            for text in ('2020-03-02 25:00', '2020-03-02 14', '14:00', '2020/03/02 14:00'):
+                with self.subTest(text=text):
+                    with self.assertRaises(SystemExit):
+                        self.parser.parse_args(['near', '--time', text])
+
+
+if __name__ == '__main__':
+    unittest.main()
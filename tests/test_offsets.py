@@ -0,0 +1,89 @@
+"""Check that an `OffsetIndex` fetches the same NEOs as a fully-loaded `NEODatabase`.
+
+The sidecar file is written next to the close approach data, so these tests
+work on copies of the test data files in a temporary directory.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_offsets
+"""
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from offsets import OffsetIndex, sidecar_path
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestOffsetIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmpdir.name)
+        self.neo_file = shutil.copy(TEST_NEO_FILE, root / 'neos.csv')
+        self.cad_file = shutil.copy(TEST_CAD_FILE, root / 'cad.json')
+        self.index = OffsetIndex.open(self.neo_file, self.cad_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assertSameNEO(self, received, expected):
+        self.assertIsNotNone(received)
+        self.assertEqual(received.designation, expected.designation)
+        self.assertEqual(received.name, expected.name)
+        self.assertEqual(repr(received), repr(expected))
+        self.assertEqual([repr(approach) for approach in received.approaches],
+                         [repr(approach) for approach in expected.approaches])
+
+    def test_open_writes_sidecar(self):
+        self.assertTrue(sidecar_path(self.cad_file).exists())
+
+    def test_get_neo_by_designation(self):
+        for designation in ('1865', '2101', '2020 BS', '2019 SC8'):
+            with self.subTest(designation=designation):
+                self.assertSameNEO(self.index.get_neo_by_designation(designation),
+                                   self.db.get_neo_by_designation(designation))
+
+    def test_get_neo_by_designation_with_many_approaches(self):
+        expected = max(self.db._neos, key=lambda neo: len(neo.approaches))
+        self.assertGreater(len(expected.approaches), 1)
+        self.assertSameNEO(self.index.get_neo_by_designation(expected.designation), expected)
+
+    def test_get_neo_by_name(self):
+        for name in ('Lemmon', 'Jormungandr', 'Cerberus'):
+            with self.subTest(name=name):
+                self.assertSameNEO(self.index.get_neo_by_name(name), self.db.get_neo_by_name(name))
+
+    def test_missing_neos(self):
+        self.assertIsNone(self.index.get_neo_by_designation('not-real-designation'))
+        self.assertIsNone(self.index.get_neo_by_name('not-real-name'))
+        self.assertIsNone(self.index.get_neo_by_name(''))
+
+    def test_sidecar_is_rebuilt_when_data_changes(self):
+        # Drop the first NEO from the data file, and make sure its mtime moves.
+        with open(self.neo_file) as infile:
+            header, first, *rest = infile.readlines()
+        with open(self.neo_file, 'w') as outfile:
+            outfile.writelines([header] + rest)
+        stat = os.stat(self.neo_file)
+        os.utime(self.neo_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        index = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertIsNone(index.get_neo_by_designation('1685'))
+        self.assertSameNEO(index.get_neo_by_designation('1865'),
+                           self.db.get_neo_by_designation('1865'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Check that close approaches can be split into time partitions and loaded selectively.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_partition
+"""
+import datetime
+import json
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import load_close_approaches
+from partition import build_partitions, is_partitioned, read_manifest, select_partitions
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def summarize(approaches):
+    return sorted((approach.designation, approach.time, approach.distance, approach.velocity)
+                  for approach in approaches)
+
+
+class TestPartition(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.directory = pathlib.Path(cls.tmpdir.name) / 'cad.partitions'
+        cls.manifest = build_partitions(TEST_CAD_FILE, cls.directory, granularity='month')
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_manifest_describes_partitions(self):
+        self.assertTrue(is_partitioned(self.directory))
+        self.assertFalse(is_partitioned(TEST_CAD_FILE))
+        self.assertEqual(read_manifest(self.directory), self.manifest)
+        self.assertEqual([entry['file'] for entry in self.manifest['partitions']],
+                         [f'cad-2020-{month:02d}.json' for month in range(1, 13)])
+        self.assertEqual(sum(entry['count'] for entry in self.manifest['partitions']),
+                         len(self.approaches))
+
+    def test_partitions_are_valid_cad_files(self):
+        entry = self.manifest['partitions'][0]
+        with open(self.directory / entry['file']) as infile:
+            contents = json.load(infile)
+        self.assertEqual(contents['count'], entry['count'])
+        self.assertEqual(len(contents['data']), entry['count'])
+        self.assertIn('cd', contents['fields'])
+
+    def test_partition_time_bounds(self):
+        for entry in self.manifest['partitions']:
+            approaches = load_approaches(self.directory / entry['file'])
+            times = [approach.time for approach in approaches]
+            self.assertEqual(str(min(times))[:16], entry['min_time'])
+            self.assertEqual(str(max(times))[:16], entry['max_time'])
+
+    def test_load_all_partitions(self):
+        self.assertEqual(summarize(load_close_approaches(self.directory)[0]),
+                         summarize(self.approaches))
+
+    def test_select_partitions_prunes_by_date(self):
+        selected = select_partitions(self.manifest, datetime.date(2020, 2, 3), datetime.date(2020, 3, 1))
+        self.assertEqual([entry['file'] for entry in selected],
+                         ['cad-2020-02.json', 'cad-2020-03.json'])
+        selected = select_partitions(self.manifest, start_date=datetime.date(2020, 12, 31))
+        self.assertEqual([entry['file'] for entry in selected], ['cad-2020-12.json'])
+        self.assertEqual(select_partitions(self.manifest, end_date=datetime.date(2019, 12, 31)), [])
+
+    def test_pruned_query_matches_full_query(self):
+        start_date, end_date = datetime.date(2020, 4, 10), datetime.date(2020, 5, 20)
+        filters = create_filters(start_date=start_date, end_date=end_date, distance_max=0.2)
+
+        full = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        pruned = NEODatabase(load_neos(TEST_NEO_FILE),
+                             load_close_approaches(self.directory, start_date, end_date)[0])
+        expected = [(approach.neo.designation, approach.time) for approach in full.query(filters)]
+        received = [(approach.neo.designation, approach.time) for approach in pruned.query(filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(received, expected)
+
+    def test_yearly_partitions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = build_partitions(TEST_CAD_FILE, tmpdir, granularity='year')
+            self.assertEqual([entry['file'] for entry in manifest['partitions']], ['cad-2020.json'])
+            self.assertEqual(len(load_close_approaches(tmpdir)[0]), len(self.approaches))
+
+    def test_rebuild_replaces_only_manifest_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            build_partitions(TEST_CAD_FILE, tmpdir, granularity='month')
+            unrelated = pathlib.Path(tmpdir) / 'cad-notes.json'
+            unrelated.write_text('{}')
+            manifest = build_partitions(TEST_CAD_FILE, tmpdir, granularity='year')
+            self.assertEqual(sorted(path.name for path in pathlib.Path(tmpdir).iterdir()),
+                             ['cad-2020.json', 'cad-notes.json', 'manifest.json'])
+            self.assertEqual(read_manifest(tmpdir), manifest)
+
+    def test_refuses_directory_without_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            own = pathlib.Path(tmpdir) / 'cad-2020.json'
+            own.write_bytes(TEST_CAD_FILE.read_bytes())
+            with self.assertRaises(ValueError):
+                build_partitions(TEST_CAD_FILE, tmpdir, granularity='month')
+            self.assertEqual(own.read_bytes(), TEST_CAD_FILE.read_bytes())
+            self.assertEqual(list(pathlib.Path(tmpdir).iterdir()), [own])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Check that a database is rebuilt in the background when its data files change.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_reload
+"""
+import contextlib
+import datetime
+import io
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+import main
+from main import index, load_database, make_parser
+from partition import build_partitions
+from reload import DatabaseReloader
+from shell import NEOShell
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestDatabaseReloader(unittest.TestCase):
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.neo_file = pathlib.Path(shutil.copy(TEST_NEO_FILE, tempdir.name))
+        self.cad_file = pathlib.Path(shutil.copy(TEST_CAD_FILE, tempdir.name))
+        self.database = load_database(self.neo_file, self.cad_file)
+        self.reloader = DatabaseReloader(self.database, main, self.neo_file, self.cad_file)
+
+    def truncate_cad_file(self, count):
+        with open(self.cad_file) as infile:
+            contents = json.load(infile)
+        contents['data'] = contents['data'][:count]
+        with open(self.cad_file, 'w') as outfile:
+            json.dump(contents, outfile)
+
+    def touch(self, path):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_unchanged_files(self):
+        self.assertFalse(self.reloader.changed())
+        self.assertIsNone(self.reloader.poll())
+
+    def test_reload_changed_approaches(self):
+        count = self.database.count()
+        self.truncate_cad_file(100)
+        self.assertTrue(self.reloader.changed())
+        self.assertTrue(self.reloader.start())
+        result = self.reloader.wait()
+        self.assertIsNone(result.error)
+        self.assertGreater(result.elapsed, 0)
+        self.assertEqual(result.database.count(), 100)
+        self.assertIs(self.reloader.database, result.database)
+        self.assertFalse(self.reloader.changed())
+        # The old database is left intact.
+        self.assertEqual(self.database.count(), count)
+        self.assertEqual(sum(1 for _ in self.database.query()), count)
+
+    def test_reload_only_neos_copies_approaches(self):
+        self.touch(self.neo_file)
+        self.assertTrue(self.reloader.start())
+        database = self.reloader.wait().database
+        self.assertIs(database.approach_columns, self.database.approach_columns)
+        old, new = list(self.database.query()), list(database.query())
+        self.assertEqual([(a.designation, a.time, a.distance) for a in old],
+                         [(a.designation, a.time, a.distance) for a in new])
+        self.assertTrue(all(a is not b and a.neo is not b.neo for a, b in zip(old, new)))
+
+    def test_reload_maps_index_files(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            index(self.neo_file, self.cad_file)
+        self.touch(self.neo_file)
+        self.assertTrue(self.reloader.start())
+        database = self.reloader.wait().database
+        self.assertTrue(database.bitmaps.has_sorted_column('distance'))
+
+    def test_reload_keeps_the_range_of_dates(self):
+        directory = self.cad_file.with_name('cad.partitions')
+        build_partitions(self.cad_file, directory, granularity='month')
+        start, end = datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)
+        database = load_database(self.neo_file, directory, start, end)
+        reloader = DatabaseReloader(database, main, self.neo_file, directory, start, end)
+        self.touch(directory / 'cad-2020-03.json')
+        self.assertTrue(reloader.start())
+        reloaded = reloader.wait().database
+        self.assertLess(reloaded.count(), self.database.count())
+        self.assertEqual(reloaded.count(), database.count())
+
+    def test_failed_reload_keeps_database(self):
+        with open(self.cad_file, 'w') as outfile:
+            outfile.write('{"fields": [')
+        self.reloader.start()
+        result = self.reloader.wait()
+        self.assertIsNone(result.database)
+        self.assertIsNotNone(result.error)
+        self.assertIs(self.reloader.database, self.database)
+        # The broken files aren't retried until they change again.
+        self.assertFalse(self.reloader.changed())
+
+    def test_shell_swaps_in_reloaded_database(self):
+        _, parsers = make_parser()
+        shell = NEOShell(self.database, parsers, main, reloader=self.reloader)
+        self.truncate_cad_file(10)
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            shell.check_data_files()
+            self.assertIs(shell.db, self.database)
+            self.reloader._thread.join(timeout=30)
+            shell.check_data_files()
+        self.assertIn("reloading them in the background", stderr.getvalue())
+        self.assertIn("Reloaded the data files in", stderr.getvalue())
+        self.assertEqual(shell.db.count(), 10)
+
+    def test_shell_reload_command(self):
+        _, parsers = make_parser()
+        shell = NEOShell(self.database, parsers, main, reloader=self.reloader)
+        self.truncate_cad_file(20)
+        with contextlib.redirect_stderr(io.StringIO()):
+            shell.onecmd('reload')
+        self.assertEqual(shell.db.count(), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
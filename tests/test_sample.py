@@ -0,0 +1,112 @@
+"""Check that query results are estimated correctly from a sample of close approaches.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sample
+"""
+import collections
+import contextlib
+import io
+import pathlib
+import statistics
+import unittest
+
+from columns import ApproachColumnStore
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import make_parser, query
+from models import CloseApproach, NearEarthObject
+from sample import StratifiedSample
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestStratifiedSample(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        columns = ApproachColumnStore([TEST_CAD_FILE], len(cls.approaches))
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches, columns)
+
+    def matches(self, filters):
+        return [approach for _, approach in self.db.query_rows(filters)]
+
+    def test_sample_of_everything_is_exact(self):
+        filters = create_filters(distance_max=0.05, velocity_min=20)
+        expected = self.matches(filters)
+        summary, = self.db.sample(len(self.approaches)).estimate(filters)
+        self.assertAlmostEqual(summary.count.value, len(expected))
+        self.assertAlmostEqual(summary.count.margin, 0)
+        self.assertAlmostEqual(summary.distance.value,
+                               statistics.mean(approach.distance for approach in expected))
+        self.assertAlmostEqual(summary.velocity.margin, 0)
+        self.assertEqual(summary.sample_count, len(expected))
+
+    def test_sample_is_repeatable_and_kept(self):
+        sample = self.db.sample(500, seed=7)
+        self.assertIs(self.db.sample(500, seed=7), sample)
+        self.assertEqual(StratifiedSample(self.approaches, 500, seed=7).strata, sample.strata)
+        self.assertNotEqual(self.db.sample(500, seed=8).strata, sample.strata)
+        self.assertEqual(sample.size, 500)
+        self.assertEqual(sample.population, len(self.approaches))
+
+    def test_estimates_cover_the_exact_values(self):
+        filters = create_filters(distance_max=0.1, hazardous=False)
+        expected = self.matches(filters)
+        summary, = self.db.sample(1500).estimate(filters)
+        self.assertLess(summary.count.low, len(expected))
+        self.assertGreater(summary.count.high, len(expected))
+        self.assertGreater(summary.count.margin, 0)
+        mean = statistics.mean(approach.velocity for approach in expected)
+        self.assertLess(summary.velocity.low, mean)
+        self.assertGreater(summary.velocity.high, mean)
+
+    def test_estimate_by_group(self):
+        filters = create_filters(hazardous=True)
+        months = collections.Counter(f'{approach.time:%Y-%m}' for approach in self.matches(filters))
+        summaries = self.db.sample(len(self.approaches)).estimate(filters, 'month')
+        self.assertEqual({summary.group: round(summary.count.value) for summary in summaries}, months)
+        self.assertIn('month 2020-01: about', str(summaries[0]))
+
+    def test_estimate_with_approach_columns(self):
+        filters = create_filters(dist_min_max=0.01)
+        summary, = self.db.sample(len(self.approaches)).estimate(filters)
+        self.assertAlmostEqual(summary.count.value, self.db.count(filters))
+
+    def test_every_year_is_sampled(self):
+        neo = NearEarthObject('', 'X', 'N', '')
+        approaches = [CloseApproach(None, f'{1900 + year}-Jan-01 00:00', 0.1, 10, neo=neo)
+                      for year in range(10) for _ in range(1 + 99 * (year == 0))]
+        sample = StratifiedSample(approaches, 20)
+        self.assertEqual([population for population, _ in sample.strata], [100] + [1] * 9)
+        self.assertEqual(sample.size, 18 + 9)
+        summaries = sample.estimate(group_by='year')
+        self.assertEqual([summary.count.value for summary in summaries], [100] + [1] * 9)
+
+    def test_no_matches(self):
+        self.assertEqual(self.db.sample(100).estimate(create_filters(distance_min=10)), [])
+
+
+class TestApproxQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser, _ = make_parser()
+
+    def test_approx_rejects_exact_answers(self):
+        for answer in ('--count', '--exists'):
+            with self.subTest(answer=answer):
+                args = self.parser.parse_args(['query', '--hazardous', '--approx', answer])
+                with contextlib.redirect_stdout(io.StringIO()) as stdout, \
+                        contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    query(self.db, args)
+                self.assertEqual(stdout.getvalue(), '')
+                self.assertIn("can't be combined", stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
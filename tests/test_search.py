@@ -0,0 +1,65 @@
+"""Check that an `NEODatabase` can search for NEOs by partial or misspelled names.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_search
+"""
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+
+
+class TestSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.db = NEODatabase(cls.neos, [])
+
+    def designations(self, text, limit=10):
+        return [neo.designation for neo in self.db.search(text, limit=limit)]
+
+    def test_search_exact_name_is_case_insensitive(self):
+        self.assertEqual(self.designations('cerberus')[0], '1865')
+        self.assertEqual(self.designations('CERBERUS')[0], '1865')
+
+    def test_search_exact_designation(self):
+        self.assertEqual(self.designations('2020 bs')[0], '2020 BS')
+
+    def test_search_by_name_prefix(self):
+        self.assertEqual(self.designations('apo')[0], '99942')
+
+    def test_search_by_designation_prefix(self):
+        expected = sorted(neo.designation for neo in self.neos
+                          if neo.designation.startswith('2020 BA'))[:5]
+        self.assertEqual(self.designations('2020 ba', limit=5), expected)
+
+    def test_search_tolerates_misspellings(self):
+        self.assertIn('99942', self.designations('apophs'))
+        self.assertIn('1865', self.designations('cerbrus'))
+        self.assertIn('471926', self.designations('jormungander'))
+
+    def test_search_ranks_exact_matches_first(self):
+        name = self.db.get_neo_by_name('Adonis')
+        self.assertIs(self.db.search('adonis')[0], name)
+
+    def test_search_respects_limit(self):
+        self.assertEqual(len(self.designations('2020', limit=3)), 3)
+        self.assertEqual(self.designations('2020', limit=0), [])
+
+    def test_search_results_are_unique(self):
+        designations = self.designations('a', limit=50)
+        self.assertEqual(len(designations), len(set(designations)))
+
+    def test_search_missing(self):
+        self.assertEqual(self.designations('not-a-real-name'), [])
+        self.assertEqual(self.designations(''), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
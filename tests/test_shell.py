@@ -0,0 +1,79 @@
+"""Check that the interactive shell pages through the results of a query.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_shell
+"""
+import contextlib
+import io
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+import main
+from main import make_parser
+from shell import NEOShell
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestShellPaging(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        _, cls.parsers = make_parser()
+
+    def setUp(self):
+        self.shell = NEOShell(self.db, self.parsers, main)
+
+    def run_command(self, line):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout, \
+                contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.shell.onecmd(line)
+        return stdout.getvalue().splitlines(), stderr.getvalue()
+
+    def test_more_continues_the_query(self):
+        expected = [str(approach) for approach in self.db.query()][:9]
+        first, _ = self.run_command('query --limit 3')
+        second, _ = self.run_command('more')
+        third, _ = self.run_command('next 3')
+        self.assertEqual(first + second + third, expected)
+
+    def test_more_continues_a_sorted_query(self):
+        expected = sorted(self.db.query(), key=lambda approach: approach.distance)[:4]
+        first, _ = self.run_command('query --limit 2 --sort-by distance')
+        second, _ = self.run_command('more')
+        self.assertEqual(first + second, [str(approach) for approach in expected])
+
+    def test_more_after_the_last_result(self):
+        first, _ = self.run_command('query --date 2020-01-01 --max-distance 0.03')
+        self.assertGreater(len(first), 0)
+        lines, _ = self.run_command('more 1000')
+        self.assertLess(len(lines), 1000)
+        lines, errors = self.run_command('more')
+        self.assertEqual(lines, [])
+        self.assertIn("no more results", errors)
+
+    def test_more_rejects_sizes_below_one(self):
+        expected = [str(approach) for approach in self.db.query()][:4]
+        first, _ = self.run_command('query --limit 2')
+        for size in ('0', '-5'):
+            with self.subTest(size=size):
+                lines, errors = self.run_command(f'more {size}')
+                self.assertEqual(lines, [])
+                self.assertIn("at least 1", errors)
+        second, _ = self.run_command('more')
+        self.assertEqual(first + second, expected)
+
+    def test_more_without_a_query(self):
+        lines, errors = self.run_command('more')
+        self.assertEqual(lines, [])
+        self.assertIn("Run a `query` first", errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
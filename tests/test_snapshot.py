@@ -0,0 +1,121 @@
+"""Check that readers query consistent snapshots while writers publish new versions.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import datetime
+import math
+import pathlib
+import threading
+import unittest
+
+from columns import ApproachColumnStore
+from extract import load_neos, load_approaches
+from filters import create_filters
+from database import NEODatabase
+from models import CloseApproach
+from snapshot import VersionedDatabase, copy_database
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestVersionedDatabase(unittest.TestCase):
+    def setUp(self):
+        self.database = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        self.versions = VersionedDatabase(self.database)
+        self.size = len(list(self.database.query()))
+        self.designation = next(self.database.query()).designation
+
+    def new_approaches(self, count, distance=0.001):
+        return [CloseApproach(self.designation, datetime.datetime(2020, 12, 31, 23, index),
+                              distance, 10.0) for index in range(count)]
+
+    def test_copy_database_leaves_the_original_intact(self):
+        copy = copy_database(self.database, self.new_approaches(2))
+        self.assertEqual(len(list(copy.query())), self.size + 2)
+        self.assertEqual(len(list(self.database.query())), self.size)
+        neo = self.database.get_neo_by_designation(self.designation)
+        self.assertIsNot(copy.get_neo_by_designation(self.designation), neo)
+        self.assertTrue(all(approach.neo is neo for approach in neo.approaches))
+        self.assertEqual(len(copy.get_neo_by_designation(self.designation).approaches),
+                         len(neo.approaches) + 2)
+
+    def test_appended_version_keeps_approach_columns(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        database = NEODatabase(load_neos(TEST_NEO_FILE), approaches,
+                               ApproachColumnStore([TEST_CAD_FILE], len(approaches)))
+        versions = VersionedDatabase(database)
+        filters = create_filters(dist_min_max=0.01)
+        expected = database.count(filters)
+        self.assertGreater(expected, 0)
+        versions.append(self.new_approaches(2))
+        appended = versions.append(self.new_approaches(3)).database
+        self.assertEqual(appended.count(filters), expected)
+        self.assertEqual(sum(1 for _ in appended.query(filters)), expected)
+        row = appended.count() - 1
+        values = appended.column_values(row, appended.get_approach_by_row(row), ['dist_min', 't_sigma_f'])
+        self.assertTrue(math.isnan(values['dist_min']))
+        self.assertIsNone(values['t_sigma_f'])
+        self.assertEqual(appended.column_values(0, appended.get_approach_by_row(0), ['dist_min']),
+                         database.column_values(0, database.get_approach_by_row(0), ['dist_min']))
+
+    def test_snapshots_are_immutable(self):
+        first = self.versions.snapshot()
+        results = first.database.query()
+        next(results)
+        second = self.versions.append(self.new_approaches(3))
+        self.assertEqual((first.number, second.number), (1, 2))
+        self.assertIs(self.versions.snapshot(), second)
+        # A query in progress keeps running against its own version.
+        self.assertEqual(sum(1 for _ in results), self.size - 1)
+        self.assertEqual(first.database.count(), self.size)
+        self.assertEqual(second.database.count(), self.size + 3)
+
+    def test_concurrent_readers_and_writer(self):
+        filters = create_filters(distance_max=0.01)
+        expected = self.database.count(filters)
+        appends, per_append = 20, 5
+        done = threading.Event()
+        errors = []
+
+        def read():
+            try:
+                last = 0
+                while True:
+                    # Once the writer is done, read its last version once more, then stop.
+                    finished = done.is_set()
+                    number, database = self.versions.snapshot()
+                    self.assertGreaterEqual(number, last)
+                    last = number
+                    matches = list(database.query(filters))
+                    self.assertEqual(len(matches), expected + per_append * (number - 1))
+                    self.assertEqual(database.count(filters), len(matches))
+                    for approach in matches:
+                        self.assertIs(database.get_neo_by_designation(approach.designation),
+                                      approach.neo)
+                    if finished:
+                        break
+            except Exception as error:
+                errors.append(error)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        try:
+            for _ in range(appends):
+                self.versions.append(self.new_approaches(per_append))
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.versions.snapshot().number, appends + 1)
+        self.assertEqual(self.versions.database.count(filters), expected + appends * per_append)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Check that streams are sorted correctly, even when they're spilled to disk.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sorting
+"""
+import math
+import pathlib
+import random
+import tracemalloc
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from sorting import ExternalSorter, parse_size, sort_rows, MAX_MERGE_FAN_IN
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestExternalSorter(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        # Pairs of (key, original position), with plenty of duplicate keys.
+        self.items = [(rng.randrange(50), position) for position in range(5000)]
+
+    def sort(self, budget, reverse=False, limit=None):
+        sorter = ExternalSorter(lambda item: item[0], budget, reverse=reverse)
+        return list(sorter.sort(self.items, limit=limit)), sorter
+
+    def test_sort_in_memory(self):
+        received, sorter = self.sort(10 ** 9)
+        self.assertEqual(received, sorted(self.items, key=lambda item: item[0]))
+        self.assertEqual(sorter.spilled_runs, 0)
+
+    def test_sort_with_spills_is_stable(self):
+        received, sorter = self.sort(2000)
+        self.assertEqual(received, sorted(self.items, key=lambda item: item[0]))
+        self.assertGreater(sorter.spilled_runs, MAX_MERGE_FAN_IN)
+
+    def test_reverse_sort_with_spills_is_stable(self):
+        received, _ = self.sort(2000, reverse=True)
+        self.assertEqual(received, sorted(self.items, key=lambda item: -item[0]))
+
+    def test_sort_with_spills_has_bounded_memory(self):
+        items = ((float(key), 'x' * 20) for key in range(100000, 0, -1))
+        sorter = ExternalSorter(lambda item: item[0], 10000)
+        tracemalloc.start()
+        try:
+            for _ in sorter.sort(items):
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Holding every item at once would take well over 10 MB.
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+    def test_sort_with_limit(self):
+        expected = sorted(self.items, key=lambda item: item[0])[:25]
+        self.assertEqual(self.sort(10 ** 9, limit=25)[0], expected)
+        self.assertEqual(self.sort(200, limit=25)[0], expected)
+
+    def test_sort_nothing(self):
+        sorter = ExternalSorter(lambda item: item[0], 1000)
+        self.assertEqual(list(sorter.sort([])), [])
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('64K'), 64 * 1024)
+        self.assertEqual(parse_size('1.5m'), 3 * 512 * 1024)
+        self.assertEqual(parse_size('2GB'), 2 * 1024 ** 3)
+        for invalid in ('', '0', '-5M', 'lots'):
+            with self.assertRaises(ValueError):
+                parse_size(invalid)
+
+
+class TestSortRows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def test_sort_by_diameter_puts_unknown_diameters_last(self):
+        for reverse in (False, True):
+            with self.subTest(reverse=reverse):
+                received = [approach for _, approach in sort_rows(
+                    self.db.query_rows(), self.db.get_approach_by_row, 'diameter', 50 * 1024, reverse=reverse)]
+                self.assertEqual(len(received), len(self.approaches))
+                known = [approach.neo.diameter for approach in received
+                         if not math.isnan(approach.neo.diameter)]
+                self.assertEqual(known, sorted(known, reverse=reverse))
+                self.assertFalse(math.isnan(received[0].neo.diameter))
+                self.assertTrue(math.isnan(received[-1].neo.diameter))
+
+    def test_sort_rows_with_spills(self):
+        received = list(sort_rows(self.db.query_rows(), self.db.get_approach_by_row,
+                                  'velocity', 10 * 1024, reverse=True))
+        expected = sorted(self.approaches, key=lambda approach: approach.velocity, reverse=True)
+        self.assertEqual([approach for _, approach in received], expected)
+        for row, approach in received:
+            self.assertIs(self.approaches[row], approach)
+
+
+if __name__ == '__main__':
+    unittest.main()
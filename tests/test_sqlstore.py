@@ -0,0 +1,145 @@
+"""Check that the SQLite backend answers queries exactly like the in-memory `NEODatabase`.
+
+The SQLite database file is written next to the close approach data, so these
+tests work on copies of the test data files in a temporary directory.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sqlstore
+"""
+import datetime
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from columns import ApproachColumnStore
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from sqlstore import SQLiteDatabase, sqlite_path
+from tests import test_query
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def copy_data_files(directory):
+    """Copy the test data files into a directory, and return their new paths."""
+    directory = pathlib.Path(directory)
+    return (pathlib.Path(shutil.copy(TEST_NEO_FILE, directory / 'neos.csv')),
+            pathlib.Path(shutil.copy(TEST_CAD_FILE, directory / 'cad.json')))
+
+
+class InMemoryApproaches:
+    """Answer queries with a `SQLiteDatabase`, but report the equivalent in-memory approaches.
+
+    The expectations of `test_query` compare sets of the very `CloseApproach`
+    objects loaded into memory, so each approach read from SQLite is swapped for
+    the in-memory approach in the same row.
+    """
+
+    def __init__(self, database, approaches):
+        self.database = database
+        self.approaches = approaches
+
+    def query(self, filters=()):
+        for row, _ in self.database.query_rows(filters):
+            yield self.approaches[row]
+
+
+class TestSQLiteQuery(test_query.TestQuery):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.sqlite = SQLiteDatabase.open(*copy_data_files(cls.tmpdir.name))
+        cls.db = InMemoryApproaches(cls.sqlite, cls.approaches)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sqlite.close()
+        cls.tmpdir.cleanup()
+
+
+class TestSQLiteDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        approaches = load_approaches(TEST_CAD_FILE)
+        cls.memory = NEODatabase(load_neos(TEST_NEO_FILE), approaches,
+                                 ApproachColumnStore([TEST_CAD_FILE], len(approaches)))
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.neo_file, self.cad_file = copy_data_files(tmpdir.name)
+        self.db = SQLiteDatabase.open(self.neo_file, self.cad_file)
+        self.addCleanup(self.db.close)
+
+    def test_approaches_match(self):
+        filters = create_filters(start_date=datetime.date(2020, 5, 1), end_date=datetime.date(2020, 5, 31),
+                                 diameter_max=1, hazardous=False, distance_max=0.2)
+        expected = [(row, repr(approach)) for row, approach in self.memory.query_rows(filters)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([(row, repr(approach)) for row, approach in self.db.query_rows(filters)],
+                         expected)
+
+    def test_count_and_exists(self):
+        for kwargs in [{}, dict(hazardous=True, velocity_min=20), dict(orbit_class='ate', moid_max=0.05),
+                       dict(dist_min_max=0.01, has_diameter=False), dict(distance_min=10)]:
+            with self.subTest(**kwargs):
+                filters = create_filters(**kwargs)
+                self.assertEqual(self.db.count(filters), self.memory.count(filters))
+                self.assertEqual(self.db.exists(filters), self.memory.exists(filters))
+
+    def test_neo_lookups(self):
+        neo = self.db.get_neo_by_name('Cerberus')
+        self.assertIs(self.db.get_neo_by_designation('1865'), neo)
+        expected = self.memory.get_neo_by_designation('1865')
+        self.assertEqual(repr(neo), repr(expected))
+        self.assertEqual([repr(approach) for approach in neo.approaches],
+                         [repr(approach) for approach in expected.approaches])
+        self.assertIsNone(self.db.get_neo_by_designation('not a designation'))
+        self.assertIsNone(self.db.get_neo_by_name(''))
+
+    def test_approach_view_indexes(self):
+        neo = max(self.memory.neos, key=lambda neo: len(neo.approaches))
+        expected = [repr(approach) for approach in neo.approaches]
+        view = self.db.get_neo_by_designation(neo.designation).approaches
+        for index in range(-len(expected), len(expected)):
+            self.assertEqual(repr(view[index]), expected[index])
+        self.assertEqual([repr(approach) for approach in view[1::2]], expected[1::2])
+        for index in (len(expected), -len(expected) - 1):
+            with self.assertRaises(IndexError):
+                view[index]
+
+    def test_neo_summary(self):
+        for designation in ('1865', '2020 QG'):
+            self.assertEqual(repr(self.db.get_neo_by_designation(designation).approaches.summary),
+                             repr(self.memory.get_neo_by_designation(designation).approaches.summary))
+
+    def test_column_values(self):
+        names = ['dist_min', 't_sigma_f', 'moid', 'orbit_class', 'albedo']
+        for row, approach in list(self.memory.query_rows())[:50]:
+            expected = self.memory.column_values(row, approach, names)
+            received = self.db.column_values(row, self.db.get_approach_by_row(row), names)
+            self.assertEqual(repr(received), repr(expected))
+
+    def test_rebuilt_when_data_files_change(self):
+        path = sqlite_path(self.cad_file)
+        built = os.stat(path).st_mtime_ns
+        SQLiteDatabase.open(self.neo_file, self.cad_file).close()
+        self.assertEqual(os.stat(path).st_mtime_ns, built)
+        with open(self.cad_file, 'a') as outfile:
+            outfile.write('\n')
+        database = SQLiteDatabase.open(self.neo_file, self.cad_file)
+        self.addCleanup(database.close)
+        self.assertNotEqual(os.stat(path).st_mtime_ns, built)
+        self.assertEqual(database.count(), self.memory.count())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Check that the main module only imports what each subcommand needs.
+
+Each check runs in a fresh interpreter, because the test runner itself has
+usually imported many of these modules already.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_startup
+"""
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def imported_modules(code):
+    """Run some code in a fresh interpreter and return the names of the modules it imported."""
+    script = code + '\nimport sys\nprint(" ".join(sorted(sys.modules)))\n'
+    completed = subprocess.run([sys.executable, '-c', script], cwd=str(PROJECT_ROOT),
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               universal_newlines=True, check=True)
+    return set(completed.stdout.split('\n')[-2].split())
+
+
+class TestStartup(unittest.TestCase):
+    def test_importing_main_is_lean(self):
+        modules = imported_modules('import main; main.make_parser()')
+        for name in ('cmd', 'shlex', 'csv', 'json', 'write', 'database', 'extract', '_strptime'):
+            self.assertNotIn(name, modules)
+
+    def test_inspect_does_not_load_unneeded_modules(self):
+        # Work on copies, so that the offset sidecar isn't written into the tests folder.
+        with tempfile.TemporaryDirectory() as tmpdir:
+            neo_file = shutil.copy(TEST_NEO_FILE, tmpdir)
+            cad_file = shutil.copy(TEST_CAD_FILE, tmpdir)
+            modules = imported_modules(
+                'import sys, main\n'
+                f'sys.argv = ["main.py", "--neofile", {str(neo_file)!r}, '
+                f'"--cadfile", {str(cad_file)!r}, "inspect", "--pdes", "1865"]\n'
+                'main.main()'
+            )
+        for name in ('cmd', 'shlex', 'write', 'filters', '_strptime'):
+            self.assertNotIn(name, modules)
+
+    def test_interactive_script_is_not_imported_again(self):
+        modules = imported_modules(
+            'import runpy, sys\n'
+            f'sys.argv = ["main.py", "--neofile", {str(TEST_NEO_FILE)!r}, '
+            f'"--cadfile", {str(TEST_CAD_FILE)!r}, "interactive"]\n'
+            'runpy.run_path("main.py", run_name="__main__")'
+        )
+        self.assertIn('shell', modules)
+        self.assertNotIn('main', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
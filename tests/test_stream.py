@@ -0,0 +1,70 @@
+"""Check that a streaming query writes exactly what a query of the `NEODatabase` writes.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_stream
+"""
+import contextlib
+import io
+import pathlib
+import tempfile
+import unittest
+
+from main import load_database, make_parser, query
+from stream import StreamingSource
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+QUERIES = [
+    [],
+    ['--limit', '25'],
+    ['--hazardous', '--max-distance', '0.05'],
+    ['--start-date', '2020-05-01', '--end-date', '2020-05-31', '--not-hazardous', '--max-diameter', '1'],
+    ['--date', '2020-03-14', '--min-velocity', '20'],
+    ['--orbit-class', 'ATE', '--max-moid', '0.05'],
+    ['--max-dist-min', '0.01', '--columns', 'dist_min,dist_max,t_sigma_f,moid'],
+    ['--min-distance', '10'],
+]
+
+
+class TestStreamingQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.database = load_database(TEST_NEO_FILE, TEST_CAD_FILE)
+        cls.stream = StreamingSource(TEST_NEO_FILE, [TEST_CAD_FILE])
+        cls.parser, _ = make_parser()
+
+    def run_query(self, source, argv):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            query(source, self.parser.parse_args(['query'] + argv))
+        return stdout.getvalue()
+
+    def test_stdout(self):
+        for argv in QUERIES:
+            with self.subTest(argv=argv):
+                self.assertEqual(self.run_query(self.stream, argv), self.run_query(self.database, argv))
+
+    def test_count_and_exists(self):
+        for argv in QUERIES:
+            for answer in ('--count', '--exists'):
+                with self.subTest(argv=argv, answer=answer):
+                    self.assertEqual(self.run_query(self.stream, argv + [answer]),
+                                     self.run_query(self.database, argv + [answer]))
+
+    def test_outfiles(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for argv in QUERIES:
+                for suffix in ('.csv', '.json'):
+                    with self.subTest(argv=argv, suffix=suffix):
+                        expected = pathlib.Path(tmpdir) / ('expected' + suffix)
+                        received = pathlib.Path(tmpdir) / ('received' + suffix)
+                        self.run_query(self.database, argv + ['--outfile', str(expected)])
+                        self.run_query(self.stream, argv + ['--outfile', str(received)])
+                        self.assertEqual(received.read_text(), expected.read_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
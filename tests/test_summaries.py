@@ -0,0 +1,90 @@
+"""Check the summaries of the close approaches of each NEO, and the `neos` subcommand.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_summaries
+"""
+import contextlib
+import csv
+import io
+import operator
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from main import make_parser, neos
+from models import CloseApproach, NearEarthObject
+from summaries import NEOSummary, SummaryFilter
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestNEOSummaries(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_summaries_match_approaches(self):
+        for neo in self.db.neos:
+            self.assertEqual(repr(neo.approaches.summary), repr(NEOSummary.from_approaches(neo, neo.approaches)))
+
+    def test_unordered_approaches(self):
+        neo = NearEarthObject('Eros', '433', 'N', '16.84')
+        approaches = [CloseApproach('433', '2020-Mar-01 00:00', '0.3', '10'),
+                      CloseApproach('433', '2019-Jan-01 00:00', '0.1', '5'),
+                      CloseApproach('433', '2021-Jan-01 00:00', '0.2', '20')]
+        NEODatabase([neo, NearEarthObject('Halley', '1P', 'N', '')], approaches)
+        summary = neo.approaches.summary
+        self.assertEqual((summary.approaches, summary.closest, summary.fastest), (3, 0.1, 20.0))
+        self.assertEqual((summary.first, summary.last), (approaches[1].minutes, approaches[2].minutes))
+
+    def test_neo_without_approaches(self):
+        neo = NearEarthObject('Halley', '1P', 'N', '')
+        NEODatabase([neo], [])
+        summary = neo.approaches.summary
+        self.assertEqual(summary.approaches, 0)
+        self.assertIsNone(summary.first)
+        self.assertEqual(summary.approaches_str, "no known close approaches")
+
+    def test_query_neos(self):
+        filters = create_filters(hazardous=True) + [SummaryFilter('approaches', operator.ge, 2),
+                                                    SummaryFilter('closest', operator.le, 0.4)]
+        expected = [neo for neo in self.db.neos
+                    if neo.hazardous and len(neo.approaches) >= 2
+                    and min(approach.distance for approach in neo.approaches) <= 0.4]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual([summary.neo for summary in self.db.query_neos(filters)], expected)
+
+    def test_sorted_neos(self):
+        expected = sorted((neo for neo in self.db.neos if len(neo.approaches)),
+                          key=lambda neo: max(approach.velocity for approach in neo.approaches), reverse=True)
+        received = [summary.neo for summary in self.db.query_neos(sort_by='fastest', reverse=True)]
+        self.assertEqual(received[:len(expected)], expected)
+        self.assertTrue(all(not len(neo.approaches) for neo in received[len(expected):]))
+
+    def test_neos_subcommand(self):
+        parser, _ = make_parser()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfile = pathlib.Path(tmpdir) / 'neos.csv'
+            neos(self.db, parser.parse_args(['neos', '--min-approaches', '3', '--sort-by', 'closest',
+                                             '--outfile', str(outfile)]))
+            with open(outfile) as infile:
+                rows = list(csv.DictReader(infile))
+        self.assertGreater(len(rows), 0)
+        self.assertTrue(all(int(row['approaches']) >= 3 for row in rows))
+        distances = [float(row['closest_distance_au']) for row in rows]
+        self.assertEqual(distances, sorted(distances))
+
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            neos(self.db, parser.parse_args(['neos', '--named', '--limit', '3']))
+        self.assertEqual(len(stdout.getvalue().splitlines()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
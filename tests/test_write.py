@@ -27,7 +27,7 @@ import unittest.mock
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from write import write_to_csv, write_to_json, write_to_stdout, RENDER_BLOCK_ROWS
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +226,33 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestWriteToStdout(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = build_results(RENDER_BLOCK_ROWS + 10)
+
+    def test_output_matches_print(self):
+        expected = io.StringIO()
+        for result in self.results:
+            print(result, file=expected)
+        stream = unittest.mock.Mock(wraps=io.StringIO())
+        self.assertEqual(write_to_stdout(self.results, stream=stream), len(self.results))
+        self.assertEqual(stream.getvalue(), expected.getvalue())
+        # The results are written in blocks, not one line at a time.
+        self.assertEqual(stream.write.call_count, 2)
+
+    def test_partial_writes_resume(self):
+        results = iter(self.results)
+        first, second = io.StringIO(), io.StringIO()
+        self.assertEqual(write_to_stdout(results, 3, stream=first), 3)
+        self.assertEqual(write_to_stdout(results, 2, stream=second), 2)
+        self.assertEqual(second.getvalue().splitlines(), [str(result) for result in self.results[3:5]])
+
+    def test_writes_to_stdout(self):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(write_to_stdout(self.results[:4]), 4)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4)
+
+
 if __name__ == '__main__':
     unittest.main()
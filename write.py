@@ -4,6 +4,15 @@ This module exports two functions: `write_to_csv` and `write_to_json`, each of
 which accept an `results` stream of close approaches and a path to which to
 write the data.
 
+The `write_to_stdout` function prints a stream of close approaches in large
+blocks rather than one line at a time, consuming no more of the stream than it
+prints, so that an interactive session can resume the stream later.
+
+The `write_summaries_to_csv` and `write_summaries_to_json` functions similarly
+write the `GroupSummary` objects produced by the `aggregate` subcommand, and
+`write_neo_summaries_to_csv` (with `write_summaries_to_json`) the `NEOSummary`
+objects listed by the `neos` subcommand.
+
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
 extension determines which of these functions is used.
@@ -11,31 +20,60 @@ extension determines which of these functions is used.
 You'll edit this file in Part 4.
 """
 import csv
+import itertools
 import json
+import sys
+
+# The number of rendered results that are joined into one block before it's written to stdout.
+RENDER_BLOCK_ROWS = 1024
+
+
+def write_to_stdout(results, n=None, stream=None):
+    """Write the string representations of an iterable of results to stdout, one per line.
 
+    Rather than making a `print` call (and a write) for each result, the results
+    are rendered and joined into blocks of `RENDER_BLOCK_ROWS` lines, and each
+    block is written at once. Exactly as many results as are written are
+    consumed, so a partly-written iterator can be resumed afterwards.
 
-def write_to_csv(results, filename):
+    :param results: An iterable of `CloseApproach` objects (or of anything else printable).
+    :param n: The maximum number of results to write, or None to write them all.
+    :param stream: The text stream to write to, by default `sys.stdout`.
+    :return: The number of results written.
+    """
+    stream = sys.stdout if stream is None else stream
+    results = itertools.islice(results, n)
+    written = 0
+    while True:
+        block = list(map(str, itertools.islice(results, RENDER_BLOCK_ROWS)))
+        if not block:
+            return written
+        block.append('')
+        stream.write('\n'.join(block))
+        written += len(block) - 1
+
+
+def write_to_csv(results, filename, columns=()):
     """Write an iterable of `CloseApproach` objects to a CSV file.
 
     The precise output specification is in `README.md`. Roughly, each output row
     corresponds to the information in a single close approach from the `results`
     stream and its associated near-Earth object.
 
-    :param results: An iterable of `CloseApproach` objects.
+    :param results: An iterable of `CloseApproach` objects (or `ApproachWithColumns`).
     :param filename: A Path-like object pointing to where the data should be saved.
+    :param columns: The names of any extra columns that the results carry, appended to each row.
     """
     fieldnames = (
         'datetime_utc', 'distance_au', 'velocity_km_s',
         'designation', 'name', 'diameter_km', 'potentially_hazardous'
-    )
-    csv_list = []
-    for result in results:
-        csv_list.append(result.serialize('csv'))
-
+    ) + tuple(columns)
+    # Write each row as it's produced, so that the results are never all in memory.
     with open(filename, 'w') as csvfile:
         csvwriter = csv.DictWriter(csvfile, fieldnames=fieldnames)
         csvwriter.writeheader()
-        csvwriter.writerows(csv_list)
+        for result in results:
+            csvwriter.writerow(result.serialize('csv'))
 
 
 def write_to_json(results, filename):
@@ -49,8 +87,65 @@ def write_to_json(results, filename):
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
-    json_list = []
-    for result in results:
-        json_list.append(result.serialize('json'))
+    # Write each element as it's produced, so that the results are never all in memory.
+    with open(filename, 'w') as jsfile:
+        jsfile.write('[')
+        for index, result in enumerate(results):
+            if index:
+                jsfile.write(', ')
+            jsfile.write(json.dumps(result.serialize('json')))
+        jsfile.write(']')
+
+
+def write_summaries_to_csv(summaries, group_by, filename, approximate=False):
+    """Write an iterable of `GroupSummary` objects to a CSV file.
+
+    Each output row corresponds to a single group, with a column for the group,
+    the number of close approaches in it, and the statistics of their attributes.
+
+    :param summaries: An iterable of `GroupSummary` objects (or of `sample.ApproxSummary` objects).
+    :param group_by: The grouping used to produce the summaries.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param approximate: Whether the summaries are estimates (`ApproxSummary` objects).
+    """
+    if approximate:
+        from sample import ApproxSummary as summary_type
+    else:
+        from aggregate import GroupSummary as summary_type
+
+    with open(filename, 'w') as csvfile:
+        csvwriter = csv.DictWriter(csvfile, fieldnames=summary_type.fieldnames(group_by))
+        csvwriter.writeheader()
+        for summary in summaries:
+            csvwriter.writerow(summary.serialize())
+
+
+def write_neo_summaries_to_csv(summaries, filename):
+    """Write an iterable of `NEOSummary` objects to a CSV file.
+
+    Each output row corresponds to a single NEO, with columns for its attributes,
+    its number of close approaches, and their extremes.
+
+    :param summaries: An iterable of `NEOSummary` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    from summaries import NEOSummary
+
+    with open(filename, 'w') as csvfile:
+        csvwriter = csv.DictWriter(csvfile, fieldnames=NEOSummary.fieldnames())
+        csvwriter.writeheader()
+        for summary in summaries:
+            csvwriter.writerow(summary.serialize())
+
+
+def write_summaries_to_json(summaries, filename):
+    """Write an iterable of `GroupSummary` objects to a JSON file.
+
+    The output is a list containing a dictionary for each group, with the same
+    keys as the columns written by `write_summaries_to_csv`.
+
+    :param summaries: An iterable of `GroupSummary` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
     with open(filename, 'w') as jsfile:
-        json.dump(json_list, jsfile)
+        json.dump([summary.serialize() for summary in summaries], jsfile)